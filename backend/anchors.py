@@ -0,0 +1,126 @@
+import json
+import re
+
+# Chapter anchors for highlights.
+#
+# cfi_range is the reader's locator, a JSON string:
+#   {"id": <element id>, "start": <offset>, "end": <offset>, "text": ...,
+#    "chapter": <index>, "chapterStart": <offset>, "chapterEnd": <offset>}
+# start/end are counted in the text of the element, chapterStart/chapterEnd in the
+# text of the whole chapter (all its text nodes, in document order). The anchor keeps
+# (chapter_index, anchor_start, anchor_end) in columns of their own, with the
+# chapter offsets, so a stored anchor resolves without the element id:
+#
+#   chapter_text(chapters[chapter_index]["content"])[anchor_start:anchor_end]
+#
+# Chapters are 0-based, in the order parse_book returns them.
+
+# Elements the reader numbers as content-block-N when they have no id (initContentBlocks)
+BLOCK_TAGS = ["p", "h1", "h2", "h3", "div"]
+
+CHAPTER_ID_RE = re.compile(r"^chapter-(\d+)$")
+
+# Readers before chapter offsets rendered "\n" and 12 spaces ahead of the content of
+# each chapter div, and counted them in locators on the chapter div itself
+LEGACY_CHAPTER_PREFIX = 13
+
+
+def parse_locator(cfi_range):
+    if not cfi_range or cfi_range == "TODO":
+        return None
+    try:
+        locator = json.loads(cfi_range)
+    except ValueError:
+        return None
+    return locator if isinstance(locator, dict) else None
+
+
+def _int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) and value >= 0 else None
+
+
+def anchor(cfi_range, blocks=None):
+    """
+    (chapter_index, start, end) for a locator, with None for whatever it doesn't tell.
+    Locators written by older readers only have element offsets; pass blocks
+    (see block_positions()) to resolve them from the element id.
+    """
+    locator = parse_locator(cfi_range)
+    if locator is None:
+        return None, None, None
+
+    chapter = _int(locator.get("chapter"))
+    start, end = _int(locator.get("chapterStart")), _int(locator.get("chapterEnd"))
+    if start is not None and end is not None:
+        return chapter, start, end
+
+    # Older locator: the element's own position in the chapter is needed
+    element_id = locator.get("id")
+    offset = None
+    if isinstance(element_id, str):
+        match = CHAPTER_ID_RE.match(element_id)
+        if match:
+            # The chapter's own div (ids start at 1 in the template)
+            if chapter is None:
+                chapter = int(match.group(1)) - 1
+            offset = -LEGACY_CHAPTER_PREFIX
+        elif blocks and element_id in blocks:
+            block_chapter, offset = blocks[element_id]
+            if chapter is None:
+                chapter = block_chapter
+
+    start, end = _int(locator.get("start")), _int(locator.get("end"))
+    if offset is None or start is None or end is None:
+        return chapter, None, None
+    return chapter, max(0, start + offset), max(0, end + offset)
+
+
+def set_anchor(highlight):
+    # At write time, from the locator alone: current readers always send the chapter offsets
+    highlight.chapter_index, highlight.anchor_start, highlight.anchor_end = anchor(highlight.cfi_range)
+
+
+def _is_text(node):
+    # Text nodes as the browser's TreeWalker sees them: no comments, doctypes, CDATA
+    from bs4 import NavigableString
+    from bs4.element import PreformattedString
+    return isinstance(node, NavigableString) and not isinstance(node, PreformattedString)
+
+
+def chapter_text(content):
+    """
+    The text anchor offsets are counted in, for a chapter's HTML.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content or "", "html.parser")
+    return "".join(str(node) for node in soup.descendants if _is_text(node))
+
+
+def block_positions(chapters):
+    """
+    Element id -> (chapter index, offset of its text in the chapter) for a parsed
+    book, numbering blocks the way the reader does: every p/h1/h2/h3/div without
+    an id becomes content-block-N, counted across the whole book in document order.
+    """
+    from bs4 import BeautifulSoup, Tag
+
+    positions = {}
+    block_index = 0
+    for chapter_index, chapter in enumerate(chapters):
+        soup = BeautifulSoup(chapter.get("content") or "", "html.parser")
+        offset = 0
+        for node in soup.descendants:
+            if _is_text(node):
+                offset += len(node)
+                continue
+            if not isinstance(node, Tag):
+                continue
+            element_id = node.get("id")
+            if node.name in BLOCK_TAGS:
+                if not element_id:
+                    element_id = f"content-block-{block_index}"
+                block_index += 1
+            if element_id:
+                positions.setdefault(element_id, (chapter_index, offset))
+    return positions
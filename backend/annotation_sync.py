@@ -0,0 +1,164 @@
+import json
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .database import begin_immediate
+from . import anchors
+
+# Batched annotation writes from the reader's offline-capable queue.
+#
+# A batch is an ordered list of create/update/delete operations on highlights,
+# bookmarks and comments, applied in one transaction with one revision bump.
+# Replaying is safe at two levels:
+# - every batch carries a client-generated batch_id; a batch that was already
+#   applied returns its stored result without touching anything,
+# - creates carry a client-generated client_id (unique per book), so a create
+#   that already exists is skipped, and updates/deletes are naturally repeatable.
+
+MODELS = {
+    "highlight": models.Highlight,
+    "bookmark": models.Bookmark,
+    "comment": models.Comment,
+}
+
+# Fields a create/update may set, per annotation type
+FIELDS = {
+    "highlight": ("selected_text", "cfi_range", "color"),
+    "bookmark": ("cfi_range", "label", "comment"),
+    "comment": ("content", "selected_text", "cfi_range"),
+}
+
+
+class InvalidOperation(ValueError):
+    pass
+
+
+def bump_revision(db, book_id):
+    # Every highlight/bookmark/comment write goes through here, in the caller's transaction,
+    # so the revision (and the ETag of /books/{book_id}/annotations) changes with the data
+    db.execute(
+        update(models.Book)
+        .where(models.Book.id == book_id)
+        .values(annotations_rev=models.Book.annotations_rev + 1)
+    )
+
+
+def _find(db, model, book_id, op):
+    # Annotations created before the sync queue have no client_id and are addressed by id
+    if op.client_id:
+        condition = model.client_id == op.client_id
+    elif op.id is not None:
+        condition = model.id == op.id
+    else:
+        raise InvalidOperation(f"{op.op} {op.type} needs a client_id or an id")
+    return db.scalar(select(model).filter(model.book_id == book_id, condition))
+
+
+def _apply(db, book_id, op, ids):
+    """
+    Apply one operation. Returns True when it changed something.
+    """
+    model = MODELS[op.type]
+    data = {key: value for key, value in op.data.items() if key in FIELDS[op.type]}
+
+    if op.op == "create":
+        if not op.client_id:
+            raise InvalidOperation(f"create {op.type} needs a client_id")
+        existing = _find(db, model, book_id, op)
+        if existing:
+            ids[op.client_id] = existing.id
+            return False
+        annotation = model(book_id=book_id, client_id=op.client_id, **data)
+        if op.type == "highlight":
+            anchors.set_anchor(annotation)
+        try:
+            # For the id, and so later operations of the batch can find it. In a savepoint,
+            # so losing a race only undoes this insert and not the batch so far
+            with db.begin_nested():
+                db.add(annotation)
+                db.flush()
+        except IntegrityError:
+            # Created by a concurrent request (e.g. the same queue sent from two tabs)
+            existing = _find(db, model, book_id, op)
+            if existing is None:
+                raise
+            ids[op.client_id] = existing.id
+            return False
+        ids[op.client_id] = annotation.id
+        return True
+
+    annotation = _find(db, model, book_id, op)
+    if annotation is None:
+        # Already deleted (replay or another device); nothing left to update
+        return False
+
+    if op.op == "update":
+        changed = False
+        for key, value in data.items():
+            if getattr(annotation, key) != value:
+                setattr(annotation, key, value)
+                changed = True
+        if op.type == "highlight" and "cfi_range" in data:
+            anchors.set_anchor(annotation)
+        return changed
+
+    db.delete(annotation)
+    db.flush()
+    return True
+
+
+def _stored_result(db, book_id, batch_id):
+    stored = db.scalar(
+        select(models.AnnotationSyncBatch.result)
+        .filter(models.AnnotationSyncBatch.book_id == book_id, models.AnnotationSyncBatch.batch_id == batch_id)
+    )
+    if stored is None:
+        return None
+    result = json.loads(stored)
+    result["replayed"] = True
+    return result
+
+
+def apply_batch(db, book_id, batch_id, ops):
+    """
+    Apply the operations in order and commit once.
+    Returns {"revision", "applied", "ids": {client_id: id}, "replayed"}.
+    """
+    replay = _stored_result(db, book_id, batch_id)
+    if replay is not None:
+        return replay
+
+    # Creates run in savepoints, which need the transaction opened first
+    begin_immediate(db)
+
+    applied = 0
+    ids = {}
+    for index, op in enumerate(ops):
+        try:
+            if _apply(db, book_id, op, ids):
+                applied += 1
+        except InvalidOperation as e:
+            db.rollback()
+            raise InvalidOperation(f"Operation {index}: {e}") from e
+
+    if applied:
+        bump_revision(db, book_id)
+    revision = db.scalar(select(models.Book.annotations_rev).filter(models.Book.id == book_id))
+
+    result = {"revision": revision or 0, "applied": applied, "ids": ids}
+    db.add(models.AnnotationSyncBatch(book_id=book_id, batch_id=batch_id, result=json.dumps(result)))
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same batch was committed concurrently (e.g. a beacon and a retry): return that result
+        db.rollback()
+        replay = _stored_result(db, book_id, batch_id)
+        if replay is None:
+            # batch_id is unique across books
+            raise InvalidOperation(f"batch_id {batch_id} was already used for another book")
+        return replay
+
+    result["replayed"] = False
+    return result
@@ -0,0 +1,135 @@
+"""
+Sync vs async session handlers under concurrent readers.
+
+Serves the same "list a book's highlights" query from a `def` handler with a
+sync Session (run on Starlette's thread pool) and from an `async def` handler
+with an AsyncSession, then drives each with concurrent in-process clients.
+Both run against the same fresh temporary database.
+
+    python -m backend.benchmarks.bench_async_db --seconds 5 --clients 32
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.database import Base, make_engine, make_async_engine
+from backend import models
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_app(path, books):
+    engine = make_engine(f"sqlite:///{path}")
+    async_engine = make_async_engine(f"sqlite+aiosqlite:///{path}")
+    SyncSession = sessionmaker(bind=engine, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    Base.metadata.create_all(bind=engine)
+    with SyncSession() as db:
+        db.add_all(models.Book(title=f"Book {i}", author="Bench", file_path=f"/tmp/{i}.epub", file_type="epub") for i in range(books))
+        db.flush()
+        db.add_all(
+            models.Highlight(book_id=i % books + 1, selected_text=f"highlight {i}", cfi_range="{}", color="yellow")
+            for i in range(books * 50)
+        )
+        db.commit()
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/{book_id}")
+    def sync_highlights(book_id: int, db: Session = Depends(get_sync_db)):
+        rows = db.query(models.Highlight.id, models.Highlight.selected_text).filter(models.Highlight.book_id == book_id).all()
+        return [{"id": row.id, "text": row.selected_text} for row in rows]
+
+    @app.get("/async/{book_id}")
+    async def async_highlights(book_id: int, db: AsyncSession = Depends(get_async_db)):
+        rows = (await db.execute(
+            select(models.Highlight.id, models.Highlight.selected_text).where(models.Highlight.book_id == book_id)
+        )).all()
+        return [{"id": row.id, "text": row.selected_text} for row in rows]
+
+    return app, engine, async_engine
+
+
+async def drive(app, prefix, seconds, clients, books):
+    latencies = []
+    errors = 0
+    stop = time.monotonic() + seconds
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            rng = random.Random()
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                response = await client.get(f"/{prefix}/{rng.randint(1, books)}")
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(clients)))
+    return latencies, errors
+
+
+async def run(seconds, clients, books):
+    with tempfile.TemporaryDirectory() as tmp:
+        app, engine, async_engine = build_app(os.path.join(tmp, "bench.db"), books)
+        results = {}
+        try:
+            for prefix in ("sync", "async"):
+                # Warm up the pools before measuring
+                await drive(app, prefix, 0.5, clients, books)
+                results[prefix] = await drive(app, prefix, seconds, clients, books)
+        finally:
+            engine.dispose()
+            await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--books", type=int, default=20)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.seconds, args.clients, args.books))
+
+    print(f"{'handler':<9}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for prefix, (latencies, errors) in results.items():
+        print(f"{prefix:<9}"
+              f"{len(latencies) / args.seconds:>10.0f}"
+              f"{statistics.median(latencies or [0]) * 1000:>10.2f}"
+              f"{percentile(latencies, 99) * 1000:>10.2f}"
+              f"{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
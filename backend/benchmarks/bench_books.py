@@ -0,0 +1,271 @@
+"""
+Book parsing benchmark suite, with results saved as JSON for comparing commits.
+
+Generates one synthetic book per format (see synthetic_books.py) and measures:
+
+- read_<format>:               the parser, through parsers.parse_book
+- extract_cover_image:         the cover for the library (EPUB, DOCX, PDF)
+- GET /reader/{id}:            the reader page, first (cold: parse and chapter cache
+                               build) and warm (from the chapter cache)
+- GET /reader/{id}/chapters/n: the middle chapter, from the cache
+- GET /reader/{id}/images/...: the first image of the book (EPUB, DOCX)
+
+For each: best and median wall time over --rounds, peak Python heap (tracemalloc,
+one extra round) and peak RSS of the process, and output size (chapter HTML,
+image or response bytes). Every case runs in a fresh interpreter, so memory and
+caches don't carry over between cases. Endpoints run in-process against the app,
+with the database replaced by a single in-memory Book.
+
+    python -m backend.benchmarks.bench_books --size medium
+    python -m backend.benchmarks.bench_books --compare results/old.json results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no peak RSS
+
+from backend.benchmarks import synthetic_books
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+IMAGE_BASE_URL = "/reader/1/images"
+
+CASES = [
+    ("read", ("epub", "docx", "pdf", "txt")),
+    ("extract_cover_image", ("epub", "docx", "pdf")),
+    ("GET /reader/{id}", ("epub", "docx", "pdf", "txt")),
+    ("GET /reader/{id}/chapters/n", ("epub", "docx", "pdf", "txt")),
+    ("GET /reader/{id}/images/...", ("epub", "docx")),
+]
+
+
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- One case, in the child process ---
+
+def parser_case(fmt, path):
+    from backend.parsers import parse_book
+
+    def run():
+        content = parse_book(fmt, path, IMAGE_BASE_URL)
+        if not content:
+            raise RuntimeError(f"{fmt} parser returned nothing")
+        return sum(len(chapter["content"].encode("utf-8")) for chapter in content["chapters"])
+    return run
+
+
+def cover_case(fmt, path):
+    import importlib
+    parser = importlib.import_module(f"backend.parsers.{fmt}_parser")
+
+    def run():
+        data, _ = parser.extract_cover_image(path)
+        if not data:
+            raise RuntimeError(f"no {fmt} cover")
+        return len(data)
+    return run
+
+
+def endpoint_case(name, fmt, path):
+    from fastapi.testclient import TestClient
+    from unittest.mock import AsyncMock, MagicMock
+
+    from backend.main import app
+    from backend.database import get_async_db
+    from backend.models import Book
+    from backend.parsers import parse_book
+
+    book = Book(id=1, title="Synthetic Book", author="Benchmark", file_type=fmt, file_path=path)
+    db = MagicMock()
+    db.get = AsyncMock(return_value=book)
+    app.dependency_overrides[get_async_db] = lambda: db
+    client = TestClient(app)
+
+    url = "/reader/1"
+    if name.endswith("/chapters/n"):
+        content = parse_book(fmt, path, IMAGE_BASE_URL)
+        url = f"/reader/1/chapters/{len(content['chapters']) // 2 + 1}"
+    elif name.endswith("/images/..."):
+        content = parse_book(fmt, path, IMAGE_BASE_URL)
+        match = re.search(rf'src="{IMAGE_BASE_URL}/([^"]+)"', "".join(chapter["content"] for chapter in content["chapters"]))
+        url = f"{IMAGE_BASE_URL}/{match.group(1)}"
+
+    def run():
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: HTTP {response.status_code}")
+        return len(response.content)
+    return run
+
+
+def run_case(name, fmt, path, rounds):
+    result = {"case": name, "format": fmt}
+    try:
+        if name == "read":
+            run = parser_case(fmt, path)
+        elif name == "extract_cover_image":
+            run = cover_case(fmt, path)
+        else:
+            run = endpoint_case(name, fmt, path)
+
+        times = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result["output_bytes"] = run()
+            times.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        run()
+        result["peak_python_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result["first_seconds"] = round(times[0], 6)
+        result["best_seconds"] = round(min(times), 6)
+        result["median_seconds"] = round(statistics.median(times), 6)
+    except Exception as e:
+        result["error"] = str(e)
+    result["peak_rss_bytes"] = peak_rss()
+    return result
+
+
+# --- The suite, in the parent ---
+
+def run_suite(books, rounds, cases=None):
+    results = []
+    for name, formats in CASES:
+        if cases and name not in cases:
+            continue
+        for fmt in formats:
+            # Chapter cache in a directory of its own, so the first request is cold
+            with tempfile.TemporaryDirectory() as cache_dir:
+                env = dict(os.environ, CHAPTER_CACHE_DIR=cache_dir)
+                completed = subprocess.run(
+                    [sys.executable, "-m", "backend.benchmarks.bench_books",
+                     "--run-case", name, "--format", fmt, "--book", books[fmt], "--rounds", str(rounds)],
+                    cwd=ROOT, env=env, capture_output=True, text=True,
+                )
+            lines = completed.stdout.strip().splitlines()
+            if completed.returncode != 0 or not lines:
+                result = {"case": name, "format": fmt, "error": (completed.stderr.strip().splitlines() or ["crashed"])[-1]}
+            else:
+                result = json.loads(lines[-1])
+            results.append(result)
+            print(format_row(result), flush=True)
+    return results
+
+
+def format_row(result):
+    label = f"{result['case']} [{result['format']}]"
+    if "error" in result:
+        return f"{label:<42} error: {result['error']}"
+    return (f"{label:<42}{result['first_seconds'] * 1000:>10.1f}{result['best_seconds'] * 1000:>10.1f}"
+            f"{result['peak_python_bytes'] / 1e6:>10.1f}{(result['peak_rss_bytes'] or 0) / 1e6:>10.1f}"
+            f"{result['output_bytes'] / 1e3:>12.1f}")
+
+
+HEADER = f"{'case':<42}{'first ms':>10}{'best ms':>10}{'heap MB':>10}{'RSS MB':>10}{'output KB':>12}"
+
+
+def compare(old, new):
+    """
+    Lines comparing two result files, case by case: best time and peak heap, new/old.
+    """
+    before = {(r["case"], r["format"]): r for r in old["results"]}
+    lines = [f"{old.get('commit')} ({old.get('size')}) -> {new.get('commit')} ({new.get('size')})",
+             f"{'case':<42}{'old ms':>10}{'new ms':>10}{'ratio':>8}{'old MB':>10}{'new MB':>10}{'ratio':>8}"]
+    for result in new["results"]:
+        key = (result["case"], result["format"])
+        label = f"{key[0]} [{key[1]}]"
+        previous = before.get(key)
+        if previous is None or "error" in previous or "error" in result:
+            lines.append(f"{label:<42} {'new' if previous is None else 'error'}")
+            continue
+        old_s, new_s = previous["best_seconds"], result["best_seconds"]
+        old_m, new_m = previous["peak_python_bytes"], result["peak_python_bytes"]
+        lines.append(f"{label:<42}{old_s * 1000:>10.1f}{new_s * 1000:>10.1f}{new_s / old_s:>7.2f}x"
+                     f"{old_m / 1e6:>10.1f}{new_m / 1e6:>10.1f}{new_m / old_m if old_m else 0:>7.2f}x")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(synthetic_books.SIZES), default="small")
+    parser.add_argument("--cjk", type=float, default=0.3, help="share of CJK paragraphs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--case", action="append", help="only this case (repeatable), e.g. read")
+    parser.add_argument("--output", help="results file (default: results/<commit>-<size>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    # Internal: one case in this process, printed as JSON
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--format", help=argparse.SUPPRESS)
+    parser.add_argument("--book", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.format, args.book, args.rounds)))
+        return
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        print("\n".join(compare(old, new)))
+        return
+
+    commit = git_commit()
+    with tempfile.TemporaryDirectory() as tmp:
+        books = synthetic_books.generate(tmp, args.size, args.cjk, args.seed)
+        sizes = {fmt: os.path.getsize(path) for fmt, path in books.items()}
+        print(f"{args.size} books ({', '.join(f'{fmt} {size / 1e6:.2f} MB' for fmt, size in sizes.items())}), commit {commit}")
+        print(HEADER)
+        results = run_suite(books, args.rounds, args.case)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'unknown'}-{args.size}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "size": args.size,
+            "cjk": args.cjk,
+            "seed": args.seed,
+            "rounds": args.rounds,
+            "book_bytes": sizes,
+            "results": results,
+        }, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
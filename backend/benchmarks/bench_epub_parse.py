@@ -0,0 +1,106 @@
+"""
+EPUB chapter transform throughput.
+
+Writes a synthetic EPUB (300 chapters by default, with styles, scripts and
+images in every chapter) and reads it with:
+
+- legacy:  the original BeautifulSoup 'html.parser' loop, kept verbatim for comparison
+- lxml:    epub_parser.read_epub with the chapter process pool disabled
+- lxml+N:  epub_parser.read_epub with N chapter worker processes
+
+Every variant includes loading the EPUB itself (epub.read_epub), which is the same
+for all of them. Output is checked to have the same chapters in the same order.
+
+    python -m backend.benchmarks.bench_epub_parse --chapters 300 --processes 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import ebooklib
+from ebooklib import epub
+from bs4 import BeautifulSoup
+
+from backend.parsers import epub_parser
+from backend.executors import shutdown_pools
+from backend.benchmarks.synthetic_books import write_epub
+
+
+def legacy_read_epub(file_path, image_base_url=None):
+    # The original read_epub, kept verbatim (minus comments) for comparison
+    book = epub.read_epub(file_path)
+    chapters = []
+    for item in book.get_items():
+        if item.get_type() == ebooklib.ITEM_DOCUMENT:
+            content = item.get_content().decode('utf-8')
+            soup = BeautifulSoup(content, 'html.parser')
+            for script in soup(["script", "style"]):
+                script.decompose()
+            if image_base_url:
+                for img in soup.find_all('img'):
+                    src = img.get('src')
+                    if src:
+                        if not src.startswith('http'):
+                            img['src'] = f"{image_base_url}/{src}"
+            body = soup.find('body')
+            if body:
+                chapters.append({
+                    'id': item.get_id(),
+                    'content': str(body),
+                    'href': item.get_name()
+                })
+    return {'chapters': chapters}
+
+
+def timed(fn, path, rounds):
+    best = None
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn(path, "/reader/1/images")
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=300)
+    parser.add_argument("--paragraphs", type=int, default=40, help="paragraphs per chapter")
+    parser.add_argument("--cjk", type=float, default=0.0, help="share of CJK paragraphs")
+    parser.add_argument("--processes", type=int, default=epub_parser.EPUB_PARSE_PROCESSES)
+    parser.add_argument("--rounds", type=int, default=3, help="best of N")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.epub")
+        write_epub(path, args.chapters, args.paragraphs, cjk=args.cjk)
+        print(f"{args.chapters} chapters, {os.path.getsize(path) / 1e6:.1f} MB compressed, {os.cpu_count()} CPUs")
+
+        variants = [("legacy", legacy_read_epub, None, None)]
+        variants.append(("lxml", epub_parser.read_epub, 1, None))
+        if args.processes > 1:
+            variants.append((f"lxml+{args.processes}", epub_parser.read_epub, args.processes, 1))
+
+        baseline = None
+        print(f"{'variant':<12}{'seconds':>10}{'chapters/s':>12}{'speedup':>10}")
+        for name, fn, processes, min_chapters in variants:
+            if processes is not None:
+                epub_parser.EPUB_PARSE_PROCESSES = processes
+                epub_parser.EPUB_PARALLEL_MIN_CHAPTERS = min_chapters or args.chapters + 1
+                # Start the workers outside the timing, as a running server would have them
+                if processes > 1:
+                    epub_parser.transform_chapters([b"<html><body></body></html>"] * processes * 4)
+            seconds, result = timed(fn, path, args.rounds)
+            count = len(result["chapters"])
+            if baseline is None:
+                baseline = (seconds, [chapter["id"] for chapter in result["chapters"]])
+            elif [chapter["id"] for chapter in result["chapters"]] != baseline[1]:
+                raise SystemExit(f"{name}: chapters differ from legacy")
+            print(f"{name:<12}{seconds:>10.3f}{count / seconds:>12.0f}{baseline[0] / seconds:>9.2f}x")
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
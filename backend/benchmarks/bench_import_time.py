@@ -0,0 +1,69 @@
+"""
+Import-time report for the server module.
+
+Runs `python -X importtime -c "import backend.main"` in a fresh interpreter and
+summarizes the slowest modules (cumulative, i.e. with everything they import).
+Heavy libraries that should only load on first use are flagged; the same list
+is enforced by backend/tests/test_import_time.py.
+
+    python -m backend.benchmarks.bench_import_time --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Format parsers, translation clients and dictionaries: imported by the code that uses them
+LAZY_MODULES = ("ebooklib", "bs4", "lxml", "docx", "pdfplumber", "pdfminer", "deep_translator", "pystardict", "requests")
+
+
+def measure(module="backend.main"):
+    """
+    [(name, self_us, cumulative_us, depth)] in import order, from a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def lazy_violations(rows):
+    # Top-level packages from LAZY_MODULES that were imported anyway
+    return sorted({name.split(".")[0] for name, *_ in rows if name.split(".")[0] in LAZY_MODULES})
+
+
+def summary(rows, top=15):
+    total = next((cumulative for name, _, cumulative, _ in rows if name == "backend.main"), None)
+    lines = [f"{'cumulative ms':>14}{'self ms':>10}  module"]
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[2])[:top]:
+        lines.append(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+    if total is not None:
+        lines.append(f"import backend.main: {total / 1000:.0f} ms")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    rows = measure()
+    print(summary(rows, args.top))
+    violations = lazy_violations(rows)
+    if violations:
+        print(f"Imported at startup but should be lazy: {', '.join(violations)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Microbenchmark for Naver response parsing.
+
+Compares the original parser (stdlib json + inline re.sub) with
+naver_scraper.parse_naver_result on the responses in fixtures/.
+
+fixtures/naver_sources.json says where each response came from: "recorded"
+from the live API by --record (with the URL and time), or "synthetic", built
+by hand in the api3 layout where the API wasn't reachable. Only recorded
+responses catch changes to the real payloads; re-record and commit them
+whenever the network allows.
+
+    python -m backend.benchmarks.bench_naver_parse
+    python -m backend.benchmarks.bench_naver_parse --record   # refresh fixtures from the live API
+"""
+import argparse
+import json
+import os
+import re
+import time
+import timeit
+
+from backend.config import NAVER_URL
+from backend.naver_scraper import fetch_naver_raw, parse_naver_result
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURE_WORDS = {"en": "apple", "ja": "食べる", "zh": "上衣"}
+SOURCES_PATH = os.path.join(FIXTURE_DIR, "naver_sources.json")
+
+
+def legacy_parse(raw, lang):
+    # The pre-optimization parser, kept verbatim for comparison
+    data = json.loads(raw)
+    definitions = []
+    examples = []
+    if 'searchResultMap' in data and 'searchResultListMap' in data['searchResultMap']:
+        res_map = data['searchResultMap']['searchResultListMap']
+        if 'WORD' in res_map:
+            items = res_map['WORD']['items']
+            if items:
+                item = items[0]
+                pronunciation = None
+                if lang == "ja":
+                    pronunciation = item.get('expMeaningRead')
+                    if not pronunciation:
+                        pronunciation = item.get('expEntry')
+                    if not pronunciation:
+                        pronunciation = item.get('expAudioRead')
+                elif lang == "zh":
+                    phonetic_list = item.get('searchPhoneticSymbolList', [])
+                    if phonetic_list and len(phonetic_list) > 0:
+                        pronunciation = phonetic_list[0].get('symbolValue')
+                    if not pronunciation:
+                        pronunciation = item.get('expEntry')
+                if pronunciation:
+                    pronunciation = re.sub(r'<[^>]+>', '', pronunciation).strip()
+                if 'meansCollector' in item:
+                    for collector in item['meansCollector']:
+                        for mean in collector.get('means', []):
+                            if 'value' in mean:
+                                definitions.append(re.sub(r'<[^>]+>', '', mean['value']))
+                        if len(definitions) >= 6:
+                            break
+                if definitions:
+                    for section in ('EXAMPLE', 'VLIVE'):
+                        if examples or section not in res_map:
+                            continue
+                        for ex_item in res_map[section]['items'][:2]:
+                            if 'expExample1' in ex_item and 'expExample2' in ex_item:
+                                en = re.sub(r'<[^>]+>', '', ex_item['expExample1']).strip()
+                                ko = re.sub(r'<[^>]+>', '', ex_item['expExample2']).strip()
+                                if en and ko:
+                                    examples.append(f"{en} ({ko})")
+                    return {"definition": "; ".join(definitions), "pronunciation": pronunciation, "examples": examples}
+    return None
+
+
+def fixture_path(lang):
+    return os.path.join(FIXTURE_DIR, f"naver_{lang}.json")
+
+
+def load_sources():
+    try:
+        with open(SOURCES_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def record():
+    sources = load_sources()
+    for lang, word in FIXTURE_WORDS.items():
+        raw = fetch_naver_raw(word, lang=lang)
+        with open(fixture_path(lang), "wb") as f:
+            f.write(raw)
+        sources[lang] = {
+            "word": word,
+            "source": "recorded",
+            "url": NAVER_URL.format(lang=lang) + f"?query={word}",
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        print(f"Recorded {lang} ({word}): {len(raw)} bytes")
+    with open(SOURCES_PATH, "w", encoding="utf-8") as f:
+        json.dump(sources, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def run(number):
+    sources = load_sources()
+    print(f"{'lang':<6}{'source':>10}{'bytes':>9}{'legacy µs':>12}{'current µs':>12}{'speedup':>9}")
+    for lang in FIXTURE_WORDS:
+        source = sources.get(lang, {}).get("source", "unknown")
+        with open(fixture_path(lang), "rb") as f:
+            raw = f.read()
+
+        assert legacy_parse(raw, lang) == parse_naver_result(raw, lang), f"parsers disagree on {lang}"
+
+        legacy = min(timeit.repeat(lambda: legacy_parse(raw, lang), number=number, repeat=5)) / number
+        current = min(timeit.repeat(lambda: parse_naver_result(raw, lang), number=number, repeat=5)) / number
+        print(f"{lang:<6}{source:>10}{len(raw):>9}{legacy * 1e6:>12.1f}{current * 1e6:>12.1f}{legacy / current:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="fetch fresh fixtures from Naver first")
+    parser.add_argument("--number", type=int, default=200, help="parses per timing run")
+    args = parser.parse_args()
+
+    if args.record:
+        record()
+    run(args.number)
@@ -0,0 +1,116 @@
+"""
+Concurrent read/write benchmark for the SQLite storage profiles.
+
+Writer threads save reading progress and add highlights (one commit each, like
+the reader does); reader threads list a book's highlights at the same time.
+Each profile runs against a fresh temporary database.
+
+    python -m backend.benchmarks.bench_sqlite_writes --seconds 5 --writers 4 --readers 8
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import OperationalError
+
+from backend.database import Base, STORAGE_PROFILES, make_engine
+from backend import models
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, seconds, writers, readers, books=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            db.add_all(models.Book(title=f"Book {i}", author="Bench", file_path=f"/tmp/{i}.epub", file_type="epub") for i in range(books))
+            db.commit()
+
+        stop = time.monotonic() + seconds
+        results = {"write": [], "read": [], "errors": 0}
+        lock = threading.Lock()
+
+        def writer():
+            rng = random.Random()
+            latencies = []
+            errors = 0
+            while time.monotonic() < stop:
+                book_id = rng.randint(1, books)
+                started = time.perf_counter()
+                try:
+                    with Session() as db:
+                        if rng.random() < 0.5:
+                            book = db.get(models.Book, book_id)
+                            book.last_read_position = f"#content-block-{rng.randint(0, 5000)}"
+                        else:
+                            db.add(models.Highlight(book_id=book_id, selected_text="bench", cfi_range="{}", color="yellow"))
+                        db.commit()
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    errors += 1
+            with lock:
+                results["write"].extend(latencies)
+                results["errors"] += errors
+
+        def reader():
+            rng = random.Random()
+            latencies = []
+            while time.monotonic() < stop:
+                started = time.perf_counter()
+                try:
+                    with Session() as db:
+                        db.query(models.Highlight).filter(models.Highlight.book_id == rng.randint(1, books)).all()
+                    latencies.append(time.perf_counter() - started)
+                except OperationalError:
+                    with lock:
+                        results["errors"] += 1
+            with lock:
+                results["read"].extend(latencies)
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--profiles", nargs="+", default=list(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':<13}{'writes/s':>10}{'w p50 ms':>10}{'w p99 ms':>10}{'reads/s':>10}{'r p50 ms':>10}{'r p99 ms':>10}{'errors':>8}")
+    for profile in args.profiles:
+        r = run_profile(profile, args.seconds, args.writers, args.readers)
+        print(f"{profile:<13}"
+              f"{len(r['write']) / args.seconds:>10.0f}"
+              f"{statistics.median(r['write'] or [0]) * 1000:>10.2f}"
+              f"{percentile(r['write'], 99) * 1000:>10.2f}"
+              f"{len(r['read']) / args.seconds:>10.0f}"
+              f"{statistics.median(r['read'] or [0]) * 1000:>10.2f}"
+              f"{percentile(r['read'], 99) * 1000:>10.2f}"
+              f"{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Search-as-you-type latency over a large vocabulary.
+
+Fills a temporary database with synthetic English, Japanese, Chinese and Korean
+words (with translations and context sentences), indexes them in words_fts and
+times every prefix of a set of queries, the way a search box sends them.
+
+    python -m backend.benchmarks.bench_word_search --words 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend.fts import segment
+from backend import models, word_search  # models registers the tables (and words_fts) on Base
+
+LATIN = "abcdefghijklmnopqrstuvwxyz"
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわん"
+HANZI = "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年得就那要下以生会自着去之过家学对可她里后小么心多天而能好都然没日于起还发成事只作当想看文无开手十用主行方又如前所本见经头面公同三已老从动两长知民样现分将外但身些与高意进把法此实回二理美点月明其种声全工己话儿者向情部正名定女问力机给等几很业最间新什打便位因重被走电四第门相次东政海口使教西再平真听世气信北少关并内加化由却代军产入先山五太水万市眼体别处总才场师书比住员九笑性通目华报立马命张活难神数件安表原车白应路期叫死常提感金何更反合放做系计或司利受光王果亲界及今京务制解各任至清物台象记边共风战干接它许八特觉望直服毛林题建南度统色字请交爱让认算论百吃义科怎元社术结六功指思非流每青管夫连远资队跟带花快条院变联言权往展该领传近留红治决周保达办运武半候七必城父强步完革深区即求品士转量空甚众技轻程告江语英基派满式李息写呢识极令黄德收脸钱党倒未持取设始版双历越史商千片容研像找友孩站广改议形委早房音火际则首单据导影失拿网香似斯专石若兵弟谁校读志飞观争究包组造落视济喜离虽坏兴切标"
+HANGUL_START, HANGUL_END = 0xAC00, 0xD7A3
+
+QUERIES = ["develop", "ambiguous", "天安门", "図書館", "학생들", "meticulous", "北京大学", "とりあえず"]
+
+
+def random_word(rng):
+    kind = rng.random()
+    if kind < 0.55:
+        return "".join(rng.choice(LATIN) for _ in range(rng.randint(3, 12))), "en"
+    if kind < 0.7:
+        return "".join(rng.choice(KANA) for _ in range(rng.randint(2, 6))), "ja"
+    if kind < 0.9:
+        return "".join(rng.choice(HANZI) for _ in range(rng.randint(1, 4))), "zh"
+    return "".join(chr(rng.randint(HANGUL_START, HANGUL_END)) for _ in range(rng.randint(1, 4))), "ko"
+
+
+def random_sentence(rng, word):
+    filler = [random_word(rng)[0] for _ in range(rng.randint(4, 12))]
+    filler.insert(rng.randint(0, len(filler)), word)
+    return " ".join(filler)
+
+
+def build(path, count, seed=1):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        rows = []
+        for i in range(1, count + 1):
+            word, language = random_word(rng)
+            # Make sure the benchmark queries exist
+            if i % (count // len(QUERIES)) == 0:
+                word = QUERIES[i * len(QUERIES) // count - 1]
+            translation = "".join(chr(rng.randint(HANGUL_START, HANGUL_END)) for _ in range(rng.randint(1, 5)))
+            rows.append({"id": i, "original_word": word, "translated_word": translation,
+                         "context_sentence": random_sentence(rng, word), "language": language})
+        conn.execute(text("""
+            INSERT INTO words (id, original_word, translated_word, context_sentence, language, created_at)
+            VALUES (:id, :original_word, :translated_word, :context_sentence, :language, CURRENT_TIMESTAMP)
+        """), rows)
+        conn.execute(word_search.INSERT_SQL, [
+            {"id": r["id"], "original_word": segment(r["original_word"]),
+             "translated_word": segment(r["translated_word"]), "context_sentence": segment(r["context_sentence"])}
+            for r in rows
+        ])
+        conn.execute(text("INSERT INTO words_fts (words_fts) VALUES ('optimize')"))
+    return engine
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        engine = build(os.path.join(tmp, "bench.db"), args.words)
+        print(f"Built {args.words} words in {time.perf_counter() - started:.1f}s")
+        Session = sessionmaker(bind=engine)
+
+        by_length = {}
+        with Session() as db:
+            for _ in range(args.rounds):
+                for query in QUERIES:
+                    for end in range(1, len(query) + 1):
+                        statement, params = word_search.search_statement(query[:end], 20)
+                        t = time.perf_counter()
+                        db.execute(statement, params).all()
+                        by_length.setdefault(min(end, 4), []).append(time.perf_counter() - t)
+        engine.dispose()
+
+    print(f"{'typed chars':<13}{'queries':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for length, latencies in sorted(by_length.items()):
+        label = f"{length}+" if length == 4 else str(length)
+        print(f"{label:<13}{len(latencies):>9}"
+              f"{statistics.median(latencies) * 1000:>10.2f}"
+              f"{percentile(latencies, 99) * 1000:>10.2f}"
+              f"{max(latencies) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-ins for the dictionary lookup's upstream services.
+
+Serves Naver dictionary search, Google Translate (mobile page) and
+dictionaryapi.dev on one port, with configurable latency, error rate and
+"no such word" rate per source:
+
+- naver:    the recorded Naver responses in fixtures/naver_<lang>.json, for any query
+- google:   a page with the translation in <div class="result-container">, the
+            element deep_translator reads
+- freedict: dictionaryapi.dev's entry layout for the queried word, 404 for misses
+
+Latency is log-normal around the given median, so there's a tail like real
+services have. GET /_stats returns request counts per source.
+
+    python -m backend.benchmarks.fake_upstream --port 8765 --latency naver=80 --error-rate google=0.05
+
+and start the app with
+
+    NAVER_URL=http://127.0.0.1:8765/naver/{lang}/search
+    GOOGLE_TRANSLATE_URL=http://127.0.0.1:8765/google/m
+    FREEDICT_URL=http://127.0.0.1:8765/freedict/{word}
+
+(backend/benchmarks/load_lookup.py does all of this itself.)
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+from collections import Counter
+
+from fastapi import FastAPI, Response
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SOURCES = ("naver", "google", "freedict")
+LANGS = ("en", "ja", "zh")
+# Naver's answer for a query it has no entry for
+NAVER_EMPTY = b'{"searchResultMap": {"searchResultListMap": {}}}'
+
+DEFAULTS = {
+    "latency": {"naver": 120.0, "google": 150.0, "freedict": 200.0},
+    "error_rate": {"naver": 0.0, "google": 0.0, "freedict": 0.0},
+    "miss_rate": {"naver": 0.05, "google": 0.0, "freedict": 0.3},
+}
+
+
+def urls(host, port):
+    # Environment for an app that should use this server
+    base = f"http://{host}:{port}"
+    return {
+        "NAVER_URL": f"{base}/naver/{{lang}}/search",
+        "GOOGLE_TRANSLATE_URL": f"{base}/google/m",
+        "FREEDICT_URL": f"{base}/freedict/{{word}}",
+    }
+
+
+def google_page(text):
+    translation = f"번역 {text}".replace("<", "&lt;")
+    return f'<html><body><div class="result-container">{translation}</div></body></html>'
+
+
+def freedict_entry(word):
+    return [{
+        "word": word,
+        "phonetic": f"/{word}/",
+        "meanings": [
+            {"partOfSpeech": "noun", "definitions": [
+                {"definition": f"A {word} as a thing.", "example": f"The {word} is here."},
+                {"definition": f"Something like a {word}."},
+                {"definition": f"A third sense of {word}."},
+            ]},
+            {"partOfSpeech": "verb", "definitions": [{"definition": f"To {word} something."}]},
+        ],
+    }]
+
+
+def build_app(settings, seed=None):
+    """
+    settings: {"latency": {source: median ms}, "error_rate": {source: 0-1}, "miss_rate": {source: 0-1}}
+    """
+    rng = random.Random(seed)
+    naver_payloads = {}
+    for lang in LANGS:
+        with open(os.path.join(FIXTURE_DIR, f"naver_{lang}.json"), "rb") as f:
+            naver_payloads[lang] = f.read()
+
+    app = FastAPI()
+    app.state.stats = {source: Counter() for source in SOURCES}
+
+    async def respond(source):
+        # (status, miss) after the simulated latency
+        stats = app.state.stats[source]
+        stats["requests"] += 1
+        median = settings["latency"][source]
+        if median > 0:
+            await asyncio.sleep(rng.lognormvariate(math.log(median), 0.5) / 1000)
+        if rng.random() < settings["error_rate"][source]:
+            stats["errors"] += 1
+            return 500, False
+        if rng.random() < settings["miss_rate"][source]:
+            stats["misses"] += 1
+            return 200, True
+        return 200, False
+
+    @app.get("/naver/{lang}/search")
+    async def naver(lang: str, query: str = ""):
+        status, miss = await respond("naver")
+        if status != 200:
+            return Response(status_code=status)
+        body = NAVER_EMPTY if miss else naver_payloads.get(lang, naver_payloads["en"])
+        return Response(body, media_type="application/json")
+
+    @app.get("/google/m")
+    async def google(q: str = ""):
+        status, _ = await respond("google")
+        if status != 200:
+            return Response(status_code=status)
+        return Response(google_page(q), media_type="text/html; charset=utf-8")
+
+    @app.get("/freedict/{word}")
+    async def freedict(word: str):
+        status, miss = await respond("freedict")
+        if status != 200:
+            return Response(status_code=status)
+        if miss:
+            return Response(json.dumps({"title": "No Definitions Found"}), status_code=404, media_type="application/json")
+        return Response(json.dumps(freedict_entry(word)), media_type="application/json")
+
+    @app.get("/_stats")
+    async def stats():
+        return {source: dict(counts) for source, counts in app.state.stats.items()}
+
+    return app
+
+
+def parse_settings(args):
+    settings = {name: dict(values) for name, values in DEFAULTS.items()}
+    for name in settings:
+        for item in getattr(args, name) or []:
+            source, _, value = item.partition("=")
+            if source not in SOURCES:
+                raise SystemExit(f"--{name.replace('_', '-')}: unknown source '{source}', expected one of {SOURCES}")
+            settings[name][source] = float(value)
+    return settings
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", action="append", metavar="SOURCE=MS",
+                        help=f"median latency per source (default {DEFAULTS['latency']})")
+    parser.add_argument("--error-rate", action="append", metavar="SOURCE=P", help="share of HTTP 500 answers")
+    parser.add_argument("--miss-rate", action="append", metavar="SOURCE=P",
+                        help=f"share of 'no such word' answers (default {DEFAULTS['miss_rate']})")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int)
+    add_arguments(parser)
+    args = parser.parse_args()
+    settings = parse_settings(args)
+    print(json.dumps(settings))
+    uvicorn.run(build_app(settings, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
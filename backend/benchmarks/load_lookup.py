@@ -0,0 +1,250 @@
+"""
+Load test for GET /dictionary/lookup, against local upstream stand-ins.
+
+Starts fake_upstream.py in a process of its own, points the lookup pipeline at
+it (NAVER_URL, GOOGLE_TRANSLATE_URL, FREEDICT_URL), then has --concurrency
+clients look up words drawn from a Zipf distribution: a few words come up all
+the time, most rarely, as in real reading. Words are mostly English, with
+Japanese and Chinese ones and some whole phrases (which go straight to Google).
+
+Reports p50/p95/p99 latency, throughput, the word cache and raw upstream cache
+hit rates (/dictionary/cache), which source answered, and the requests the
+upstreams actually received.
+
+The app runs in this process with fresh caches (UPSTREAM_CACHE_PATH and
+OFFLINE_DICT_PATH in a temporary directory) and without the per-source rate
+limits, unless --keep-limits; or pass --url to load a server that is already
+running (started with the URLs fake_upstream.py prints).
+
+    python -m backend.benchmarks.load_lookup --requests 2000 --concurrency 16
+    python -m backend.benchmarks.load_lookup --duration 30 --error-rate naver=0.1 --latency google=400
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+from backend.benchmarks import fake_upstream
+from backend.benchmarks.synthetic_books import WORDS, HANZI, KANA
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SYLLABLES = "ba be ca co da de fa ge hi jo ka ke la li ma mo na ne pa po ra re sa so ta te va vo wa ze".split()
+# Share of lookups per kind
+MIX = {"en": 0.75, "ja": 0.1, "zh": 0.1, "phrase": 0.05}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class WordSampler:
+    """
+    Words of each kind ranked 1..vocabulary, drawn with probability ~ 1/rank**exponent.
+    """
+
+    def __init__(self, vocabulary=5000, exponent=1.1, seed=1):
+        self.rng = random.Random(seed)
+        weights = [1 / rank ** exponent for rank in range(1, vocabulary + 1)]
+        total = sum(weights)
+        self.cumulative = []
+        running = 0.0
+        for weight in weights:
+            running += weight / total
+            self.cumulative.append(running)
+        builder = random.Random(seed)
+        self.words = {
+            "en": list(dict.fromkeys(WORDS)) + [self._pseudo_word(builder) for _ in range(vocabulary)],
+            "ja": ["".join(builder.choice(HANZI) for _ in range(builder.randint(1, 2))) +
+                   "".join(builder.choice(KANA) for _ in range(builder.randint(1, 3))) for _ in range(vocabulary)],
+            "zh": ["".join(builder.choice(HANZI) for _ in range(builder.randint(1, 3))) for _ in range(vocabulary)],
+        }
+        self.kinds = list(MIX)
+        self.kind_weights = list(MIX.values())
+
+    @staticmethod
+    def _pseudo_word(rng):
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+    def _ranked(self, kind):
+        index = min(bisect.bisect_left(self.cumulative, self.rng.random()), len(self.cumulative) - 1)
+        return self.words[kind][index]
+
+    def sample(self):
+        kind = self.rng.choices(self.kinds, self.kind_weights)[0]
+        if kind == "phrase":
+            return "phrase", " ".join(self._ranked("en") for _ in range(self.rng.randint(5, 12)))
+        return kind, self._ranked(kind)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_upstream(args, port):
+    command = [sys.executable, "-m", "backend.benchmarks.fake_upstream", "--port", str(port), "--seed", str(args.seed)]
+    for flag in ("latency", "error_rate", "miss_rate"):
+        for value in getattr(args, flag) or []:
+            command += [f"--{flag.replace('_', '-')}", value]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/_stats", timeout=1)
+            return process
+        except httpx.TransportError:
+            if process.poll() is not None:
+                raise SystemExit("fake upstream server exited")
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("fake upstream server did not start")
+
+
+def in_process_client(tmp, keep_limits):
+    # Settings are read when backend.config is first imported, so set them before the app is
+    os.environ["UPSTREAM_CACHE_PATH"] = os.path.join(tmp, "upstream.db")
+    os.environ["OFFLINE_DICT_PATH"] = os.path.join(tmp, "offline.db")
+    if not keep_limits:
+        for source in ("NAVER", "GOOGLE", "FREEDICT"):
+            os.environ[f"{source}_RATE"] = "100000"
+            os.environ[f"{source}_BURST"] = "100000"
+    from backend.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app")
+
+
+async def drive(client, sampler, concurrency, requests, duration):
+    latencies = {kind: [] for kind in MIX}
+    statuses = Counter()
+    sent = 0
+    deadline = time.monotonic() + duration if duration else None
+
+    async def worker():
+        nonlocal sent
+        while (deadline is None and sent < requests) or (deadline is not None and time.monotonic() < deadline):
+            sent += 1
+            kind, word = sampler.sample()
+            started = time.perf_counter()
+            try:
+                response = await client.get("/dictionary/lookup", params={"word": word}, timeout=60)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def delta(after, before):
+    # Counters that went up during the run (nested dicts included)
+    if isinstance(after, dict):
+        return {key: delta(value, (before or {}).get(key)) for key, value in after.items()
+                if isinstance(value, (dict, int)) and not isinstance(value, bool)}
+    return after - (before or 0)
+
+
+def hit_rate(hits, *others):
+    total = hits + sum(others)
+    return round(hits / total, 4) if total else None
+
+
+def report(latencies, statuses, seconds, cache, sources, upstream):
+    everything = [value for values in latencies.values() for value in values]
+    lines = [
+        f"{len(everything)} lookups in {seconds:.1f} s: {len(everything) / seconds:.1f} req/s, "
+        f"status {dict(statuses)}",
+        f"{'':<8}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for kind, values in [("all", everything)] + list(latencies.items()):
+        if values:
+            lines.append(f"{kind:<8}{len(values):>8}{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+                         f"{percentile(values, 99) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+    word, raw = cache["word_cache"], cache["upstream_cache"]
+    lines.append(f"word cache hit rate {hit_rate(word['hits'], word['misses'])}, "
+                 f"upstream cache hit rate {hit_rate(raw['hits'], raw['misses'], raw['expired'])}")
+    lines.append(f"answered by {cache['answered_by']}")
+    lines.append("upstream requests " + ", ".join(
+        f"{name} {counts.get('requests', 0)} ({counts.get('errors', 0)} errors)" for name, counts in upstream.items()))
+    lines.append("skipped by breaker/rate limit " + ", ".join(f"{name} {status['skipped']}" for name, status in sources.items()))
+    return "\n".join(lines)
+
+
+async def run(args):
+    port = free_port()
+    fake = start_fake_upstream(args, port)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.url:
+                client = httpx.AsyncClient(base_url=args.url)
+                print(f"Fake upstream on port {port}; start {args.url} with:")
+                for name, value in fake_upstream.urls("127.0.0.1", port).items():
+                    print(f"    {name}={value}")
+                input("Press Enter when it is running...")
+            else:
+                os.environ.update(fake_upstream.urls("127.0.0.1", port))
+                client = in_process_client(tmp, args.keep_limits)
+
+            async with client:
+                cache_before = (await client.get("/dictionary/cache")).json()
+                sources_before = (await client.get("/dictionary/sources")).json()
+                sampler = WordSampler(args.vocabulary, args.zipf, args.seed)
+                latencies, statuses, seconds = await drive(client, sampler, args.concurrency, args.requests, args.duration)
+                cache = delta((await client.get("/dictionary/cache")).json(), cache_before)
+                sources = delta((await client.get("/dictionary/sources")).json(), sources_before)
+            upstream = httpx.get(f"http://127.0.0.1:{port}/_stats").json()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    print(report(latencies, statuses, seconds, cache, sources, upstream))
+    if args.output:
+        everything = [value for values in latencies.values() for value in values]
+        with open(args.output, "w") as f:
+            json.dump({
+                "requests": len(everything),
+                "seconds": round(seconds, 3),
+                "throughput": round(len(everything) / seconds, 2),
+                "latency_ms": {kind: {f"p{pct}": round(percentile(values, pct) * 1000, 2) for pct in (50, 95, 99)}
+                               for kind, values in [("all", everything)] + list(latencies.items()) if values},
+                "statuses": {str(status): count for status, count in statuses.items()},
+                "cache": cache,
+                "sources": sources,
+                "upstream": upstream,
+                "settings": vars(args),
+            }, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of --requests")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--vocabulary", type=int, default=5000, help="distinct words per language")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the word distribution")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-limits", action="store_true", help="keep the per-source rate limits (NAVER_RATE, ...)")
+    parser.add_argument("--url", help="load a running server instead of the app in this process")
+    parser.add_argument("--output", help="also write the results as JSON")
+    fake_upstream.add_arguments(parser)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
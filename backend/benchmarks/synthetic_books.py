@@ -0,0 +1,300 @@
+"""
+Synthetic books for benchmarks and tests.
+
+Writes EPUB, DOCX, PDF and TXT files of a configurable size, with paragraphs
+mixing English, Chinese, Japanese and Korean text, and JPEG images (including
+a cover). Output is deterministic for a given seed, so results can be
+compared between commits.
+
+    python -m backend.benchmarks.synthetic_books /tmp/books --size medium
+"""
+import argparse
+import io
+import os
+import random
+import zlib
+
+WORDS = (
+    "the reader turned a page and found another chapter waiting with more words than before "
+    "history economy language memory river mountain winter letter government science music"
+).split()
+HANZI = "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年得就那要下以生会自着去之过家学对可她里后小么心多天而能好都然没日于起还发成事只作当想看文无开手十用主行方又如前所本见经头面公同三已老从动两长知民样现分将外但身些与高意进把法此实回二理美点月明其种声全工己话儿者向情部正名定女问力机给等几很业最间新什打便位因重被走电四第门相次东政海口使教西再平真听世气信北少关并内加化由却代军产入先山五太水万市眼体别处总才场师书比住员九笑性通目华报立马命张活难神数件安表原车白应路期叫死常提感金何更反合放做系计或司利受光王果亲界及今京务制解各任至清物台象记边共风战干接它许八特觉望直服毛林题建南度统色字请交爱让认算论百吃义科怎元社术结六功指思非流每青管夫连远资队跟带花快条院变联言权往展该领传近留红治决周保达办运武半候七必城父强步完革深区即求品士转量空甚众技轻程告江语英基派满式李息写呢识极令黄德收脸钱党倒未持取设始版双历越史商千片容研像找友孩站广改议形委早房音火际则首单据导影失拿网香似斯专石若兵弟谁校读志飞观争究包组造落视济喜离虽坏兴切标"
+KANA = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわんがぎぐげござじずぜぞだでどばびぶべぼ"
+HANGUL_START, HANGUL_END = 0xAC00, 0xD7A3
+
+# Per format: how much of everything each size preset writes
+SIZES = {
+    "small": {"chapters": 20, "paragraphs": 20, "docx_paragraphs": 200, "pdf_pages": 20, "txt_paragraphs": 500},
+    "medium": {"chapters": 100, "paragraphs": 40, "docx_paragraphs": 1000, "pdf_pages": 100, "txt_paragraphs": 5000},
+    "large": {"chapters": 300, "paragraphs": 60, "docx_paragraphs": 5000, "pdf_pages": 400, "txt_paragraphs": 30000},
+}
+
+
+def paragraph(rng, cjk=0.3):
+    """
+    One paragraph: English most of the time, Chinese/Japanese/Korean for a `cjk` share.
+    """
+    if rng.random() >= cjk:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(30, 90))]
+        words[0] = words[0].capitalize()
+        return " ".join(words) + "."
+    kind = rng.random()
+    sentences = []
+    for _ in range(rng.randint(2, 5)):
+        length = rng.randint(10, 30)
+        if kind < 0.4:
+            sentences.append("".join(rng.choice(HANZI) for _ in range(length)) + "。")
+        elif kind < 0.7:
+            sentences.append("".join(rng.choice(KANA if rng.random() < 0.6 else HANZI) for _ in range(length)) + "。")
+        else:
+            words = ["".join(chr(rng.randint(HANGUL_START, HANGUL_END)) for _ in range(rng.randint(1, 4))) for _ in range(length // 3)]
+            sentences.append(" ".join(words) + ".")
+    return "".join(sentences) if kind < 0.7 else " ".join(sentences)
+
+
+def image(rng, width=320, height=240):
+    """JPEG bytes: a tinted gradient with noise, so it doesn't compress to nothing."""
+    from PIL import Image, ImageChops
+
+    tint = Image.new("RGB", (width, height), (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 24 + rng.randint(0, 24)).convert("RGB")
+    img = ImageChops.add(ImageChops.multiply(tint, gradient), noise, scale=1.5)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=80)
+    return out.getvalue()
+
+
+def write_epub(path, chapters=20, paragraphs=20, images_every=10, cjk=0.3, seed=1):
+    """
+    EPUB with a cover, `chapters` XHTML documents of `paragraphs` paragraphs each,
+    an inline image every `images_every` paragraphs, plus the <style>/<script>
+    tags real books carry.
+    """
+    from ebooklib import epub
+
+    rng = random.Random(seed)
+    book = epub.EpubBook()
+    book.set_identifier(f"synthetic-{seed}")
+    book.set_title("Synthetic Book")
+    book.set_language("en")
+    book.add_author("Benchmark")
+    book.set_cover("images/cover.jpg", image(rng, 400, 600))
+
+    figures = [f"images/figure_{i}.jpg" for i in range(4)]
+    for name in figures:
+        book.add_item(epub.EpubItem(uid=os.path.basename(name), file_name=name, media_type="image/jpeg", content=image(rng)))
+
+    items = []
+    for number in range(1, chapters + 1):
+        body = [f"<h1>Chapter {number}</h1>", "<style>p { margin: 0 }</style>"]
+        for index in range(paragraphs):
+            body.append(f'<p id="c{number}p{index}">{paragraph(rng, cjk)} <em>{rng.choice(WORDS)}</em> &amp; more.</p>')
+            if images_every and index % images_every == 0:
+                body.append(f'<div class="figure"><img src="{rng.choice(figures)}" alt="figure"/></div>')
+        body.append("<script>console.log('chapter');</script>")
+        item = epub.EpubHtml(title=f"Chapter {number}", file_name=f"chapter_{number}.xhtml", lang="en")
+        item.content = "".join(body)
+        book.add_item(item)
+        items.append(item)
+
+    book.toc = items
+    book.spine = ["nav"] + items
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(path, book)
+    return path
+
+
+def write_docx(path, paragraphs=200, images_every=100, cjk=0.3, seed=1):
+    """
+    DOCX with a cover image first, headings every 20 paragraphs, an image every
+    `images_every` paragraphs and one table.
+    """
+    import docx
+    from docx.shared import Inches
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    document.add_picture(io.BytesIO(image(rng, 400, 600)), width=Inches(3))
+    for index in range(paragraphs):
+        if index % 20 == 0:
+            document.add_heading(f"Section {index // 20 + 1}", level=1)
+        document.add_paragraph(paragraph(rng, cjk))
+        if images_every and index and index % images_every == 0:
+            document.add_picture(io.BytesIO(image(rng)), width=Inches(2))
+        if index == paragraphs // 2:
+            table = document.add_table(rows=3, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = paragraph(rng, cjk)[:60]
+    document.save(path)
+    return path
+
+
+def write_txt(path, paragraphs=500, cjk=0.3, seed=1, encoding="utf-8"):
+    rng = random.Random(seed)
+    with open(path, "w", encoding=encoding) as f:
+        for _ in range(paragraphs):
+            text = paragraph(rng, cjk)
+            # Hard-wrapped lines inside a paragraph, like many plain-text books
+            if len(text) > 120 and rng.random() < 0.5:
+                text = text[:len(text) // 2] + "\n" + text[len(text) // 2:]
+            f.write(text + "\n\n")
+    return path
+
+
+# --- PDF ---
+# There's no PDF writer among the dependencies, so this writes the file by hand:
+# one Type0 font with Identity-H encoding (2-byte code = Unicode code point) and a
+# ToUnicode map, so pdfminer extracts Latin and CJK text alike, and JPEG images
+# as DCTDecode XObjects. The font isn't embedded; only text extraction matters here.
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+
+
+def _pdf_text(text):
+    # Identity-H: each character is its (BMP) code point as two bytes
+    return "<" + "".join(f"{min(ord(ch), 0xFFFF):04X}" for ch in text) + ">"
+
+
+def _to_unicode(high_bytes):
+    ranges = "\n".join(f"<{b:02X}00> <{b:02X}FF> <{b:02X}00>" for b in sorted(high_bytes))
+    return (
+        "/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n"
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+        "/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n"
+        "1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n"
+        f"{len(high_bytes)} beginbfrange\n{ranges}\nendbfrange\n"
+        "endcmap\nCMapName currentdict /CMap defineresource pop\nend\nend\n"
+    ).encode("ascii")
+
+
+def _wrap(text, width):
+    # Breaks at the last space when there is one (English, Korean), anywhere otherwise (Chinese,
+    # Japanese); CJK characters count about twice as wide as Latin ones
+    lines, line = [], ""
+    for ch in text:
+        line += ch
+        if sum(2 if ord(c) > 0x2E80 else 1 for c in line) > width:
+            cut = line.rfind(" ")
+            cut = cut if cut > 0 else len(line) - 1
+            lines.append(line[:cut].strip())
+            line = line[cut:].lstrip()
+    if line.strip():
+        lines.append(line.strip())
+    return lines
+
+
+def write_pdf(path, pages=20, images_every=10, cjk=0.3, seed=1):
+    """
+    PDF of `pages` pages of wrapped paragraphs, a cover image on page 1 and an
+    image every `images_every` pages.
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    def stream(header, data):
+        return b"<< " + header + b" /Length " + str(len(data)).encode() + b" >>\nstream\n" + data + b"\nendstream"
+
+    catalog = add(None)
+    pages_id = add(None)
+    font = add(None)
+    cid_font = add(None)
+    descriptor = add(b"<< /Type /FontDescriptor /FontName /SyntheticSans /Flags 4 /FontBBox [0 -200 1000 900] "
+                     b"/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 700 /StemV 80 >>")
+    cover = add(None)
+    figure = add(None)
+    cover_jpeg, figure_jpeg = image(rng, 400, 600), image(rng)
+    objects[cover - 1] = stream(b"/Type /XObject /Subtype /Image /Width 400 /Height 600 /ColorSpace /DeviceRGB "
+                                b"/BitsPerComponent 8 /Filter /DCTDecode", cover_jpeg)
+    objects[figure - 1] = stream(b"/Type /XObject /Subtype /Image /Width 320 /Height 240 /ColorSpace /DeviceRGB "
+                                 b"/BitsPerComponent 8 /Filter /DCTDecode", figure_jpeg)
+
+    high_bytes = set()
+    page_ids = []
+    for number in range(pages):
+        ops = []
+        y = PAGE_HEIGHT - 60
+        if number == 0:
+            ops.append(f"q 300 0 0 450 148 {PAGE_HEIGHT - 510} cm /Cover Do Q")
+            y -= 470
+        elif images_every and number % images_every == 0:
+            ops.append(f"q 240 0 0 180 178 {PAGE_HEIGHT - 240} cm /Figure Do Q")
+            y -= 200
+        ops.append("BT /F1 10 Tf")
+        while y > 60:
+            for line in _wrap(paragraph(rng, cjk), 95):
+                if y <= 60:
+                    break
+                high_bytes.update(min(ord(ch), 0xFFFF) >> 8 for ch in line)
+                ops.append(f"1 0 0 1 50 {y} Tm {_pdf_text(line)} Tj")
+                y -= 14
+            y -= 8
+        ops.append("ET")
+        content = zlib.compress("\n".join(ops).encode("ascii"))
+        content_id = add(stream(b"/Filter /FlateDecode", content))
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font} 0 R >> /XObject << /Cover {cover} 0 R /Figure {figure} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode("ascii")
+        ))
+
+    to_unicode = add(stream(b"", _to_unicode(high_bytes)))
+    objects[font - 1] = (f"<< /Type /Font /Subtype /Type0 /BaseFont /SyntheticSans /Encoding /Identity-H "
+                         f"/DescendantFonts [{cid_font} 0 R] /ToUnicode {to_unicode} 0 R >>").encode("ascii")
+    objects[cid_font - 1] = (f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /SyntheticSans "
+                             f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                             f"/FontDescriptor {descriptor} 0 R /DW 600 >>").encode("ascii")
+    objects[pages_id - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] "
+                             f"/Count {len(page_ids)} >>").encode("ascii")
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode("ascii")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii"))
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode("ascii"))
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii"))
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+    return path
+
+
+def generate(directory, size="small", cjk=0.3, seed=1):
+    """
+    One book per format for a size preset. Returns {format: path}.
+    """
+    preset = SIZES[size]
+    os.makedirs(directory, exist_ok=True)
+    name = os.path.join(directory, f"synthetic-{size}-{seed}")
+    return {
+        "epub": write_epub(f"{name}.epub", preset["chapters"], preset["paragraphs"], cjk=cjk, seed=seed),
+        "docx": write_docx(f"{name}.docx", preset["docx_paragraphs"], cjk=cjk, seed=seed),
+        "pdf": write_pdf(f"{name}.pdf", preset["pdf_pages"], cjk=cjk, seed=seed),
+        "txt": write_txt(f"{name}.txt", preset["txt_paragraphs"], cjk=cjk, seed=seed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--cjk", type=float, default=0.3, help="share of CJK paragraphs")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    for fmt, path in generate(args.directory, args.size, args.cjk, args.seed).items():
+        print(f"{fmt:<5} {os.path.getsize(path) / 1e6:8.2f} MB  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Parsed chapter HTML, cached on disk per book.
+
+Parsing a large EPUB takes seconds, and the result only changes when the file
+does. Each book gets a directory per file version (mtime + size):
+
+    backend/cache/chapters/<book_id>/<mtime_ns>-<size>/
+        meta.json         title, language and the chapter list
+        1.html, 1.html.gz, 1.html.br, 2.html, ...
+
+Chapters are 1-based, like the `chapter-N` ids of the reader page. The .gz/.br
+copies are written when the cache is built (on upload, or by the CLI below),
+so GET /reader/{id}/chapters/{n} serves them without compressing anything.
+
+    python -m backend.chapter_cache           # build missing/stale caches, drop deleted books
+    python -m backend.chapter_cache --rebuild # rebuild everything
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from .config import CHAPTER_CACHE_DIR
+from .compression import compress_file
+from .parsers import parse_book
+
+
+# Directories of builds in progress, next to the versions they will become
+TEMP_PREFIX = ".build-"
+
+
+def book_dir(book_id):
+    return os.path.join(CHAPTER_CACHE_DIR, str(book_id))
+
+
+def version_dir(book_id, file_path):
+    # None when the book file is gone
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.join(book_dir(book_id), f"{stat_result.st_mtime_ns}-{stat_result.st_size}")
+
+
+def image_base_url(book_id):
+    return f"/reader/{book_id}/images"
+
+
+def is_built(book_id, file_path):
+    directory = version_dir(book_id, file_path)
+    return directory is not None and os.path.exists(os.path.join(directory, "meta.json"))
+
+
+def build(book_id, file_type, file_path, content=None):
+    """
+    Write the cache for the current version of the file, with precompressed copies,
+    and remove older versions. Returns the parsed content (None if unreadable).
+    """
+    directory = version_dir(book_id, file_path)
+    if directory is None:
+        return None
+    if content is None:
+        content = parse_book(file_type, file_path, image_base_url(book_id))
+    if not content:
+        return None
+
+    # Written to a directory of its own and renamed, so readers never see half a cache
+    # and builds running at the same time (upload, first open, the CLI) don't share files
+    os.makedirs(book_dir(book_id), exist_ok=True)
+    temp = tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=book_dir(book_id))
+    try:
+        chapters = []
+        for index, chapter in enumerate(content["chapters"], start=1):
+            path = os.path.join(temp, f"{index}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(chapter["content"])
+            compress_file(path)
+            chapters.append({key: value for key, value in chapter.items() if key != "content"})
+        meta = {key: value for key, value in content.items() if key != "chapters"}
+        meta["chapters"] = chapters
+        with open(os.path.join(temp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        _publish(temp, directory)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+    for name in os.listdir(book_dir(book_id)):
+        path = os.path.join(book_dir(book_id), name)
+        if path != directory and not name.startswith(TEMP_PREFIX):
+            shutil.rmtree(path, ignore_errors=True)
+    return content
+
+
+def _publish(temp, directory):
+    # rename() won't replace a directory that has files: move the current build aside first
+    # (a rebuild). If another build of the same version is published in between, it wins;
+    # its files are the same.
+    try:
+        os.rename(temp, directory)
+        return
+    except OSError:
+        pass
+    old = tempfile.mkdtemp(prefix=TEMP_PREFIX, dir=os.path.dirname(directory))
+    try:
+        try:
+            os.replace(directory, old)
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename(temp, directory)
+        except OSError:
+            if not os.path.exists(os.path.join(directory, "meta.json")):
+                raise
+    finally:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_meta(book_id, file_path):
+    """
+    Title, language and the chapter list without their HTML, or None on a miss.
+    The reader page is rendered from this and fetches the chapters one by one.
+    """
+    directory = version_dir(book_id, file_path)
+    if directory is None:
+        return None
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load(book_id, file_path):
+    """
+    The parsed content from the cache, in the shape parse_book returns, or None on a miss.
+    """
+    content = load_meta(book_id, file_path)
+    if content is None:
+        return None
+    directory = version_dir(book_id, file_path)
+    try:
+        for index, chapter in enumerate(content["chapters"], start=1):
+            with open(os.path.join(directory, f"{index}.html"), encoding="utf-8") as f:
+                chapter["content"] = f.read()
+    except (OSError, ValueError):
+        return None
+    return content
+
+
+def chapter_path(book_id, file_path, chapter_index):
+    # Path of one cached chapter (1-based), or None if it isn't cached
+    directory = version_dir(book_id, file_path)
+    if directory is None:
+        return None
+    path = os.path.join(directory, f"{chapter_index}.html")
+    return path if os.path.exists(path) else None
+
+
+def remove(book_id):
+    shutil.rmtree(book_dir(book_id), ignore_errors=True)
+
+
+def sync_library(books, rebuild=False):
+    """
+    Build the cache of new or changed books and drop the ones that no longer exist.
+    `books` is an iterable of (id, file_type, file_path).
+    """
+    seen = set()
+    built = 0
+    for book_id, file_type, file_path in books:
+        seen.add(str(book_id))
+        if not os.path.exists(file_path):
+            print(f"Skipping book {book_id}: {file_path} not found")
+            continue
+        if not rebuild and is_built(book_id, file_path):
+            continue
+        if build(book_id, file_type, file_path) is not None:
+            print(f"Cached book {book_id}")
+            built += 1
+
+    stale = [name for name in os.listdir(CHAPTER_CACHE_DIR) if name not in seen] if os.path.isdir(CHAPTER_CACHE_DIR) else []
+    for name in stale:
+        remove(name)
+    return built, len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='rebuild caches even if the book file is unchanged')
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    from . import models
+
+    with SessionLocal() as db:
+        books = db.query(models.Book.id, models.Book.file_type, models.Book.file_path).all()
+    built, removed = sync_library(books, rebuild=args.rebuild)
+    print(f"Cached {built} books, removed {removed}, cache at {CHAPTER_CACHE_DIR}")
+    return built
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() is not None else 1)
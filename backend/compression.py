@@ -0,0 +1,233 @@
+"""
+Response compression.
+
+- CompressionMiddleware compresses dynamic responses (the reader page, JSON
+  lists, NDJSON streams) with brotli or gzip, whichever the client prefers.
+- PrecompressedStaticFiles serves the .br/.gz files written next to static
+  assets by `python -m backend.precompress`, so the same bytes aren't
+  compressed again on every request.
+- The chapter cache (chapter_cache.py) stores its chapters precompressed too,
+  through compress_file().
+
+brotli is optional: without it everything falls back to gzip.
+"""
+import gzip
+import mimetypes
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+
+from .config import COMPRESS_MIN_BYTES, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Best first; brotli only when installed
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Worth compressing. Images, fonts, archives and the gzip export are already compressed.
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml",
+)
+
+
+def is_compressible(content_type):
+    return (content_type or "").startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding, available=ENCODINGS):
+    """
+    The first of `available` the Accept-Encoding header allows, or None.
+    q=0 excludes an encoding; "*" allows any that isn't listed.
+    """
+    if not accept_encoding:
+        return None
+    allowed = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        allowed[name.strip().lower()] = quality
+    for encoding in available:
+        quality = allowed.get(encoding, allowed.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    # best=True for build-time artifacts: slower, but done once
+    if encoding == "br":
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def compress_file(path, encodings=ENCODINGS):
+    """
+    Write path.br / path.gz next to `path` (best compression), skipping variants
+    that are already up to date or wouldn't be smaller. Returns the encodings written.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    mtime = os.stat(path).st_mtime
+    written = []
+    for encoding in encodings:
+        target = path + EXTENSIONS[encoding]
+        if os.path.exists(target) and os.stat(target).st_mtime >= mtime:
+            continue
+        compressed = compress(data, encoding, best=True)
+        if len(compressed) >= len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        temp = target + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(compressed)
+        os.replace(temp, target)
+        written.append(encoding)
+    return written
+
+
+def precompressed_variant(path, accept_encoding):
+    """
+    (variant path, stat, encoding) of the best up-to-date precompressed copy
+    of `path` the client accepts, or None.
+    """
+    try:
+        source_mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    for encoding in ENCODINGS:
+        if choose_encoding(accept_encoding, (encoding,)) is None:
+            continue
+        variant = path + EXTENSIONS[encoding]
+        try:
+            stat_result = os.stat(variant)
+        except OSError:
+            continue
+        # A variant older than its source is stale (the asset changed since the last build)
+        if stat_result.st_mtime >= source_mtime:
+            return variant, stat_result, encoding
+    return None
+
+
+def precompressed_response(path, accept_encoding, media_type=None, headers=None):
+    # The file itself, or its precompressed copy when the client accepts one
+    media_type = media_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    variant = precompressed_variant(path, accept_encoding)
+    if variant is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    variant_path, stat_result, encoding = variant
+    headers["Content-Encoding"] = encoding
+    return FileResponse(variant_path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        if not is_compressible(mimetypes.guess_type(str(full_path))[0]):
+            return super().file_response(full_path, stat_result, scope, status_code)
+        response = precompressed_response(str(full_path), request_headers.get("accept-encoding"))
+        if self.is_not_modified(response.headers, request_headers):
+            # Each variant has its own ETag, so revalidation works per encoding
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip container rather than a bare zlib stream
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data, more):
+        # Flush after every chunk of a stream so streamed lines still arrive as they're produced
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.flush() if more else self._brotli.finish())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Compresses text-like responses of at least `minimum_size` bytes with the
+    client's preferred encoding. Responses that already have a Content-Encoding
+    (e.g. precompressed files) pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk says how big the response is
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                if "content-encoding" in headers or not is_compressible(headers.get("content-type")):
+                    passthrough = True
+                elif not more and len(body) < self.minimum_size:
+                    headers.add_vary_header("Accept-Encoding")
+                    passthrough = True
+                if passthrough:
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                del headers["content-length"]
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # The body changes, so a strong validator of the uncompressed bytes no longer applies
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["etag"] = f"W/{etag}"
+                await send(start)
+
+            await send({"type": "http.response.body", "body": compressor.chunk(body, more), "more_body": more})
+
+        await self.app(scope, receive, wrapped_send)
+        if start is not None and compressor is None and not passthrough:
+            # No body message at all
+            await send(start)
@@ -0,0 +1,126 @@
+import os
+
+# Runtime settings. Every value can be overridden with an environment variable
+# of the same name, e.g. `set TRANSLATE_CONCURRENCY=8` before run_app.bat.
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# --- Chapter translation ---
+# GoogleTranslator rejects texts longer than 5000 characters, keep some headroom.
+TRANSLATE_BATCH_CHARS = env_int("TRANSLATE_BATCH_CHARS", 4500)
+# Number of batches sent to Google at the same time
+TRANSLATE_CONCURRENCY = env_int("TRANSLATE_CONCURRENCY", 4)
+# Paragraph translations kept in memory
+TRANSLATION_CACHE_LIMIT = env_int("TRANSLATION_CACHE_LIMIT", 5000)
+
+# --- Upstream dictionary sources ---
+# Token buckets: sustained requests per second and burst size for each source
+NAVER_RATE = env_float("NAVER_RATE", 5)
+NAVER_BURST = env_int("NAVER_BURST", 10)
+GOOGLE_RATE = env_float("GOOGLE_RATE", 5)
+GOOGLE_BURST = env_int("GOOGLE_BURST", 10)
+FREEDICT_RATE = env_float("FREEDICT_RATE", 2)
+FREEDICT_BURST = env_int("FREEDICT_BURST", 5)
+# Circuit breakers: consecutive failures before a source is skipped,
+# and how long to wait before letting a single probe request through again
+BREAKER_FAILURE_THRESHOLD = env_int("BREAKER_FAILURE_THRESHOLD", 3)
+BREAKER_RESET_SECONDS = env_float("BREAKER_RESET_SECONDS", 30)
+# Endpoints, overridable to point the lookup pipeline at local stand-ins
+# (see backend/benchmarks/fake_upstream.py). {lang} is en, ja or zh; {word} the query.
+NAVER_URL = os.environ.get("NAVER_URL", "https://{lang}.dict.naver.com/api3/{lang}ko/search")
+GOOGLE_TRANSLATE_URL = os.environ.get("GOOGLE_TRANSLATE_URL", "https://translate.google.com/m")
+FREEDICT_URL = os.environ.get("FREEDICT_URL", "https://api.dictionaryapi.dev/api/v2/entries/en/{word}")
+
+# --- Worker pools ---
+# Upstream HTTP calls (Naver, Google, FreeDictionary)
+IO_POOL_WORKERS = env_int("IO_POOL_WORKERS", 16)
+IO_POOL_QUEUE = env_int("IO_POOL_QUEUE", 64)
+# Book parsing, image and cover extraction. "thread" or "process"
+PARSE_POOL_KIND = os.environ.get("PARSE_POOL_KIND", "thread")
+PARSE_POOL_WORKERS = env_int("PARSE_POOL_WORKERS", 2)
+PARSE_POOL_QUEUE = env_int("PARSE_POOL_QUEUE", 8)
+# EPUBs with at least this many chapters have their chapters transformed by
+# EPUB_PARSE_PROCESSES worker processes (see backend/benchmarks/bench_epub_parse.py)
+EPUB_PARSE_PROCESSES = env_int("EPUB_PARSE_PROCESSES", min(4, os.cpu_count() or 1))
+EPUB_PARALLEL_MIN_CHAPTERS = env_int("EPUB_PARALLEL_MIN_CHAPTERS", 200)
+
+# --- Raw upstream response cache ---
+UPSTREAM_CACHE_PATH = os.environ.get("UPSTREAM_CACHE_PATH", "backend/cache/upstream.db")
+# Cached payloads older than this are fetched again
+UPSTREAM_CACHE_TTL_DAYS = env_float("UPSTREAM_CACHE_TTL_DAYS", 30)
+
+# --- Library full-text search ---
+# FTS5 index of every book's paragraphs; rebuilt from the books with `python -m backend.search_index`
+SEARCH_INDEX_PATH = os.environ.get("SEARCH_INDEX_PATH", "backend/cache/search_index.db")
+
+# --- Offline dictionary store ---
+# Filled by `python -m backend.import_dictionary`, consulted before any network source
+OFFLINE_DICT_PATH = os.environ.get("OFFLINE_DICT_PATH", "backend/dictionaries/offline.db")
+
+# --- Database ---
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./simon_reader.db")
+# "performance": WAL + synchronous=NORMAL + memory-mapped I/O (readers never block writers)
+# "safe": SQLite defaults (rollback journal, full fsync on every commit)
+DB_PROFILE = os.environ.get("DB_PROFILE", "performance")
+DB_MMAP_SIZE = env_int("DB_MMAP_SIZE", 256 * 1024 * 1024)
+DB_CACHE_SIZE_KB = env_int("DB_CACHE_SIZE_KB", 64 * 1024)
+DB_BUSY_TIMEOUT_MS = env_int("DB_BUSY_TIMEOUT_MS", 5000)
+# Connections held open by the pool, and extra ones allowed under bursts.
+# Sized a little above the default worker thread count that runs sync handlers.
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 10)
+
+# --- Reading progress ---
+# Progress updates are kept in memory and written to the database in one batch this often
+PROGRESS_FLUSH_SECONDS = env_float("PROGRESS_FLUSH_SECONDS", 5)
+
+# --- Listings ---
+# Rows per page for the vocabulary/bookmark/library listings and their APIs
+PAGE_SIZE = env_int("PAGE_SIZE", 50)
+MAX_PAGE_SIZE = env_int("MAX_PAGE_SIZE", 500)
+
+# --- Vocabulary export ---
+# Rows fetched from the database and written to the response per chunk
+EXPORT_BATCH_ROWS = env_int("EXPORT_BATCH_ROWS", 1000)
+
+# --- Quiz ---
+QUIZ_SIZE = env_int("QUIZ_SIZE", 10)
+
+# --- Response compression ---
+# Smaller responses aren't worth the CPU (and may grow)
+COMPRESS_MIN_BYTES = env_int("COMPRESS_MIN_BYTES", 1024)
+# Levels for responses compressed on the fly; precompressed artifacts always use the maximum
+GZIP_LEVEL = env_int("GZIP_LEVEL", 6)
+BROTLI_QUALITY = env_int("BROTLI_QUALITY", 4)
+# Parsed chapter HTML of every book, stored with .gz/.br copies; rebuilt with `python -m backend.chapter_cache`
+CHAPTER_CACHE_DIR = os.environ.get("CHAPTER_CACHE_DIR", "backend/cache/chapters")
+
+# --- Request profiling ---
+# With REQUEST_PROFILING=1, requests sent with `X-Profile: 1` or `?profile=1` are
+# sampled and saved as folded stacks (flamegraph.pl, speedscope); see profiling.py
+REQUEST_PROFILING = env_int("REQUEST_PROFILING", 0)
+PROFILES_DIR = os.environ.get("PROFILES_DIR", "backend/cache/profiles")
+PROFILE_INTERVAL_MS = env_float("PROFILE_INTERVAL_MS", 1)
+
+# --- Logging ---
+# JSON lines, one per record, written by a background thread (see logs.py); stderr unless LOG_FILE is set
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE") or None
+# Share of requests logged with the timings of their stages (parse, transform, render, lookup sources)
+TRACE_SAMPLE_RATE = env_float("TRACE_SAMPLE_RATE", 0.01)
+# Requests slower than this, or failing with a 5xx, are always logged (with their stages if sampled)
+SLOW_REQUEST_MS = env_float("SLOW_REQUEST_MS", 1000)
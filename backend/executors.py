@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from . import metrics
+from .config import (
+    IO_POOL_WORKERS, IO_POOL_QUEUE,
+    PARSE_POOL_KIND, PARSE_POOL_WORKERS, PARSE_POOL_QUEUE,
+    EPUB_PARSE_PROCESSES,
+)
+
+
+class PoolBusy(Exception):
+    """Raised instead of queueing when a pool's backlog is full. Served as 503."""
+
+    def __init__(self, pool_name):
+        super().__init__(f"{pool_name} pool is busy")
+        self.pool_name = pool_name
+
+
+class BoundedExecutor:
+    """
+    A thread or process pool that refuses new work once `max_queue` jobs are
+    already waiting for a free worker, so one slow kind of work can't pile up
+    behind (or in front of) everything else.
+    """
+
+    def __init__(self, name, max_workers, max_queue, kind="thread"):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor = None
+        # pending/completed/failed are updated from worker threads too, see _job_done
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created on first use, so importing the app doesn't spawn worker processes
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self.pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise PoolBusy(self.name)
+            self.pending += 1
+
+        job = partial(fn, *args, **kwargs)
+        if self.kind == "thread":
+            # Like asyncio.to_thread: the job sees the request's context (request id, trace; see logs.py)
+            job = partial(contextvars.copy_context().run, job)
+        try:
+            future = self.executor.submit(job)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            raise
+        # Counted off when the job is really over: a caller that gave up (client went
+        # away) doesn't stop a job that's already running
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def snapshot(self):
+        active = min(self.pending, self.max_workers)
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "active": active,
+            "queued": self.pending - active,
+            "utilization": round(active / self.max_workers, 2) if self.max_workers else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+# Network calls to dictionary/translation services
+io_pool = BoundedExecutor("io", IO_POOL_WORKERS, IO_POOL_QUEUE)
+# CPU-heavy book parsing and image extraction
+parse_pool = BoundedExecutor("parse", PARSE_POOL_WORKERS, PARSE_POOL_QUEUE, kind=PARSE_POOL_KIND)
+
+POOLS = {pool.name: pool for pool in (io_pool, parse_pool)}
+
+
+def pools_status():
+    return {name: pool.snapshot() for name, pool in POOLS.items()}
+
+
+@metrics.register_collector
+def _pool_metrics():
+    snapshots = pools_status()
+    return [
+        ("executor_workers", "gauge", "Worker threads/processes of each pool.",
+         [({"pool": name}, snapshot["max_workers"]) for name, snapshot in snapshots.items()]),
+        ("executor_active", "gauge", "Jobs running in each pool.",
+         [({"pool": name}, snapshot["active"]) for name, snapshot in snapshots.items()]),
+        ("executor_queued", "gauge", "Jobs waiting for a free worker in each pool.",
+         [({"pool": name}, snapshot["queued"]) for name, snapshot in snapshots.items()]),
+        ("executor_jobs_total", "counter", "Jobs per pool and outcome (completed, failed, rejected when the queue was full).",
+         [({"pool": name, "outcome": outcome}, snapshot[outcome])
+          for name, snapshot in snapshots.items() for outcome in ("completed", "failed", "rejected")]),
+    ]
+
+
+# Worker processes that one large EPUB's chapters are spread over (epub_parser.transform_chapters).
+# Plain and synchronous: it's used from inside parse jobs, which already run off the event loop.
+_chapter_executor = None
+_chapter_executor_lock = threading.Lock()
+
+
+def chapter_executor(max_workers=EPUB_PARSE_PROCESSES):
+    # max_workers only applies to the first call, which creates the pool
+    global _chapter_executor
+    with _chapter_executor_lock:
+        if _chapter_executor is None:
+            # spawn, not fork: the server process has threads running
+            _chapter_executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _chapter_executor
+
+
+def discard_chapter_executor():
+    # Also after a worker crashed: a broken pool can't be reused, the next call starts a new one
+    global _chapter_executor
+    with _chapter_executor_lock:
+        if _chapter_executor is not None:
+            _chapter_executor.shutdown(wait=False, cancel_futures=True)
+            _chapter_executor = None
+
+
+def shutdown_pools():
+    for pool in POOLS.values():
+        pool.shutdown()
+    discard_chapter_executor()
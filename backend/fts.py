@@ -0,0 +1,38 @@
+import re
+
+# Helpers shared by the SQLite FTS5 indexes (library passages, saved words).
+
+# unicode61 splits on whitespace and punctuation, so an unspaced run of Chinese,
+# Japanese or Korean characters would become a single token that only matches in
+# full. A zero-width space (a separator for unicode61) is put between every such
+# character, both in the indexed text and in queries, so each one is a token and
+# a phrase query of consecutive characters finds any substring.
+CJK_RE = re.compile(r'([\u1100-\u11FF\u3040-\u30FF\u3130-\u318F\u3400-\u4DBF\u4E00-\u9FFF\uAC00-\uD7AF\uF900-\uFAFF])')
+ZWSP = '\u200b'
+ZWSP_RUN_RE = re.compile(ZWSP + '+')
+WORD_CHAR_RE = re.compile(r'\w')
+
+
+def segment(text):
+    return ZWSP_RUN_RE.sub(ZWSP, CJK_RE.sub(ZWSP + r'\1' + ZWSP, text)).strip(ZWSP)
+
+
+def unsegment(text):
+    return text.replace(ZWSP, '')
+
+
+def build_query(query, prefix=False):
+    """
+    Turn free text into an FTS5 query: every whitespace separated term must match,
+    as a phrase, so quotes and operators typed by the user are taken literally.
+    With prefix, the last term may be incomplete (search as you type).
+    """
+    terms = []
+    for term in query.split():
+        # Punctuation-only terms have no tokens and would be an empty phrase
+        if not WORD_CHAR_RE.search(term):
+            continue
+        terms.append('"' + segment(term).replace('"', '""') + '"')
+    if prefix and terms:
+        terms[-1] += "*"
+    return " ".join(terms)
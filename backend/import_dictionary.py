@@ -0,0 +1,181 @@
+"""
+Bulk-import dictionary dumps into the offline dictionary store.
+
+    python -m backend.import_dictionary stardict backend/dictionaries/enko.ifo --lang en
+    python -m backend.import_dictionary tsv words.tsv --lang ja
+    python -m backend.import_dictionary jsonl words.jsonl --lang zh
+    python -m backend.import_dictionary cache
+
+TSV lines are `headword<TAB>definition[<TAB>pronunciation]`; several definitions
+can be separated with `;`. JSONL lines are objects with "word", "definitions"
+(list) or "definition" (string), and optional "pronunciation", "examples", "lang".
+`cache` exports every Naver/Google lookup recorded in the upstream cache.
+"""
+import argparse
+import gzip
+import json
+import os
+import struct
+import sys
+
+from . import offline_dictionary, upstream_cache
+from .naver_scraper import parse_naver_result
+
+
+def _open_first(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            return gzip.open(path, 'rb') if path.endswith(('.gz', '.dz')) else open(path, 'rb')
+    raise FileNotFoundError(paths[0])
+
+
+def _read_ifo(path):
+    info = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if '=' in line:
+                key, value = line.rstrip('\n').split('=', 1)
+                info[key.strip()] = value.strip()
+    return info
+
+
+def _stardict_text(data, sametypesequence):
+    """
+    Return the text fields of a StarDict article. Lowercase field types are
+    NUL-terminated text, uppercase ones are size-prefixed binary (skipped).
+    """
+    fields = []
+    types = sametypesequence or None
+    pos = 0
+    index = 0
+    while pos < len(data):
+        if types:
+            if index >= len(types):
+                break
+            kind = types[index]
+            last = index == len(types) - 1
+        else:
+            kind = chr(data[pos])
+            pos += 1
+            last = False
+        index += 1
+
+        if kind.islower():
+            end = len(data) if last else data.find(b'\0', pos)
+            if end == -1:
+                end = len(data)
+            fields.append(data[pos:end].decode('utf-8', errors='replace'))
+            pos = end + 1
+        else:
+            if last:
+                break
+            size = struct.unpack('!L', data[pos:pos + 4])[0]
+            pos += 4 + size
+    return "\n".join(f for f in fields if f)
+
+
+def read_stardict(ifo_path):
+    prefix = os.path.splitext(ifo_path)[0]
+    info = _read_ifo(ifo_path)
+    offset_size = 8 if info.get('idxoffsetbits') == '64' else 4
+    offset_format = '!Q' if offset_size == 8 else '!L'
+    sametypesequence = info.get('sametypesequence', '')
+
+    with _open_first(prefix + '.idx', prefix + '.idx.gz') as f:
+        idx = f.read()
+
+    records = []
+    pos = 0
+    while pos < len(idx):
+        end = idx.index(b'\0', pos)
+        word = idx[pos:end].decode('utf-8', errors='replace')
+        pos = end + 1
+        offset = struct.unpack(offset_format, idx[pos:pos + offset_size])[0]
+        size = struct.unpack('!L', idx[pos + offset_size:pos + offset_size + 4])[0]
+        pos += offset_size + 4
+        records.append((offset, size, word))
+
+    # Read articles in file order so dictzip (.dict.dz) is decompressed in one forward pass
+    records.sort()
+    with _open_first(prefix + '.dict', prefix + '.dict.dz') as f:
+        for offset, size, word in records:
+            f.seek(offset)
+            text = _stardict_text(f.read(size), sametypesequence)
+            if text:
+                yield word, [text], None, None
+
+
+def read_tsv(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) < 2:
+                continue
+            definitions = [d.strip() for d in parts[1].split(';') if d.strip()]
+            pronunciation = parts[2].strip() if len(parts) > 2 and parts[2].strip() else None
+            yield parts[0].strip(), definitions, pronunciation, None
+
+
+def read_jsonl(path, lang):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('lang', lang) != lang:
+                continue
+            definitions = entry.get('definitions') or [entry.get('definition')]
+            yield entry.get('word'), [d for d in definitions if d], entry.get('pronunciation'), entry.get('examples')
+
+
+def read_cache(lang):
+    """
+    Naver entries are stored as `naver:<lang>`, Google word translations as `google:<lang>:<target>`.
+    Only Korean targets are exported, matching the Naver dictionaries.
+    """
+    for source, query, payload in upstream_cache.iter_entries(f"naver:{lang}"):
+        result = parse_naver_result(payload, lang=lang)
+        if result:
+            definitions = [d.strip() for d in result["definition"].split(";")]
+            yield query, definitions, result.get("pronunciation"), result.get("examples")
+
+    for source, query, payload in upstream_cache.iter_entries(f"google:{lang}:ko"):
+        translation = payload.decode('utf-8')
+        if translation:
+            yield query, [translation], None, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('format', choices=['stardict', 'tsv', 'jsonl', 'cache'])
+    parser.add_argument('path', nargs='?', help='dump file (.ifo for StarDict); not used for cache')
+    parser.add_argument('--lang', default='en', help="source language of the headwords: en, ja or zh")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.format != 'cache' and not args.path:
+        parser.error(f"{args.format} needs a path")
+
+    if args.format == 'cache':
+        total = 0
+        for lang in ('en', 'ja', 'zh'):
+            count = offline_dictionary.import_entries(read_cache(lang), lang, 'cache', args.batch_size)
+            print(f"Exported {count} cached '{lang}' lookups")
+            total += count
+        return total
+
+    if args.format == 'stardict':
+        entries = read_stardict(args.path)
+    elif args.format == 'tsv':
+        entries = read_tsv(args.path)
+    else:
+        entries = read_jsonl(args.path, args.lang)
+
+    source = os.path.splitext(os.path.basename(args.path))[0]
+    count = offline_dictionary.import_entries(entries, args.lang, source, args.batch_size)
+    print(f"Imported {count} entries from {args.path} into {offline_dictionary.OFFLINE_DICT_PATH}")
+    return count
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() is not None else 1)
@@ -0,0 +1,249 @@
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .config import LOG_LEVEL, LOG_FILE, TRACE_SAMPLE_RATE, SLOW_REQUEST_MS
+from .metrics import route_template
+
+# Structured logs: JSON lines from every "backend.*" logger, with the id of the request
+# they were written for.
+#
+# Records are put on a queue by the thread that logs them and formatted and written by
+# a listener thread (setup() at startup), so a slow disk or terminal never holds up a
+# request. Fields passed as `extra` end up as keys of their own:
+#
+#   logger.warning("Upstream cache read error", extra={"source": source, "error": str(e)})
+#
+# Spans time the stages of a request (parse, transform, render, each lookup source).
+# Only a TRACE_SAMPLE_RATE share of requests is traced; for the rest span() returns a
+# shared no-op. Each traced request, and every slow or failing one, is logged once with
+# its status, duration and spans by RequestLogMiddleware.
+#
+# Work run on the thread pools keeps the request id (executors.py copies the context);
+# worker processes don't, and log warnings to stderr unformatted.
+
+logger = logging.getLogger(__name__)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+_trace = contextvars.ContextVar("trace", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Ids from clients are kept if they look like ids, anything else is replaced
+REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs on the thread that logs, where the request's context is
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id.get()
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The message and traceback are rendered now (the arguments may change later),
+        # the JSON on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup(level=LOG_LEVEL, path=LOG_FILE):
+    """
+    Send the "backend" loggers to stderr (or `path`) as JSON, through the queue.
+    Called once at startup; again it does nothing.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    target = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stderr)
+    target.setFormatter(JsonFormatter())
+    handler = _QueueHandler(queue.SimpleQueue())
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger("backend")
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+    _listener = QueueListener(handler.queue, target)
+    _listener.start()
+
+
+def shutdown():
+    # Writes what is still queued, and puts the "backend" loggers back as they were
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger("backend")
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    root.propagate = True
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+# --- Spans ---
+
+class _Trace:
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+
+class Span:
+    __slots__ = ("trace", "name", "fields", "started")
+
+    def __init__(self, trace, name, fields):
+        self.trace = trace
+        self.name = name
+        self.fields = fields
+
+    def set(self, **fields):
+        # Fields known only once the stage has run (sizes, which source answered)
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ended = time.perf_counter()
+        entry = {
+            "name": self.name,
+            "start_ms": round((self.started - self.trace.started) * 1000, 2),
+            "ms": round((ended - self.started) * 1000, 2),
+        }
+        if exc_type is not None:
+            entry["error"] = exc_type.__name__
+        entry.update(self.fields)
+        self.trace.spans.append(entry)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+def span(name, **fields):
+    """
+    with span("parse", format="epub"): ...
+    Times the block if the current request is traced.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return NO_SPAN
+    return Span(trace, name, fields)
+
+
+# --- Requests ---
+
+def _incoming_request_id(scope):
+    for name, value in scope.get("headers", []):
+        if name == REQUEST_ID_HEADER:
+            value = value.decode("latin-1")
+            return value if REQUEST_ID_RE.match(value) else None
+    return None
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware giving each request an id (X-Request-ID, taken from the request
+    or generated, and returned in the response) and logging it as described at the top.
+    """
+
+    def __init__(self, app, sample_rate=TRACE_SAMPLE_RATE, slow_ms=SLOW_REQUEST_MS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = _incoming_request_id(scope) or uuid.uuid4().hex[:16]
+        trace = _Trace() if self.sample_rate > 0 and random.random() < self.sample_rate else None
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [(REQUEST_ID_HEADER, rid.encode())])
+            await send(message)
+
+        rid_token = request_id.set(rid)
+        trace_token = _trace.set(trace)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if trace is not None or elapsed_ms >= self.slow_ms or status["code"] >= 500:
+                fields = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route_template(scope),
+                    "status": status["code"],
+                    "ms": round(elapsed_ms, 2),
+                }
+                if trace is not None:
+                    fields["spans"] = trace.spans
+                logger.log(logging.WARNING if status["code"] >= 500 else logging.INFO, "request", extra=fields)
+            _trace.reset(trace_token)
+            request_id.reset(rid_token)
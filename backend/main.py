@@ -1,27 +1,74 @@
 from fastapi import FastAPI, Request, Depends
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
+import asyncio
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from .database import get_db, engine
+from .database import get_db, engine, async_engine
+from .executors import PoolBusy, parse_pool, shutdown_pools
+from .pagination import InvalidCursor, paginate, split_page
+from .config import PAGE_SIZE, REQUEST_PROFILING
+from .progress_buffer import progress_buffer
+from .compression import CompressionMiddleware, PrecompressedStaticFiles
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .logs import RequestLogMiddleware
+from . import logs
+from . import metrics
 from . import models
+from . import search_index
+from . import startup
+import logging
 import os
 
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Simon-Reader API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logs.setup()
+    # Tables first (requests need them), then the slow parts in the background; see /system/ready
+    await startup.run("database", models.Base.metadata.create_all, engine)
+    startup.start("dictionaries", dictionary.stardict_manager.load_dictionaries)
+    startup.start("search_index", search_index.index_library, pool=parse_pool)
+    flush_task = asyncio.create_task(progress_buffer.run())
+    yield
+    flush_task.cancel()
+    await startup.cancel()
+    # Don't lose the last positions read before shutdown
+    try:
+        progress_buffer.flush()
+    except Exception:
+        logger.exception("Progress flush error")
+    shutdown_pools()
+    await async_engine.dispose()
+    logs.shutdown()
 
-# Mount static files
-app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
+app = FastAPI(title="Simon-Reader API", lifespan=lifespan)
+
+@app.exception_handler(PoolBusy)
+async def pool_busy_handler(request: Request, exc: PoolBusy):
+    # Fail fast instead of queueing behind a saturated worker pool
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Mount static files (with the .br/.gz copies written by `python -m backend.precompress`)
+app.mount("/static", PrecompressedStaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
 
 # Templates
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
 # Include Routers
-from .routers import books, reader, dictionary
+from .routers import books, reader, dictionary, system, search
 app.include_router(books.router, prefix="/books", tags=["books"])
 app.include_router(reader.router, prefix="/reader", tags=["reader"])
 app.include_router(dictionary.router, prefix="/dictionary", tags=["dictionary"])
+app.include_router(system.router, prefix="/system", tags=["system"])
+app.include_router(search.router, prefix="/search", tags=["search"])
 
 # CORS configuration
 origins = ["*"]
@@ -34,23 +81,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Brotli/gzip for dynamic responses, see compression.py
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in profiles of single requests, see profiling.py. Not installed at all unless enabled
+if REQUEST_PROFILING:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request ids, stage timings and the request log, see logs.py
+app.add_middleware(RequestLogMiddleware)
+
+# Added last so it wraps everything else: request times include compression
+app.add_middleware(MetricsMiddleware)
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Prometheus scrape target, see metrics.py
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/")
-def read_root(request: Request, db: Session = Depends(get_db)):
-    books = db.query(models.Book).all()
-    return templates.TemplateResponse("index.html", {"request": request, "books": books})
+def read_root(request: Request, cursor: str | None = None, db: Session = Depends(get_db)):
+    library, next_cursor = books.library_page(db, cursor)
+    return templates.TemplateResponse("index.html", {"request": request, "books": library, "next_cursor": next_cursor})
+
+# Columns the vocabulary table renders; the book link uses words.book_id directly
+VOCABULARY_COLUMNS = (
+    models.Word.id, models.Word.original_word, models.Word.translated_word, models.Word.pronunciation,
+    models.Word.context_sentence, models.Word.book_title, models.Word.book_id, models.Word.created_at,
+)
 
 @app.get("/vocabulary")
-def read_vocabulary(request: Request, db: Session = Depends(get_db)):
-    words = db.query(models.Word).order_by(models.Word.created_at.desc()).all()
-    books = db.query(models.Book).all()
-    book_map = {b.title: b.id for b in books}
-    return templates.TemplateResponse("vocabulary.html", {"request": request, "words": words, "book_map": book_map})
+def read_vocabulary(request: Request, cursor: str | None = None, db: Session = Depends(get_db)):
+    stmt = paginate(select(*VOCABULARY_COLUMNS), models.Word.created_at, models.Word.id, cursor, PAGE_SIZE)
+    words, next_cursor = split_page(db.execute(stmt).all(), PAGE_SIZE)
+    return templates.TemplateResponse("vocabulary.html", {"request": request, "words": words, "next_cursor": next_cursor})
 
 @app.get("/quiz")
 def read_quiz(request: Request):
     return templates.TemplateResponse("quiz.html", {"request": request})
 
 @app.get("/bookmarks")
-def read_bookmarks(request: Request, db: Session = Depends(get_db)):
-    bookmarks = db.query(models.Bookmark).order_by(models.Bookmark.created_at.desc()).all()
-    return templates.TemplateResponse("bookmarks.html", {"request": request, "bookmarks": bookmarks})
+def read_bookmarks(request: Request, cursor: str | None = None, db: Session = Depends(get_db)):
+    stmt = paginate(
+        select(
+            models.Bookmark.id, models.Bookmark.label, models.Bookmark.comment, models.Bookmark.created_at,
+            models.Bookmark.book_id, models.Book.title.label("book_title"),
+        ).join(models.Book, models.Book.id == models.Bookmark.book_id),
+        models.Bookmark.created_at, models.Bookmark.id, cursor, PAGE_SIZE,
+    )
+    bookmarks, next_cursor = split_page(db.execute(stmt).all(), PAGE_SIZE)
+    return templates.TemplateResponse("bookmarks.html", {"request": request, "bookmarks": bookmarks, "next_cursor": next_cursor})
@@ -0,0 +1,227 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process metrics, served in the Prometheus text format at GET /metrics.
+#
+# Counters and histograms are recorded where the work happens. Numbers other
+# modules already keep (pool backlogs, cache hit counts) are read when /metrics
+# is scraped, through collectors, instead of being counted twice.
+#
+# Values live in the process that records them: with PARSE_POOL_KIND=process the
+# parse timings recorded inside the worker processes are not exported.
+
+# Seconds, from a fast SQLite commit to a slow upstream or a large PDF
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+logger = logging.getLogger(__name__)
+
+_metrics = {}
+_collectors = []
+_lock = threading.Lock()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            items = list(self.values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [count per bucket (not cumulative), sum, count]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        with _lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with _lock:
+            items = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self.values.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+def _register(metric):
+    with _lock:
+        existing = _metrics.get(metric.name)
+        if existing is not None:
+            # Module reloaded (tests): keep recording into the same series
+            return existing
+        _metrics[metric.name] = metric
+    return metric
+
+
+def counter(name, help, labels=()):
+    return _register(Counter(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return _register(Histogram(name, help, labels, buckets))
+
+
+def register_collector(fn):
+    """
+    fn() returns [(name, kind, help, [(labels dict, value), ...]), ...] when /metrics
+    is scraped; kind is "gauge" or "counter".
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_line(name, labels, value):
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f"{name}{{{label_text}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def render():
+    """
+    Every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(_sample_line(*sample) for sample in metric.samples())
+    for collect in list(_collectors):
+        try:
+            families = collect()
+        except Exception:
+            logger.exception("Metrics collector failed", extra={"collector": getattr(collect, "__name__", repr(collect))})
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_sample_line(name, labels, value) for labels, value in samples if value is not None)
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- HTTP requests ---
+
+http_request_duration = histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body, per route.",
+    ("method", "route", "status"),
+)
+_in_progress = {"requests": 0}
+
+
+def route_template(scope):
+    """
+    The path the matched route was declared with, prefix included (/reader/{book_id}),
+    so every book doesn't become a series of its own. Mounts are reported by their
+    prefix (/static), anything unmatched as "unmatched".
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return scope.get("root_path") or "unmatched"
+    try:
+        # Routers included with a prefix may match on the rest of the path only
+        matched = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    path = scope.get("path", "")
+    if path.endswith(matched):
+        return path[:len(path) - len(matched)] + path_format
+    return path_format
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds, status included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        _in_progress["requests"] += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_progress["requests"] -= 1
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=route_template(scope), status=status["code"],
+            )
+
+
+@register_collector
+def _http_metrics():
+    return [("http_requests_in_progress", "gauge", "Requests being handled.", [({}, _in_progress["requests"])])]
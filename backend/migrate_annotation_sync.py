@@ -0,0 +1,37 @@
+import sqlite3
+
+TABLES = ["highlights", "bookmarks", "comments"]
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    cursor = conn.cursor()
+    for table in TABLES:
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN client_id VARCHAR")
+            print(f"Added client_id column to {table} table.")
+        except sqlite3.OperationalError as e:
+            print(f"Column not added (maybe it exists?): {e}")
+
+    try:
+        for table in TABLES:
+            cursor.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_book_id_client_id ON {table} (book_id, client_id)"
+            )
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS annotation_sync_batches (
+                id INTEGER PRIMARY KEY,
+                book_id INTEGER REFERENCES books(id),
+                batch_id VARCHAR NOT NULL UNIQUE,
+                result TEXT NOT NULL,
+                created_at DATETIME
+            )
+        """)
+        conn.commit()
+        print("Created client_id indexes and annotation_sync_batches table.")
+    except sqlite3.OperationalError as e:
+        print(f"Migration failed: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
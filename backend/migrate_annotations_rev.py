@@ -0,0 +1,16 @@
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("ALTER TABLE books ADD COLUMN annotations_rev INTEGER NOT NULL DEFAULT 0")
+        conn.commit()
+        print("Added annotations_rev column to books table.")
+    except sqlite3.OperationalError as e:
+        print(f"Column not added (maybe it exists?): {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
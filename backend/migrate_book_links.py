@@ -0,0 +1,58 @@
+import sqlite3
+
+BATCH_SIZE = 5000
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_words_book_id_created_at ON words (book_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_comments_book_id_created_at ON comments (book_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_bookmarks_book_id_created_at ON bookmarks (book_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_highlights_book_id_created_at ON highlights (book_id, created_at)",
+]
+
+def backfill_word_book_ids(conn):
+    # Link words to books by title, one id range per transaction so a big
+    # vocabulary doesn't hold the write lock for the whole backfill
+    cursor = conn.cursor()
+    last_id = 0
+    total = 0
+    while True:
+        rows = cursor.execute(
+            "SELECT id FROM words WHERE id > ? ORDER BY id LIMIT ?", (last_id, BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        first, last_id = rows[0][0], rows[-1][0]
+        cursor.execute("""
+            UPDATE words
+            SET book_id = (SELECT MIN(books.id) FROM books WHERE books.title = words.book_title)
+            WHERE id BETWEEN ? AND ? AND book_id IS NULL
+              AND book_title IN (SELECT title FROM books)
+        """, (first, last_id))
+        total += cursor.rowcount
+        conn.commit()
+    return total
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    cursor = conn.cursor()
+    try:
+        cursor.execute("ALTER TABLE words ADD COLUMN book_id INTEGER REFERENCES books(id)")
+        print("Added book_id column to words table.")
+    except sqlite3.OperationalError as e:
+        print(f"Column not added (maybe it exists?): {e}")
+
+    try:
+        for statement in INDEXES:
+            cursor.execute(statement)
+        conn.commit()
+        print("Created (book_id, created_at) indexes.")
+
+        updated = backfill_word_book_ids(conn)
+        print(f"Linked {updated} words to their books.")
+    except sqlite3.OperationalError as e:
+        print(f"Migration failed: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,79 @@
+import sqlite3
+import sys
+import os
+
+# Run from the repository root: python backend/migrate_highlight_anchors.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.anchors import anchor, parse_locator, CHAPTER_ID_RE
+
+COLUMNS = ("chapter_index", "anchor_start", "anchor_end")
+
+def add_columns(cursor):
+    for column in COLUMNS:
+        try:
+            cursor.execute(f"ALTER TABLE highlights ADD COLUMN {column} INTEGER")
+            print(f"Added {column} column to highlights table.")
+        except sqlite3.OperationalError as e:
+            print(f"Column not added (maybe it exists?): {e}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_highlights_book_id_chapter_index ON highlights (book_id, chapter_index)")
+
+def needs_book(cfi_range):
+    # Locators with chapter offsets (or on a chapter div) resolve without the book
+    locator = parse_locator(cfi_range)
+    if locator is None or "chapterStart" in locator:
+        return False
+    return not CHAPTER_ID_RE.match(str(locator.get("id", "")))
+
+def block_map(file_type, file_path):
+    # Only parse books that need it: this is the slow part
+    from backend.parsers import parse_book
+    from backend.anchors import block_positions
+
+    if not file_path or not os.path.exists(file_path):
+        print(f"Skipping {file_path}: file not found")
+        return None
+    try:
+        content = parse_book(file_type, file_path)
+    except Exception as e:
+        print(f"Skipping {file_path}: {e}")
+        return None
+    return block_positions(content["chapters"]) if content else None
+
+def backfill(conn):
+    # Every highlight is anchored again: anchors written before chapter offsets
+    # existed hold offsets inside their element, which can't be resolved on their own
+    cursor = conn.cursor()
+    books = cursor.execute("""
+        SELECT DISTINCT h.book_id, b.file_type, b.file_path FROM highlights h
+        LEFT JOIN books b ON b.id = h.book_id
+    """).fetchall()
+
+    total = 0
+    for book_id, file_type, file_path in books:
+        rows = cursor.execute(
+            "SELECT id, cfi_range FROM highlights WHERE book_id = ?", (book_id,)
+        ).fetchall()
+        blocks = None
+        if any(needs_book(cfi_range) for _, cfi_range in rows):
+            blocks = block_map(file_type, file_path)
+
+        updates = [(*anchor(cfi_range, blocks), highlight_id) for highlight_id, cfi_range in rows]
+        cursor.executemany(
+            "UPDATE highlights SET chapter_index = ?, anchor_start = ?, anchor_end = ? WHERE id = ?", updates
+        )
+        conn.commit()
+        total += sum(1 for update in updates if update[1] is not None)
+    return total
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    try:
+        add_columns(conn.cursor())
+        conn.commit()
+        print(f"Anchored {backfill(conn)} existing highlights to their chapter text.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
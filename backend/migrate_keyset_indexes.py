@@ -0,0 +1,23 @@
+import sqlite3
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_books_created_at_id ON books (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_words_created_at_id ON words (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_bookmarks_created_at_id ON bookmarks (created_at, id)",
+]
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    cursor = conn.cursor()
+    try:
+        for statement in INDEXES:
+            cursor.execute(statement)
+        conn.commit()
+        print("Created (created_at, id) indexes for paginated listings.")
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,67 @@
+import sqlite3
+
+BATCH_SIZE = 5000
+
+COLUMNS = [
+    "ALTER TABLE words ADD COLUMN due_at DATETIME",
+    "ALTER TABLE words ADD COLUMN ease FLOAT DEFAULT 2.5",
+    "ALTER TABLE words ADD COLUMN interval_days FLOAT DEFAULT 0",
+    "ALTER TABLE words ADD COLUMN repetitions INTEGER DEFAULT 0",
+]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_words_due_at ON words (due_at)",
+    "CREATE INDEX IF NOT EXISTS ix_words_language_id ON words (language, id)",
+]
+
+def backfill_due_dates(conn):
+    # Existing words have never been reviewed: due now, oldest saved first.
+    # One id range per transaction, like migrate_book_links.py.
+    cursor = conn.cursor()
+    last_id = 0
+    total = 0
+    while True:
+        rows = cursor.execute(
+            "SELECT id FROM words WHERE id > ? ORDER BY id LIMIT ?", (last_id, BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        first, last_id = rows[0][0], rows[-1][0]
+        cursor.execute("""
+            UPDATE words
+            SET due_at = COALESCE(created_at, CURRENT_TIMESTAMP),
+                ease = COALESCE(ease, 2.5),
+                interval_days = COALESCE(interval_days, 0),
+                repetitions = COALESCE(repetitions, 0)
+            WHERE id BETWEEN ? AND ? AND due_at IS NULL
+        """, (first, last_id))
+        total += cursor.rowcount
+        conn.commit()
+    return total
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    cursor = conn.cursor()
+    for statement in COLUMNS:
+        try:
+            cursor.execute(statement)
+        except sqlite3.OperationalError as e:
+            print(f"Column not added (maybe it exists?): {e}")
+    conn.commit()
+    print("Added review schedule columns to words table.")
+
+    try:
+        for statement in INDEXES:
+            cursor.execute(statement)
+        conn.commit()
+        print("Created due_at and (language, id) indexes.")
+
+        updated = backfill_due_dates(conn)
+        print(f"Scheduled {updated} existing words for review.")
+    except sqlite3.OperationalError as e:
+        print(f"Migration failed: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,52 @@
+import sqlite3
+import sys
+import os
+
+# Run from the repository root: python backend/migrate_words_search.py
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.models import WORDS_FTS_DDL
+from backend.fts import segment
+
+BATCH_SIZE = 5000
+
+def backfill(conn):
+    # Index every word that isn't in words_fts yet, one id range per transaction
+    cursor = conn.cursor()
+    last_id = 0
+    total = 0
+    while True:
+        rows = cursor.execute("""
+            SELECT id, original_word, translated_word, context_sentence FROM words
+            WHERE id > ? AND id NOT IN (SELECT rowid FROM words_fts)
+            ORDER BY id LIMIT ?
+        """, (last_id, BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        cursor.executemany(
+            "INSERT INTO words_fts (rowid, original_word, translated_word, context_sentence) VALUES (?, ?, ?, ?)",
+            [(row[0], segment(row[1] or ""), segment(row[2] or ""), segment(row[3] or "")) for row in rows],
+        )
+        total += len(rows)
+        conn.commit()
+    return total
+
+def migrate():
+    conn = sqlite3.connect('simon_reader.db')
+    try:
+        conn.execute(WORDS_FTS_DDL)
+        conn.commit()
+        print("Created words_fts table.")
+
+        indexed = backfill(conn)
+        conn.execute("INSERT INTO words_fts (words_fts) VALUES ('optimize')")
+        conn.commit()
+        print(f"Indexed {indexed} words for search.")
+    except sqlite3.OperationalError as e:
+        print(f"Migration failed: {e}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
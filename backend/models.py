@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, String, Text, ForeignKey, DateTime, Index, DDL, event
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
@@ -14,6 +14,13 @@ class Book(Base):
     cover_image = Column(String, nullable=True)
     last_read_position = Column(String, nullable=True) # Store selector or scroll %
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped on every highlight/bookmark/comment write; ETag of the annotations endpoint
+    annotations_rev = Column(Integer, default=0, nullable=False)
+
+    # Keyset pagination of the library, see pagination.py
+    __table_args__ = (
+        Index("ix_books_created_at_id", "created_at", "id"),
+    )
 
 class Word(Base):
     __tablename__ = "words"
@@ -24,9 +31,39 @@ class Word(Base):
     pronunciation = Column(String, nullable=True)
     context_sentence = Column(Text, nullable=True)
     book_title = Column(String, nullable=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=True)
     language = Column(String) # 'en' or 'jp'
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # SM-2 review schedule, see srs.py. New words are due right away.
+    due_at = Column(DateTime, default=datetime.utcnow)
+    ease = Column(Float, default=2.5)
+    interval_days = Column(Float, default=0)
+    repetitions = Column(Integer, default=0)
+
+    # Per-book lookups and newest-first listings are both served by (book_id, created_at);
+    # (created_at, id) serves the keyset-paginated vocabulary list.
+    # The quiz reads due words by due_at and seeks random distractors by (language, id).
+    __table_args__ = (
+        Index("ix_words_book_id_created_at", "book_id", "created_at"),
+        Index("ix_words_created_at_id", "created_at", "id"),
+        Index("ix_words_due_at", "due_at"),
+        Index("ix_words_language_id", "language", "id"),
+    )
+
+# Full-text index of saved words (rowid = words.id), kept in sync by word_search.py.
+# Prefix indexes on 1 and 2 characters keep search-as-you-type lookups of the first keystrokes cheap.
+# FTS5 virtual tables aren't ORM models, so it is created right after the words table;
+# existing databases get it from migrate_words_search.py.
+WORDS_FTS_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+    original_word, translated_word, context_sentence,
+    prefix = '1 2',
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+event.listen(Word.__table__, "after_create", DDL(WORDS_FTS_DDL).execute_if(dialect="sqlite"))
+
 class Comment(Base):
     __tablename__ = "comments"
 
@@ -35,10 +72,16 @@ class Comment(Base):
     content = Column(Text)
     selected_text = Column(Text, nullable=True) # The text the comment is attached to
     cfi_range = Column(String, nullable=True) # For EPUB location
+    client_id = Column(String, nullable=True) # Set by the reader's sync queue, see annotation_sync.py
     created_at = Column(DateTime, default=datetime.utcnow)
     
     book = relationship("Book")
 
+    __table_args__ = (
+        Index("ix_comments_book_id_created_at", "book_id", "created_at"),
+        Index("ix_comments_book_id_client_id", "book_id", "client_id", unique=True),
+    )
+
 class Bookmark(Base):
     __tablename__ = "bookmarks"
 
@@ -47,10 +90,17 @@ class Bookmark(Base):
     cfi_range = Column(String) # Location in the book
     label = Column(String, nullable=True)
     comment = Column(Text, nullable=True)
+    client_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     book = relationship("Book")
 
+    __table_args__ = (
+        Index("ix_bookmarks_book_id_created_at", "book_id", "created_at"),
+        Index("ix_bookmarks_created_at_id", "created_at", "id"),
+        Index("ix_bookmarks_book_id_client_id", "book_id", "client_id", unique=True),
+    )
+
 class Highlight(Base):
     __tablename__ = "highlights"
 
@@ -59,6 +109,28 @@ class Highlight(Base):
     selected_text = Column(Text)
     cfi_range = Column(String) # Location
     color = Column(String, default="yellow")
+    client_id = Column(String, nullable=True)
+    # Normalized from cfi_range at write time (see anchors.py); NULL when it can't be resolved
+    chapter_index = Column(Integer, nullable=True)
+    anchor_start = Column(Integer, nullable=True)
+    anchor_end = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     book = relationship("Book")
+
+    __table_args__ = (
+        Index("ix_highlights_book_id_created_at", "book_id", "created_at"),
+        Index("ix_highlights_book_id_client_id", "book_id", "client_id", unique=True),
+        Index("ix_highlights_book_id_chapter_index", "book_id", "chapter_index"),
+    )
+
+class AnnotationSyncBatch(Base):
+    # Batches already applied by /books/{id}/annotations/sync, so a replayed batch
+    # returns its original result instead of being applied twice
+    __tablename__ = "annotation_sync_batches"
+
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"))
+    batch_id = Column(String, nullable=False, unique=True)
+    result = Column(Text, nullable=False) # JSON response of the batch
+    created_at = Column(DateTime, default=datetime.utcnow)
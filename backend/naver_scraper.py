@@ -1,117 +1,147 @@
-import requests
-from bs4 import BeautifulSoup
+import json
+import logging
 import re
 
+from .config import NAVER_URL
+
+try:
+    # Optional: orjson decodes the large Naver payloads several times faster
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+MAX_DEFINITIONS = 6
+MAX_EXAMPLES = 2
+
 def clean_text(text):
     if not text:
         return ""
     return re.sub(r'\s+', ' ', text).strip()
 
-def scrape_naver_dict(word, lang="en"):
+class NaverRequestError(Exception):
+    pass
+
+def fetch_naver_raw(word, lang="en"):
     """
-    Scrape Naver Dictionary for a word using internal APIs.
-    lang: 'en' for English-Korean, 'ja' for Japanese-Korean
+    Call the Naver Dictionary search API and return the raw response body (bytes).
+    Raises on network errors and non-200 responses.
+    lang: 'en' for English-Korean, 'ja' for Japanese-Korean, 'zh' for Chinese-Korean
     """
-    
-    if lang == "ja":
-        # Japanese-Korean API
-        url = f"https://ja.dict.naver.com/api3/jako/search?query={word}"
-    elif lang == "zh":
-        # Chinese-Korean API
-        url = f"https://zh.dict.naver.com/api3/zhko/search?query={word}"
-    else:
-        # English-Korean API
-        url = f"https://en.dict.naver.com/api3/enko/search?query={word}"
-        
+    # en.dict.naver.com/api3/enko, ja.dict.naver.com/api3/jako, zh.dict.naver.com/api3/zhko
+    url = f"{NAVER_URL.format(lang=lang if lang in ('ja', 'zh') else 'en')}?query={word}"
+
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Referer': 'https://dict.naver.com/'
     }
     
-    try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code != 200:
-            return None
-            
-        data = response.json()
-        
-        definitions = []
-        examples = []
+    import requests
+
+    response = requests.get(url, headers=headers, timeout=5)
+    if response.status_code != 200:
+        raise NaverRequestError(f"Naver returned HTTP {response.status_code}")
         
-        # Navigate JSON structure: searchResultMap -> searchResultListMap -> WORD -> items
-        if 'searchResultMap' in data and 'searchResultListMap' in data['searchResultMap']:
-            res_map = data['searchResultMap']['searchResultListMap']
-            if 'WORD' in res_map:
-                items = res_map['WORD']['items']
-                if items:
-                    # Get first item (best match)
-                    item = items[0]
-                    
-                    # Extract pronunciation
-                    pronunciation = None
-                    if lang == "ja":
-                        pronunciation = item.get('expMeaningRead')
-                        if not pronunciation:
-                             # Fallback to expEntry (often contains the reading/Kana)
-                             pronunciation = item.get('expEntry')
-                        if not pronunciation:
-                             # Fallback to expAudioRead
-                             pronunciation = item.get('expAudioRead')
-                    elif lang == "zh":
-                        # Chinese Pinyin is usually in searchPhoneticSymbolList
-                        phonetic_list = item.get('searchPhoneticSymbolList', [])
-                        if phonetic_list and len(phonetic_list) > 0:
-                            pronunciation = phonetic_list[0].get('symbolValue')
-                        
-                        # Fallback to expEntry if it looks like Pinyin (unlikely but safe)
-                        if not pronunciation:
-                             pronunciation = item.get('expEntry')
-
-                    # Clean up pronunciation (sometimes it has HTML or extra chars)
-                    if pronunciation:
-                        pronunciation = re.sub(r'<[^>]+>', '', pronunciation).strip()
-                    
-                    # Extract meanings from meansCollector
-                    if 'meansCollector' in item:
-                        for collector in item['meansCollector']:
-                            for mean in collector.get('means', []):
-                                if 'value' in mean:
-                                    # Remove HTML tags if any (sometimes they exist)
-                                    clean_def = re.sub(r'<[^>]+>', '', mean['value'])
-                                    definitions.append(clean_def)
-                            if len(definitions) >= 6: # Limit to 6 definitions
-                                break
-                                
-                    if definitions:
-                        # Extract Examples from 'EXAMPLE' section
-                        if 'EXAMPLE' in res_map:
-                            ex_items = res_map['EXAMPLE']['items']
-                            for ex_item in ex_items[:2]: # Limit to 2 examples
-                                if 'expExample1' in ex_item and 'expExample2' in ex_item:
-                                    # Clean up HTML tags
-                                    en = re.sub(r'<[^>]+>', '', ex_item['expExample1']).strip()
-                                    ko = re.sub(r'<[^>]+>', '', ex_item['expExample2']).strip()
-                                    if en and ko:
-                                        examples.append(f"{en} ({ko})")
-                        
-                        # Fallback to 'VLIVE' if no examples found
-                        if not examples and 'VLIVE' in res_map:
-                             ex_items = res_map['VLIVE']['items']
-                             for ex_item in ex_items[:2]:
-                                if 'expExample1' in ex_item and 'expExample2' in ex_item:
-                                    en = re.sub(r'<[^>]+>', '', ex_item['expExample1']).strip()
-                                    ko = re.sub(r'<[^>]+>', '', ex_item['expExample2']).strip()
-                                    if en and ko:
-                                        examples.append(f"{en} ({ko})")
-
-                        return {
-                            "definition": "; ".join(definitions),
-                            "pronunciation": pronunciation,
-                            "examples": examples
-                        }
-            
+    return response.content
+
+def fetch_naver_json(word, lang="en"):
+    return json_loads(fetch_naver_raw(word, lang=lang))
+
+def strip_tags(text):
+    return TAG_RE.sub('', text)
+
+def _extract_examples(section):
+    examples = []
+    for ex_item in section.get('items', [])[:MAX_EXAMPLES]:
+        first = ex_item.get('expExample1')
+        second = ex_item.get('expExample2')
+        if first and second:
+            # Clean up HTML tags
+            first = strip_tags(first).strip()
+            second = strip_tags(second).strip()
+            if first and second:
+                examples.append(f"{first} ({second})")
+    return examples
+
+def parse_naver_result(data, lang="en"):
+    """
+    Extract definitions, pronunciation and examples from a Naver search response.
+    `data` is either the decoded JSON or the raw response bytes.
+    Returns None when the response has no usable entry.
+    """
+    if isinstance(data, (bytes, str)):
+        # Cheap pre-check: no word entry means nothing to decode
+        marker = b'"WORD"' if isinstance(data, bytes) else '"WORD"'
+        if marker not in data:
+            return None
+        data = json_loads(data)
+
+    # Navigate JSON structure: searchResultMap -> searchResultListMap -> WORD -> items
+    res_map = (data.get('searchResultMap') or {}).get('searchResultListMap')
+    if not res_map or 'WORD' not in res_map:
+        return None
+    items = res_map['WORD'].get('items')
+    if not items:
+        return None
+
+    # Get first item (best match)
+    item = items[0]
+
+    # Extract pronunciation
+    pronunciation = None
+    if lang == "ja":
+        # Fallback to expEntry (often contains the reading/Kana), then expAudioRead
+        pronunciation = item.get('expMeaningRead') or item.get('expEntry') or item.get('expAudioRead')
+    elif lang == "zh":
+        # Chinese Pinyin is usually in searchPhoneticSymbolList
+        phonetic_list = item.get('searchPhoneticSymbolList')
+        if phonetic_list:
+            pronunciation = phonetic_list[0].get('symbolValue')
+        if not pronunciation:
+            pronunciation = item.get('expEntry')
+
+    # Clean up pronunciation (sometimes it has HTML or extra chars)
+    if pronunciation:
+        pronunciation = strip_tags(pronunciation).strip()
+
+    # Extract meanings from meansCollector
+    definitions = []
+    for collector in item.get('meansCollector') or []:
+        for mean in collector.get('means', []):
+            value = mean.get('value')
+            if value is not None:
+                # Remove HTML tags if any (sometimes they exist)
+                definitions.append(strip_tags(value))
+        if len(definitions) >= MAX_DEFINITIONS:
+            break
+
+    if not definitions:
         return None
 
+    # Examples from the 'EXAMPLE' section, falling back to 'VLIVE'
+    examples = []
+    if 'EXAMPLE' in res_map:
+        examples = _extract_examples(res_map['EXAMPLE'])
+    if not examples and 'VLIVE' in res_map:
+        examples = _extract_examples(res_map['VLIVE'])
+
+    return {
+        "definition": "; ".join(definitions),
+        "pronunciation": pronunciation,
+        "examples": examples
+    }
+
+def scrape_naver_dict(word, lang="en"):
+    """
+    Scrape Naver Dictionary for a word using internal APIs.
+    lang: 'en' for English-Korean, 'ja' for Japanese-Korean
+    """
+    try:
+        return parse_naver_result(fetch_naver_raw(word, lang=lang), lang=lang)
     except Exception as e:
-        print(f"Error scraping Naver Dict: {e}")
+        logger.warning("Error scraping Naver Dict", extra={"word": word, "lang": lang, "error": str(e)})
         return None
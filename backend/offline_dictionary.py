@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from .config import OFFLINE_DICT_PATH
+
+# One indexed SQLite store for every offline dictionary source
+# (StarDict/TSV/JSONL dumps and exported Naver/Google lookups).
+# Entries are keyed by the normalized headword and the source language.
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    key VARCHAR NOT NULL,
+    lang VARCHAR NOT NULL,
+    headword VARCHAR NOT NULL,
+    definitions TEXT NOT NULL,
+    pronunciation VARCHAR,
+    examples TEXT,
+    source VARCHAR NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_entries_key_lang_source ON entries (key, lang, source);
+"""
+
+UPSERT_SQL = """
+INSERT INTO entries (key, lang, headword, definitions, pronunciation, examples, source)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key, lang, source) DO UPDATE SET
+    headword = excluded.headword,
+    definitions = excluded.definitions,
+    pronunciation = excluded.pronunciation,
+    examples = excluded.examples
+"""
+
+_local = threading.local()
+
+
+def normalize(word):
+    return word.strip().lower()
+
+
+def connect(path=None):
+    path = path or OFFLINE_DICT_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _reader():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connect()
+        _local.conn = conn
+    return conn
+
+
+def has_entries():
+    return os.path.exists(OFFLINE_DICT_PATH)
+
+
+def lookup(word, lang):
+    """
+    Return {"definitions", "pronunciation", "examples"} for the word, or None.
+    When several sources have the word, the first imported one wins.
+    """
+    if not has_entries():
+        return None
+
+    try:
+        row = _reader().execute(
+            "SELECT definitions, pronunciation, examples FROM entries WHERE key = ? AND lang = ? ORDER BY id LIMIT 1",
+            (normalize(word), lang),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("Offline dictionary error", extra={"lang": lang, "error": str(e)})
+        return None
+
+    if not row:
+        return None
+    definitions, pronunciation, examples = row
+    return {
+        "definitions": json.loads(definitions),
+        "pronunciation": pronunciation,
+        "examples": json.loads(examples) if examples else [],
+    }
+
+
+def import_entries(entries, lang, source, batch_size=5000, path=None):
+    """
+    Bulk insert (headword, definitions, pronunciation, examples) tuples.
+    Every batch is written in one transaction; re-importing a source updates its rows.
+    Returns the number of entries written.
+    """
+    conn = connect(path)
+    # Import-only settings: the store can be rebuilt from the dumps if the machine crashes mid-import
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    count = 0
+    batch = []
+    try:
+        for headword, definitions, pronunciation, examples in entries:
+            if not headword or not definitions:
+                continue
+            batch.append((
+                normalize(headword), lang, headword,
+                json.dumps(definitions, ensure_ascii=False),
+                pronunciation,
+                json.dumps(examples, ensure_ascii=False) if examples else None,
+                source,
+            ))
+            if len(batch) >= batch_size:
+                with conn:
+                    conn.executemany(UPSERT_SQL, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(UPSERT_SQL, batch)
+            count += len(batch)
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return count
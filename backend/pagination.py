@@ -0,0 +1,64 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Keyset ("seek") pagination on (created_at, id).
+# Each page continues from the last row of the previous one through an index,
+# so page N costs the same as page 1, unlike OFFSET which scans every skipped row.
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def paginate(stmt, created_at_column, id_column, cursor=None, limit=50, descending=True):
+    """
+    Order stmt by (created_at, id) and seek past the cursor.
+    Fetches one row more than limit so split_page can tell whether another page exists.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            stmt = stmt.where(or_(
+                created_at_column < created_at,
+                and_(created_at_column == created_at, id_column < row_id),
+            ))
+        else:
+            stmt = stmt.where(or_(
+                created_at_column > created_at,
+                and_(created_at_column == created_at, id_column > row_id),
+            ))
+
+    if descending:
+        stmt = stmt.order_by(created_at_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(created_at_column, id_column)
+    return stmt.limit(limit + 1)
+
+
+def split_page(rows, limit):
+    """
+    Return (rows of this page, cursor of the next page or None).
+    Rows need `created_at` and `id` attributes.
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
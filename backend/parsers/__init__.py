@@ -0,0 +1,50 @@
+import os
+import time
+
+from .. import metrics
+from ..logs import span
+
+# Book files to {"chapters": [...], ...}, one parser per format. Used by the reader,
+# the chapter cache, the search index and the migrations that need chapter text.
+
+parse_duration = metrics.histogram(
+    "book_parse_duration_seconds", "Time to parse a book into chapters, per format; outcome is ok or empty.",
+    ("format", "outcome"),
+)
+parse_input_bytes = metrics.counter("book_parse_input_bytes_total", "Size of the book files parsed, per format.", ("format",))
+parse_output_bytes = metrics.counter("book_parse_output_bytes_total", "Chapter HTML produced by parsing, per format.", ("format",))
+
+def parse_book(file_type, file_path, image_base_url=None):
+    # Plain arguments only, so this can also run in a worker process
+    with span("parse", format=file_type) as stage:
+        started = time.perf_counter()
+        content = _read_book(file_type, file_path, image_base_url)
+        parse_duration.observe(time.perf_counter() - started, format=file_type, outcome="ok" if content else "empty")
+        try:
+            parse_input_bytes.inc(os.path.getsize(file_path), format=file_type)
+        except OSError:
+            pass
+        if content:
+            html_bytes = sum(len((chapter.get("content") or "").encode("utf-8")) for chapter in content.get("chapters", []))
+            parse_output_bytes.inc(html_bytes, format=file_type)
+            stage.set(chapters=len(content.get("chapters", [])), html_bytes=html_bytes)
+    return content
+
+def _read_book(file_type, file_path, image_base_url=None):
+    # Each parser (and its library) is imported on first use, see test_import_time.py
+    content = None
+    
+    if file_type == 'epub':
+        from .epub_parser import read_epub
+        content = read_epub(file_path, image_base_url)
+    elif file_type == 'docx':
+        from .docx_parser import read_docx
+        content = read_docx(file_path, image_base_url)
+    elif file_type == 'txt':
+        from .txt_parser import read_txt
+        content = read_txt(file_path)
+    elif file_type == 'pdf':
+        from .pdf_parser import read_pdf
+        content = read_pdf(file_path, image_base_url)
+
+    return content
@@ -1,5 +1,6 @@
 import docx
 from docx.shared import Pt
+import logging
 import os
 import mimetypes
 from docx.oxml.text.paragraph import CT_P
@@ -7,6 +8,8 @@ from docx.oxml.table import CT_Tbl
 from docx.text.paragraph import Paragraph
 from docx.table import Table
 
+logger = logging.getLogger(__name__)
+
 def process_paragraph(para, image_base_url):
     para_html = ""
     for run in para.runs:
@@ -62,8 +65,8 @@ def read_docx(file_path, image_base_url=None):
             'title': 'Document', # DOCX metadata is often empty/messy, could try doc.core_properties.title
             'chapters': chapters
         }
-    except Exception as e:
-        print(f"Error reading DOCX: {e}")
+    except Exception:
+        logger.exception("Error reading DOCX", extra={"file_path": file_path})
         return None
 
 def get_docx_image(file_path, image_id):
@@ -80,8 +83,8 @@ def get_docx_image(file_path, image_id):
                  return rel.target_part.blob, content_type
                  
         return None, None
-    except Exception as e:
-        print(f"Error extracting DOCX image: {e}")
+    except Exception:
+        logger.exception("Error extracting DOCX image", extra={"file_path": file_path, "image_id": image_id})
         return None, None
 
 def extract_cover_image(file_path):
@@ -114,8 +117,8 @@ def extract_cover_image(file_path):
                                 return rel.target_part.blob, content_type
                 
         return None, None
-    except Exception as e:
-        print(f"Error extracting DOCX cover: {e}")
+    except Exception:
+        logger.exception("Error extracting DOCX cover", extra={"file_path": file_path})
         return None, None
 
 
@@ -1,56 +1,129 @@
 import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
+import logging
+import multiprocessing
 import os
 import mimetypes
+import re
+
+from ..config import EPUB_PARSE_PROCESSES, EPUB_PARALLEL_MIN_CHAPTERS
+from ..executors import chapter_executor, discard_chapter_executor
+from ..logs import span
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+BODY_RE = re.compile(rb'<body[\s>/]', re.IGNORECASE)
+
+def _parser():
+    # EPUB documents are UTF-8; without this libxml2 guesses (usually Latin-1) when there's no declaration
+    return lxml_html.HTMLParser(encoding='utf-8')
+
+def _transform_bs4(content, image_base_url=None):
+    # Pure-Python fallback for when lxml isn't installed
+    soup = BeautifulSoup(content.decode('utf-8'), 'html.parser')
+
+    # Remove existing scripts/styles to avoid conflicts
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Rewrite image URLs (external links are left alone)
+    if image_base_url:
+        for img in soup.find_all('img'):
+            src = img.get('src')
+            if src and not src.startswith('http'):
+                img['src'] = f"{image_base_url}/{src}"
+
+    body = soup.find('body')
+    return str(body) if body else None
+
+def transform_chapter(content, image_base_url=None, parser=None):
+    """
+    The <body> of one EPUB document (bytes) as HTML, with scripts/styles removed
+    and relative image URLs pointed at image_base_url. None if it has no body.
+    """
+    if lxml_html is None:
+        return _transform_bs4(content, image_base_url)
+
+    # lxml makes up a <body> for documents that have none; those were never chapters
+    if not BODY_RE.search(content):
+        return None
+    try:
+        doc = lxml_html.document_fromstring(content, parser=parser or _parser())
+    except etree.ParserError:
+        return None
+    body = doc.find('body')
+    if body is None:
+        return None
+
+    for element in body.xpath('.//script | .//style'):
+        # Keeps the text that follows the element, like BeautifulSoup's decompose()
+        element.drop_tree()
+
+    if image_base_url:
+        for img in body.iter('img'):
+            src = img.get('src')
+            if src and not src.startswith('http'):
+                img.set('src', f"{image_base_url}/{src}")
+
+    return lxml_html.tostring(body, encoding='unicode', with_tail=False)
+
+def _transform_batch(contents, image_base_url):
+    # Runs in a chapter worker process: one parser for the whole batch
+    parser = _parser() if lxml_html is not None else None
+    return [transform_chapter(content, image_base_url, parser) for content in contents]
+
+def transform_chapters(contents, image_base_url=None):
+    """
+    transform_chapter() over every document, in order. Large books are split into
+    batches transformed by the chapter process pool; results come back in input order.
+    """
+    contents = list(contents)
+    workers = EPUB_PARSE_PROCESSES
+    with span("transform", chapters=len(contents)) as stage:
+        # Inside a worker process (PARSE_POOL_KIND=process) books are already parsed in parallel
+        if len(contents) >= EPUB_PARALLEL_MIN_CHAPTERS and workers > 1 and multiprocessing.parent_process() is None:
+            # A few batches per worker: big enough to amortize pickling, small enough to balance
+            size = max(1, -(-len(contents) // (workers * 4)))
+            batches = [contents[i:i + size] for i in range(0, len(contents), size)]
+            try:
+                results = chapter_executor(workers).map(_transform_batch, batches, [image_base_url] * len(batches))
+                stage.set(workers=workers)
+                return [body for batch in results for body in batch]
+            except Exception:
+                logger.warning("Parallel EPUB transform failed, continuing serially", exc_info=True)
+                discard_chapter_executor()
+
+        return _transform_batch(contents, image_base_url)
 
 def read_epub(file_path, image_base_url=None):
     try:
         book = epub.read_epub(file_path)
-        chapters = []
-        
-        for item in book.get_items():
-            if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                # Extract HTML content
-                content = item.get_content().decode('utf-8')
-                
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Remove existing scripts/styles to avoid conflicts
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                
-                # Rewrite image URLs
-                if image_base_url:
-                    for img in soup.find_all('img'):
-                        src = img.get('src')
-                        if src:
-                            # Handle relative paths if necessary, but usually just the filename or internal path
-                            # EPUB internal paths can be tricky, but let's assume flat or simple relative for now.
-                            # Better approach: resolve against item's path? 
-                            # For now, let's just pass the raw src to the image endpoint and let it figure it out
-                            # or just prepend the base url.
-                            
-                            # We need to make sure we don't break external links if any (unlikely in EPUB)
-                            if not src.startswith('http'):
-                                img['src'] = f"{image_base_url}/{src}"
-
-                # Get body content
-                body = soup.find('body')
-                if body:
-                    chapters.append({
-                        'id': item.get_id(),
-                        'content': str(body), # Return the inner HTML of body or the body tag itself
-                        'href': item.get_name()
-                    })
-                    
+        documents = [item for item in book.get_items() if item.get_type() == ebooklib.ITEM_DOCUMENT]
+        bodies = transform_chapters([item.get_content() for item in documents], image_base_url)
+
+        chapters = [
+            {
+                'id': item.get_id(),
+                'content': body, # The body tag itself, with its content
+                'href': item.get_name()
+            }
+            for item, body in zip(documents, bodies)
+            if body is not None
+        ]
+
         return {
             'title': book.get_metadata('DC', 'title')[0][0] if book.get_metadata('DC', 'title') else 'Unknown',
             'language': book.get_metadata('DC', 'language')[0][0] if book.get_metadata('DC', 'language') else 'en',
             'chapters': chapters
         }
-    except Exception as e:
-        print(f"Error reading EPUB: {e}")
+    except Exception:
+        logger.exception("Error reading EPUB", extra={"file_path": file_path})
         return None
 
 def get_epub_image(file_path, image_path):
@@ -74,8 +147,8 @@ def get_epub_image(file_path, image_path):
                  return item.get_content(), mimetypes.guess_type(filename)[0]
                  
         return None, None
-    except Exception as e:
-        print(f"Error extracting EPUB image: {e}")
+    except Exception:
+        logger.exception("Error extracting EPUB image", extra={"file_path": file_path, "image_path": image_path})
         return None, None
 
 def extract_cover_image(file_path):
@@ -147,8 +220,8 @@ def extract_cover_image(file_path):
                             if item.get_type() == ebooklib.ITEM_IMAGE:
                                 if os.path.basename(item.get_name()) == target_filename:
                                     return item.get_content(), mimetypes.guess_type(item.get_name())[0]
-            except Exception as e:
-                print(f"Error checking spine for cover: {e}")
+            except Exception:
+                logger.warning("Error checking spine for cover", exc_info=True, extra={"file_path": file_path})
 
         # 5. Fallback: Iterate through SPINE to find the first image in reading order
         # This is much better than iterating get_items() which is arbitrary order
@@ -177,8 +250,7 @@ def extract_cover_image(file_path):
             
         return None, None
         
-    except Exception as e:
-        print(f"Error extracting EPUB cover: {e}")
+    except Exception:
+        logger.exception("Error extracting EPUB cover", extra={"file_path": file_path})
         return None, None
 
-
@@ -1,8 +1,11 @@
 import pdfplumber
+import logging
 import os
 import mimetypes
 import html
 
+logger = logging.getLogger(__name__)
+
 def read_pdf(file_path, image_base_url=None):
     try:
         chapters = []
@@ -36,8 +39,8 @@ def read_pdf(file_path, image_base_url=None):
             'title': os.path.basename(file_path),
             'chapters': chapters
         }
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
+    except Exception:
+        logger.exception("Error reading PDF", extra={"file_path": file_path})
         return None
 
 def extract_cover_image(file_path):
@@ -75,12 +78,12 @@ def extract_cover_image(file_path):
                             img_byte_arr = io.BytesIO()
                             im.original.save(img_byte_arr, format='JPEG')
                             return img_byte_arr.getvalue(), 'image/jpeg'
-                        except Exception as render_error:
-                            print(f"Error rendering PDF page: {render_error}")
+                        except Exception:
+                            logger.warning("Error rendering PDF page", exc_info=True, extra={"file_path": file_path})
                             # Fallback: try to extract raw stream if possible (advanced)
                             pass
                             
         return None, None
-    except Exception as e:
-        print(f"Error extracting PDF cover: {e}")
+    except Exception:
+        logger.exception("Error extracting PDF cover", extra={"file_path": file_path})
         return None, None
@@ -1,5 +1,8 @@
-import os
 import html
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 def read_txt(file_path):
     try:
@@ -15,7 +18,7 @@ def read_txt(file_path):
                 continue
                 
         if text is None:
-            print(f"Error reading TXT: Could not determine encoding for {file_path}")
+            logger.error("Error reading TXT: could not determine encoding", extra={"file_path": file_path})
             return None
             
         # Basic processing: split by double newlines to create paragraphs
@@ -39,6 +42,6 @@ def read_txt(file_path):
                 'href': 'chapter-1'
             }]
         }
-    except Exception as e:
-        print(f"Error reading TXT: {e}")
+    except Exception:
+        logger.exception("Error reading TXT", extra={"file_path": file_path})
         return None
@@ -0,0 +1,47 @@
+"""
+Write .br/.gz copies of the static assets, served by PrecompressedStaticFiles.
+
+Run after changing anything under backend/static (copies older than their
+asset are ignored until rebuilt):
+
+    python -m backend.precompress
+"""
+import argparse
+import os
+import sys
+
+from .compression import ENCODINGS, EXTENSIONS, compress_file
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+# Covers and images are already compressed
+ASSET_EXTENSIONS = (".css", ".js", ".html", ".svg", ".json", ".txt", ".map")
+
+
+def precompress(directory=STATIC_DIR):
+    """
+    Returns (files seen, variants written).
+    """
+    seen = written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            seen += 1
+            for encoding in compress_file(path):
+                print(f"Wrote {path}{EXTENSIONS[encoding]}")
+                written += 1
+    return seen, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', nargs='?', default=STATIC_DIR)
+    args = parser.parse_args(argv)
+    seen, written = precompress(args.directory)
+    print(f"{seen} assets, {written} compressed copies written ({', '.join(ENCODINGS)})")
+    return seen
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() is not None else 1)
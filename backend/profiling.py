@@ -0,0 +1,143 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from .config import PROFILES_DIR, PROFILE_INTERVAL_MS
+
+# Opt-in profiles of single requests (REQUEST_PROFILING=1, see main.py).
+#
+# A request sent with `X-Profile: 1` or `?profile=1` is sampled from start to the
+# end of its response body: every PROFILE_INTERVAL_MS the stacks of all threads are
+# recorded, so the work handed to the parse and I/O pools (zip decoding, HTML
+# parsing, upstream calls) and the database threads is included along with the
+# event loop. Samples of other requests running at the same time are too.
+#
+# The profile is written in the folded-stacks format, one "frame;frame;... count"
+# line per distinct stack, which flamegraph.pl, speedscope and inferno read:
+#
+#   flamegraph.pl backend/cache/profiles/20240101-120000-GET-reader-7.folded > reader.svg
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"x-profile"
+QUERY_RE = re.compile(r"(^|&)profile=(1|true)(&|$)")
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STDLIB = os.path.dirname(os.__file__)
+
+# Leaf frames of threads with nothing to do: idle pool workers and waits on locks
+IDLE_FRAMES = {("thread.py", "_worker"), ("threading.py", "wait"), ("queue.py", "get")}
+
+
+def requested(scope):
+    for name, value in scope.get("headers", []):
+        if name == HEADER:
+            return value.strip().lower() in (b"1", b"true")
+    query = scope.get("query_string", b"").decode("latin-1")
+    return bool(query) and bool(QUERY_RE.search(query))
+
+
+def _frame_name(code):
+    filename = code.co_filename
+    if "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[-1]
+    elif filename.startswith(ROOT):
+        filename = os.path.relpath(filename, ROOT)
+    elif filename.startswith(STDLIB):
+        filename = os.path.relpath(filename, STDLIB)
+    # ';' separates frames in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Sampler:
+    """
+    Records the stacks of every thread but its own, every `interval` seconds, until stopped.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_path(method, path, directory=PROFILES_DIR):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:80] or "root"
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(directory, f"{stamp}-{method}-{slug}.folded")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware sampling the requests that ask for it; see the comment at the top.
+    The response carries X-Profile-Path with where the profile was saved.
+    """
+
+    def __init__(self, app, directory=PROFILES_DIR):
+        self.app = app
+        self.directory = directory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        path = profile_path(scope["method"], scope["path"], self.directory)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile-path", path.encode())])
+            await send(message)
+
+        started = time.perf_counter()
+        sampler = Sampler().start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - started
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(sampler.folded())
+                logger.info("Profiled request", extra={
+                    "path": scope["path"], "ms": round(elapsed * 1000, 2), "samples": sampler.samples, "profile": path,
+                })
+            except OSError as e:
+                logger.warning("Error writing profile", extra={"profile": path, "error": str(e)})
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import threading
+
+from sqlalchemy import update, bindparam
+
+from .config import PROGRESS_FLUSH_SECONDS
+from .database import SessionLocal
+from . import models
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBuffer:
+    """
+    Keeps only the latest reading position per book in memory and writes them
+    all in one transaction on flush(). Scroll-driven progress posts then cost
+    a dict assignment instead of a SELECT + UPDATE + commit each.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def record(self, book_id, position):
+        with self._lock:
+            self._pending[book_id] = position
+            self.recorded += 1
+
+    def pending(self, book_id):
+        with self._lock:
+            return self._pending.get(book_id)
+
+    def flush(self):
+        """
+        Write every buffered position in a single transaction. Returns the number of books written.
+        On failure the positions go back into the buffer unless a newer one arrived meanwhile.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        db = self.session_factory()
+        try:
+            # One executemany UPDATE for the whole batch. Core statement rather than the
+            # ORM bulk form, so ids of deleted books just match no row instead of raising.
+            books = models.Book.__table__
+            db.execute(
+                update(books).where(books.c.id == bindparam("book_id")).values(last_read_position=bindparam("position")),
+                [{"book_id": book_id, "position": position} for book_id, position in batch.items()],
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for book_id, position in batch.items():
+                    self._pending.setdefault(book_id, position)
+            raise
+        finally:
+            db.close()
+
+        self.flushes += 1
+        self.rows_written += len(batch)
+        return len(batch)
+
+    async def run(self, interval=PROGRESS_FLUSH_SECONDS):
+        # Background flush loop, started with the app
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                logger.exception("Progress flush error")
+
+    def snapshot(self):
+        with self._lock:
+            buffered = len(self._pending)
+        return {
+            "buffered": buffered,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
+
+progress_buffer = ProgressBuffer()
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Request, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, Request, HTTPException, Query, Response, BackgroundTasks
 from fastapi.responses import HTMLResponse
+from sqlalchemy import select, or_
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models import Book
 from .. import models
+import logging
 import shutil
 import os
+import time
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Literal
 
-from ..parsers.epub_parser import extract_cover_image as extract_epub_cover
-from ..parsers.docx_parser import extract_cover_image as extract_docx_cover
-from ..parsers.pdf_parser import extract_cover_image as extract_pdf_cover
+from ..executors import parse_pool
+from .. import search_index
+from .. import chapter_cache
+from .reader import build_chapter_cache
+from .. import annotation_sync
+from .. import anchors
+from .. import metrics
+from ..progress_buffer import progress_buffer
+from ..config import PAGE_SIZE, MAX_PAGE_SIZE
+from ..pagination import paginate, split_page
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 templates = Jinja2Templates(directory="backend/templates")
@@ -19,13 +32,51 @@ templates = Jinja2Templates(directory="backend/templates")
 UPLOAD_DIR = "backend/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Only what the library grid shows
+LIBRARY_COLUMNS = (
+    models.Book.id, models.Book.title, models.Book.author,
+    models.Book.file_type, models.Book.cover_image, models.Book.created_at,
+)
+
+def library_page(db, cursor=None, limit=PAGE_SIZE):
+    # Oldest first, same order the library has always been shown in
+    stmt = paginate(select(*LIBRARY_COLUMNS), models.Book.created_at, models.Book.id, cursor, limit, descending=False)
+    return split_page(db.execute(stmt).all(), limit)
+
 @router.get("/", response_class=HTMLResponse)
-def get_books(request: Request, db: Session = Depends(get_db)):
-    books = db.query(models.Book).all()
-    return templates.TemplateResponse("index.html", {"request": request, "books": books})
+def get_books(request: Request, cursor: str | None = None, db: Session = Depends(get_db)):
+    books, next_cursor = library_page(db, cursor)
+    return templates.TemplateResponse("index.html", {"request": request, "books": books, "next_cursor": next_cursor})
+
+cover_duration = metrics.histogram(
+    "book_cover_duration_seconds", "Time to extract a book's cover image, per format; outcome is ok or none.",
+    ("format", "outcome"),
+)
+
+def extract_cover(file_type, file_path):
+    # Plain arguments only, so this can also run in a worker process; parsers are imported on first use
+    if file_type == "epub":
+        from ..parsers.epub_parser import extract_cover_image
+    elif file_type == "docx":
+        from ..parsers.docx_parser import extract_cover_image
+    elif file_type == "pdf":
+        from ..parsers.pdf_parser import extract_cover_image
+    else:
+        return None, None
+    started = time.perf_counter()
+    image_data, content_type = extract_cover_image(file_path)
+    cover_duration.observe(time.perf_counter() - started, format=file_type, outcome="ok" if image_data else "none")
+    return image_data, content_type
+
+async def index_for_search(book_id, file_type, file_path):
+    # Runs after the upload response; a failure only means the book isn't searchable yet
+    try:
+        await parse_pool.run(search_index.index_book, book_id, file_type, file_path)
+    except Exception:
+        logger.exception("Error indexing book for search", extra={"book_id": book_id})
 
 @router.post("/upload")
-async def upload_book(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_book(background_tasks: BackgroundTasks, file: UploadFile = File(...), db: Session = Depends(get_db)):
     file_path = os.path.join(UPLOAD_DIR, file.filename)
     
     # Check if file already exists in DB
@@ -67,15 +118,7 @@ async def upload_book(file: UploadFile = File(...), db: Session = Depends(get_db
     
     # Extract Cover Image (if applicable)
     try:
-        cover_data = None
-        content_type = None
-        
-        if file_type == "epub":
-            cover_data, content_type = extract_epub_cover(file_path)
-        elif file_type == "docx":
-            cover_data, content_type = extract_docx_cover(file_path)
-        elif file_type == "pdf":
-            cover_data, content_type = extract_pdf_cover(file_path)
+        cover_data, content_type = await parse_pool.run(extract_cover, file_type, file_path)
             
         if cover_data:
             # Save cover image to static/covers
@@ -98,26 +141,30 @@ async def upload_book(file: UploadFile = File(...), db: Session = Depends(get_db
             new_book.cover_image = f"/static/covers/{cover_filename}"
             db.commit()
             
-    except Exception as e:
-        print(f"Error extracting cover: {e}")
+    except Exception:
+        logger.exception("Error extracting cover", extra={"book_id": new_book.id})
     
+    background_tasks.add_task(index_for_search, new_book.id, file_type, file_path)
+    background_tasks.add_task(build_chapter_cache, new_book.id, file_type, file_path)
     return {"filename": file.filename, "id": new_book.id}
 
 @router.delete("/highlights/{highlight_id}")
 def delete_highlight(highlight_id: int, db: Session = Depends(get_db)):
-    highlight = db.query(models.Highlight).filter(models.Highlight.id == highlight_id).first()
+    highlight = db.get(models.Highlight, highlight_id)
     if not highlight:
         raise HTTPException(status_code=404, detail="Highlight not found")
     db.delete(highlight)
+    annotation_sync.bump_revision(db, highlight.book_id)
     db.commit()
     return {"message": "Highlight deleted"}
 
 @router.delete("/bookmarks/{bookmark_id}")
 def delete_bookmark(bookmark_id: int, db: Session = Depends(get_db)):
-    bookmark = db.query(models.Bookmark).filter(models.Bookmark.id == bookmark_id).first()
+    bookmark = db.get(models.Bookmark, bookmark_id)
     if not bookmark:
         raise HTTPException(status_code=404, detail="Bookmark not found")
     db.delete(bookmark)
+    annotation_sync.bump_revision(db, bookmark.book_id)
     db.commit()
     return {"message": "Bookmark deleted"}
 
@@ -133,6 +180,8 @@ def delete_book(book_id: int, db: Session = Depends(get_db)):
         
     db.delete(book)
     db.commit()
+    search_index.remove_book(book_id)
+    chapter_cache.remove(book_id)
     return {"message": "Book deleted"}
 
 class CommentCreate(BaseModel):
@@ -154,13 +203,14 @@ def add_comment(book_id: int, comment: CommentCreate, db: Session = Depends(get_
         cfi_range=comment.cfi_range
     )
     db.add(db_comment)
+    annotation_sync.bump_revision(db, book_id)
     db.commit()
     db.refresh(db_comment)
     return db_comment
 
 @router.get("/{book_id}/comments")
 def get_comments(book_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Comment).filter(models.Comment.book_id == book_id).all()
+    return db.scalars(select(models.Comment).filter(models.Comment.book_id == book_id)).all()
 
 @router.post("/{book_id}/bookmarks")
 def add_bookmark(book_id: int, bookmark: BookmarkCreate, db: Session = Depends(get_db)):
@@ -171,13 +221,97 @@ def add_bookmark(book_id: int, bookmark: BookmarkCreate, db: Session = Depends(g
         comment=bookmark.comment
     )
     db.add(db_bookmark)
+    annotation_sync.bump_revision(db, book_id)
     db.commit()
     db.refresh(db_bookmark)
     return db_bookmark
 
 @router.get("/{book_id}/bookmarks")
 def get_bookmarks(book_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Bookmark).filter(models.Bookmark.book_id == book_id).all()
+    return db.scalars(select(models.Bookmark).filter(models.Bookmark.book_id == book_id)).all()
+
+def parse_chapters(chapters):
+    # "?chapters=3,4" -> [3, 4]; None means every chapter
+    if chapters is None:
+        return None
+    try:
+        return [int(part) for part in chapters.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="chapters must be comma-separated chapter indexes")
+
+def highlights_statement(book_id, chapters=None):
+    stmt = select(models.Highlight).filter(models.Highlight.book_id == book_id)
+    if chapters is not None:
+        # Through the (book_id, chapter_index) index. Highlights whose chapter couldn't be
+        # resolved come with every chapter; the reader skips ones it already applied.
+        stmt = stmt.filter(or_(
+            models.Highlight.chapter_index.in_(chapters),
+            models.Highlight.chapter_index.is_(None),
+        ))
+    return stmt.order_by(models.Highlight.created_at, models.Highlight.id)
+
+@router.get("/{book_id}/annotations")
+def get_annotations(
+    book_id: int,
+    request: Request,
+    response: Response,
+    chapters: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Highlights, bookmarks and comments of a book in one response.
+    The ETag is the book's annotation revision: a client that already has the
+    current revision gets a 304 after a single primary key lookup.
+    With ?chapters=0,1 only the highlights of those chapters are included.
+    """
+    chapter_list = parse_chapters(chapters)
+    # 1. Revision first: a write landing during the reads below makes the body newer
+    #    than its ETag, which only costs the client one extra full response later
+    row = db.execute(select(models.Book.annotations_rev).filter(models.Book.id == book_id)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    revision = row.annotations_rev or 0
+    etag = f'W/"annotations-{book_id}-{revision}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # 2. Everything else, through the (book_id, created_at) indexes
+    annotations = {"revision": revision}
+    annotations["highlights"] = db.scalars(highlights_statement(book_id, chapter_list)).all()
+    for key, model in (("bookmarks", models.Bookmark), ("comments", models.Comment)):
+        annotations[key] = db.scalars(
+            select(model).filter(model.book_id == book_id).order_by(model.created_at, model.id)
+        ).all()
+
+    response.headers.update(headers)
+    return annotations
+
+class AnnotationOp(BaseModel):
+    op: Literal["create", "update", "delete"]
+    type: Literal["highlight", "bookmark", "comment"]
+    # Client-generated id; annotations created outside the sync queue are addressed by `id`
+    client_id: str | None = Field(default=None, max_length=64)
+    id: int | None = None
+    data: dict = {}
+
+class AnnotationBatch(BaseModel):
+    batch_id: str = Field(min_length=1, max_length=64)
+    ops: list[AnnotationOp] = Field(max_length=500)
+
+@router.post("/{book_id}/annotations/sync")
+def sync_annotations(book_id: int, batch: AnnotationBatch, db: Session = Depends(get_db)):
+    """
+    Apply an ordered batch of annotation operations in one transaction.
+    Safe to replay: see annotation_sync.py.
+    """
+    if db.get(models.Book, book_id) is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    try:
+        return annotation_sync.apply_batch(db, book_id, batch.batch_id, batch.ops)
+    except annotation_sync.InvalidOperation as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 class HighlightCreate(BaseModel):
     selected_text: str
@@ -192,43 +326,53 @@ def add_highlight(book_id: int, highlight: HighlightCreate, db: Session = Depend
         cfi_range=highlight.cfi_range,
         color=highlight.color
     )
+    anchors.set_anchor(db_highlight)
     db.add(db_highlight)
+    annotation_sync.bump_revision(db, book_id)
     db.commit()
     db.refresh(db_highlight)
     return db_highlight
 
 @router.get("/{book_id}/highlights")
-def get_highlights(book_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Highlight).filter(models.Highlight.book_id == book_id).all()
+def get_highlights(book_id: int, chapters: str | None = None, db: Session = Depends(get_db)):
+    # ?chapters=5 is what the reader asks for as chapters scroll into view
+    return db.scalars(highlights_statement(book_id, parse_chapters(chapters))).all()
 
 @router.get("/{book_id}/vocabulary")
-def get_book_vocabulary(book_id: int, db: Session = Depends(get_db)):
-    # 1. Get Book Title
-    book = db.query(models.Book).filter(models.Book.id == book_id).first()
+def get_book_vocabulary(
+    book_id: int,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    # 1. Make sure the book exists
+    book = db.get(models.Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Ideally we should link Word to Book via ID, but current schema uses title.
-    return db.query(models.Word).filter(models.Word.book_title == book.title).all()
+    # 2. Newest first, one page at a time (served by the (book_id, created_at) index)
+    stmt = paginate(
+        select(models.Word).filter(models.Word.book_id == book_id),
+        models.Word.created_at, models.Word.id, cursor, limit,
+    )
+    words, next_cursor = split_page(db.scalars(stmt).all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return words
 
 class ProgressUpdate(BaseModel):
     position: str
 
 @router.post("/{book_id}/progress")
-def update_progress(book_id: int, progress: ProgressUpdate, db: Session = Depends(get_db)):
-    book = db.query(models.Book).filter(models.Book.id == book_id).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    
-    book.last_read_position = progress.position
-    db.commit()
+async def update_progress(book_id: int, progress: ProgressUpdate):
+    # Buffered in memory and written in batches, see progress_buffer.py.
+    # No database work here, so it stays on the event loop instead of the thread pool.
+    progress_buffer.record(book_id, progress.position)
     return {"message": "Progress saved"}
 
 @router.post("/{book_id}/progress_beacon", status_code=204)
-def update_progress_beacon(book_id: int, progress: ProgressUpdate, db: Session = Depends(get_db)):
+async def update_progress_beacon(book_id: int, progress: ProgressUpdate):
     # Same as update_progress but simplified return for beacon
-    book = db.query(models.Book).filter(models.Book.id == book_id).first()
-    if book:
-        book.last_read_position = progress.position
-        db.commit()
+    progress_buffer.record(book_id, progress.position)
     return
@@ -1,32 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from deep_translator import GoogleTranslator
+from pydantic import BaseModel, Field
 from ..database import get_db
 from .. import models
-import requests
 import re
-from ..naver_scraper import scrape_naver_dict
+from ..naver_scraper import fetch_naver_raw, parse_naver_result, json_loads
+from .. import upstream_cache, offline_dictionary
+from ..upstream import SourceUnavailable, sources_status
+from ..executors import PoolBusy, io_pool
+from .. import upstream
+from .. import word_search
+from ..config import PAGE_SIZE, MAX_PAGE_SIZE, FREEDICT_URL
+from ..translation import google_translator, TRANSLATION_CACHE, CACHE_STATS as TRANSLATION_CACHE_STATS
+from .. import metrics
+from ..logs import span
+from ..pagination import paginate, split_page
 
 import asyncio
+import logging
+import random
+from collections import Counter
 from functools import partial
 from ..stardict_manager import StarDictManager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# Initialize StarDict Manager
-stardict_manager = StarDictManager()
+# StarDict dictionaries load in the background after startup (see main.lifespan);
+# until then lookups fall through to the other sources
+stardict_manager = StarDictManager(autoload=False)
 
 # Simple in-memory cache
 WORD_CACHE = {}
 CACHE_LIMIT = 1000
 
+# Lookups served from WORD_CACHE, and which source answered the others (see /dictionary/cache)
+LOOKUP_STATS = {"cache_hits": 0, "cache_misses": 0, "cache_evictions": 0, "answered_by": Counter()}
+
+def cache_result(cache_key, result):
+    # Oldest entry out first once the cache is full
+    if len(WORD_CACHE) >= CACHE_LIMIT:
+        WORD_CACHE.pop(next(iter(WORD_CACHE)))
+        LOOKUP_STATS["cache_evictions"] += 1
+    WORD_CACHE[cache_key] = result
+
 class WordCreate(BaseModel):
     original_word: str
     translated_word: str
     pronunciation: str | None = None
     context_sentence: str | None = None
     book_title: str | None = None
+    book_id: int | None = None
     language: str = "en"
 
 from datetime import datetime
@@ -52,7 +78,7 @@ TRANSLATOR_CACHE = {}
 def get_translator(source="auto", target="ko"):
     key = f"{source}-{target}"
     if key not in TRANSLATOR_CACHE:
-        TRANSLATOR_CACHE[key] = GoogleTranslator(source=source, target=target)
+        TRANSLATOR_CACHE[key] = google_translator(source=source, target=target)
     return TRANSLATOR_CACHE[key]
 
 @router.get("/lookup")
@@ -60,7 +86,10 @@ async def lookup_word(word: str, context: str | None = None, source: str = "auto
     # Check cache
     cache_key = f"{word}:{source}:{target}"
     if cache_key in WORD_CACHE:
+        LOOKUP_STATS["cache_hits"] += 1
         return WORD_CACHE[cache_key]
+    LOOKUP_STATS["cache_misses"] += 1
+    answered_by = LOOKUP_STATS["answered_by"]
 
     definitions = []
     pronunciation = None
@@ -91,26 +120,66 @@ async def lookup_word(word: str, context: str | None = None, source: str = "auto
                 translator = get_translator(source=source, target=target)
                 return translator.translate(word)
              
-             translation = await asyncio.to_thread(google_translate_direct)
+             try:
+                 translation = await upstream.google.call(google_translate_direct)
+             except SourceUnavailable:
+                 translation = None
+             answered_by["google" if translation else "none"] += 1
              return {"definitions": [translation] if translation else ["Translation failed."], "pronunciation": None, "examples": []}
 
         # 0. Try Local StarDict
-        local_def = stardict_manager.lookup(word)
+        with span("lookup.stardict"):
+            local_def = stardict_manager.lookup(word)
         if local_def:
             # StarDict definitions are often HTML or plain text.
             # We'll wrap it in a list to match the 'definitions' structure.
             # If it's very long, we might want to truncate or format it, but for now raw is fine.
             result = {"definitions": [local_def], "pronunciation": None}
             
-            # Update Cache
-            if len(WORD_CACHE) >= CACHE_LIMIT:
-                WORD_CACHE.pop(next(iter(WORD_CACHE)))
-            WORD_CACHE[cache_key] = result
+            cache_result(cache_key, result)
             
+            answered_by["stardict"] += 1
             return result
 
+        # 0.5. Try the offline dictionary store (bulk imports and exported lookups)
+        # SQLite reads run on the I/O pool like the network sources, not on the event loop
+        with span("lookup.offline"):
+            offline_result = await io_pool.run(offline_dictionary.lookup, word, lang)
+        if offline_result:
+            cache_result(cache_key, offline_result)
+            answered_by["offline"] += 1
+            return offline_result
+
         # 1. Try Naver Dictionary Scraping (Async)
-        naver_result = await asyncio.to_thread(scrape_naver_dict, word, lang=lang)
+        # The raw response cache is checked first; the network call is skipped
+        # straight away while the Naver circuit is open or rate limited
+        naver_result = None
+        cache_source = f"naver:{lang}"
+        naver_raw = await io_pool.run(upstream_cache.get, cache_source, word)
+        if naver_raw is not None:
+            try:
+                naver_result = parse_naver_result(naver_raw, lang=lang)
+            except Exception as e:
+                # Not a search response (e.g. an error body cached before responses were
+                # checked): a miss, and dropped so it isn't served for the rest of its TTL
+                logger.warning("Unreadable cached Naver response", extra={"word": word, "lang": lang, "error": str(e)})
+                await io_pool.run(upstream_cache.delete, cache_source, word)
+                naver_raw = None
+
+        if naver_raw is None:
+            def fetch_naver():
+                raw = fetch_naver_raw(word, lang=lang)
+                # Decoded in full before caching, so only a readable search response is stored
+                result = parse_naver_result(json_loads(raw), lang=lang)
+                upstream_cache.put(cache_source, word, raw)
+                return result
+
+            try:
+                naver_result = await upstream.naver.call(fetch_naver)
+            except SourceUnavailable:
+                pass
+            except Exception as e:
+                logger.warning("Error scraping Naver Dict", extra={"word": word, "lang": lang, "error": str(e)})
         
         if naver_result:
             # Naver returns semicolon separated string, split it for frontend
@@ -121,19 +190,24 @@ async def lookup_word(word: str, context: str | None = None, source: str = "auto
             
             result = {"definitions": definitions, "pronunciation": pronunciation, "examples": examples}
             
-            # Update Cache
-            if len(WORD_CACHE) >= CACHE_LIMIT:
-                WORD_CACHE.pop(next(iter(WORD_CACHE)))
-            WORD_CACHE[cache_key] = result
+            cache_result(cache_key, result)
             
+            answered_by["naver"] += 1
             return result
             
         # 2. Fallback: Google Translator (if Naver fails) (Async)
         def google_translate():
             translator = get_translator(source=source, target=target)
-            return translator.translate(word)
+            translation = translator.translate(word)
+            if translation:
+                # Recorded so `import_dictionary cache` can move it to the offline store
+                upstream_cache.put(f"google:{lang}:{target}", word, translation)
+            return translation
 
-        translation = await asyncio.to_thread(google_translate)
+        try:
+            translation = await upstream.google.call(google_translate)
+        except SourceUnavailable:
+            translation = None
         
         if translation:
             definitions.append(translation)
@@ -142,10 +216,15 @@ async def lookup_word(word: str, context: str | None = None, source: str = "auto
         if lang == "en":
              try:
                 def fetch_free_dict():
-                    api_url = f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-                    return requests.get(api_url, timeout=2)
+                    import requests
+                    api_url = FREEDICT_URL.format(word=word)
+                    response = requests.get(api_url, timeout=2)
+                    # 404 just means "no such word"; only server errors count against the source
+                    if response.status_code >= 500:
+                        response.raise_for_status()
+                    return response
                 
-                response = await asyncio.to_thread(fetch_free_dict)
+                response = await upstream.freedict.call(fetch_free_dict)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -164,78 +243,153 @@ async def lookup_word(word: str, context: str | None = None, source: str = "auto
             examples = []
 
         result = {"definitions": definitions, "pronunciation": pronunciation, "examples": examples}
+        answered_by["google" if translation else "freedict" if definitions else "none"] += 1
         
-        # Update Cache
-        if len(WORD_CACHE) >= CACHE_LIMIT:
-            WORD_CACHE.pop(next(iter(WORD_CACHE)))
-        WORD_CACHE[cache_key] = result
+        # Update Cache (not when every source was skipped, they may be back soon)
+        if definitions:
+            cache_result(cache_key, result)
         
         return result
 
-    except Exception as e:
-        print(f"Dictionary lookup error: {e}")
+    except PoolBusy:
+        # Served as 503 by the app's exception handler; a fallback would only queue more work
+        raise
+    except Exception:
+        logger.exception("Dictionary lookup error", extra={"word": word})
+        LOOKUP_STATS["answered_by"]["error"] += 1
         # Ultimate Fallback
         try:
             def google_translate_fallback():
                 translator = get_translator(source=source, target=target)
                 return translator.translate(word)
                 
-            translation = await asyncio.to_thread(google_translate_fallback)
+            translation = await upstream.google.call(google_translate_fallback)
             return {"definitions": [translation], "pronunciation": None}
-        except Exception as fallback_error:
-            print(f"Fallback error: {fallback_error}")
+        except Exception as e:
+            logger.warning("Fallback error", extra={"word": word, "error": str(e)})
             # Return a friendly error instead of 500
             return {"definitions": ["Could not find definition."], "pronunciation": None}
 
+@router.get("/sources")
+def get_sources_status():
+    # Circuit breaker and rate limit state of every upstream source, for monitoring
+    return sources_status()
+
+@router.get("/cache")
+def get_cache_stats():
+    # Hit rates of the lookup caches since startup, and which source answered the rest
+    lookups = LOOKUP_STATS["cache_hits"] + LOOKUP_STATS["cache_misses"]
+    return {
+        "word_cache": {
+            "size": len(WORD_CACHE),
+            "limit": CACHE_LIMIT,
+            "hits": LOOKUP_STATS["cache_hits"],
+            "misses": LOOKUP_STATS["cache_misses"],
+            "evictions": LOOKUP_STATS["cache_evictions"],
+            "hit_rate": round(LOOKUP_STATS["cache_hits"] / lookups, 4) if lookups else None,
+        },
+        "upstream_cache": upstream_cache.snapshot(),
+        "answered_by": dict(LOOKUP_STATS["answered_by"]),
+    }
+
+@metrics.register_collector
+def _cache_metrics():
+    raw = upstream_cache.stats
+    return [
+        ("lookup_cache_requests_total", "counter",
+         "Cache lookups per cache (word: lookup results, upstream: raw responses, translation: paragraphs) and result.",
+         [({"cache": "word", "result": "hit"}, LOOKUP_STATS["cache_hits"]),
+          ({"cache": "word", "result": "miss"}, LOOKUP_STATS["cache_misses"]),
+          ({"cache": "upstream", "result": "hit"}, raw["hits"]),
+          ({"cache": "upstream", "result": "miss"}, raw["misses"]),
+          ({"cache": "upstream", "result": "expired"}, raw["expired"]),
+          ({"cache": "translation", "result": "hit"}, TRANSLATION_CACHE_STATS["hits"]),
+          ({"cache": "translation", "result": "miss"}, TRANSLATION_CACHE_STATS["misses"])]),
+        ("lookup_cache_evictions_total", "counter", "Entries dropped to stay under the cache limit.",
+         [({"cache": "word"}, LOOKUP_STATS["cache_evictions"]),
+          ({"cache": "translation"}, TRANSLATION_CACHE_STATS["evictions"])]),
+        ("lookup_cache_entries", "gauge", "Entries held by each in-memory cache.",
+         [({"cache": "word"}, len(WORD_CACHE)), ({"cache": "translation"}, len(TRANSLATION_CACHE))]),
+        ("lookup_answers_total", "counter", "Lookups not served from the word cache, by the source that answered.",
+         [({"source": source}, count) for source, count in LOOKUP_STATS["answered_by"].items()]),
+    ]
+
 @router.post("/words", response_model=WordResponse)
 def save_word(word: WordCreate, db: Session = Depends(get_db)):
+    book_id = word.book_id
+    if book_id is None and word.book_title:
+        # Older clients only send the title
+        book_id = db.scalar(select(models.Book.id).filter(models.Book.title == word.book_title).limit(1))
+
     db_word = models.Word(
         original_word=word.original_word,
         translated_word=word.translated_word,
         pronunciation=word.pronunciation,
         context_sentence=word.context_sentence,
         book_title=word.book_title,
+        book_id=book_id,
         language=word.language
     )
     db.add(db_word)
+    # Flush for the id, then index the word in the same transaction
+    db.flush()
+    word_search.add(db, db_word)
     db.commit()
     db.refresh(db_word)
     return db_word
 
 @router.get("/words", response_model=list[WordResponse])
-def get_words(db: Session = Depends(get_db)):
-    return db.query(models.Word).order_by(models.Word.created_at.desc()).all()
+def get_words(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    # Newest first; the next page is requested with ?cursor=<X-Next-Cursor>
+    stmt = paginate(select(models.Word), models.Word.created_at, models.Word.id, cursor, limit)
+    words, next_cursor = split_page(db.scalars(stmt).all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return words
+
+@router.get("/words/search", response_model=list[WordResponse])
+def search_words(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    # Search as you type over word, translation and context (CJK substrings included)
+    return word_search.search(db, q, limit)
 
 @router.delete("/words/{word_id}")
 def delete_word(word_id: int, db: Session = Depends(get_db)):
-    word = db.query(models.Word).filter(models.Word.id == word_id).first()
+    word = db.get(models.Word, word_id)
     if not word:
         raise HTTPException(status_code=404, detail="Word not found")
     db.delete(word)
+    word_search.remove(db, word_id)
     db.commit()
     return {"message": "Word deleted"}
 
-import random
+from .. import srs
+from ..config import QUIZ_SIZE
 
 @router.get("/quiz")
 def get_quiz_data(db: Session = Depends(get_db)):
-    words = db.query(models.Word).all()
-    
-    if len(words) < 4:
+    # 1. Due words, topped up with upcoming ones so there is a quiz whenever there are words
+    quiz_words = srs.pick_quiz_words(db, QUIZ_SIZE, fill_upcoming=True)
+    if len(quiz_words) < 4:
         return {"error": "Not enough words. Please save at least 4 words to start a quiz."}
-    
-    # Select up to 10 random words for the quiz
-    quiz_words = random.sample(words, min(len(words), 10))
+
+    # 2. Three distractors per question by random index seeks, never a scan of the whole table
     quiz_data = []
-    
     for word in quiz_words:
-        # Select 3 distractors
-        distractors = random.sample([w for w in words if w.id != word.id], 3)
-        options = [d.translated_word for d in distractors]
+        options = srs.pick_distractors(db, word, 3)
         options.append(word.translated_word)
         random.shuffle(options)
         
         quiz_data.append({
+            "word_id": word.id,
             "question": word.original_word,
             "options": options,
             "answer": word.translated_word,
@@ -244,37 +398,49 @@ def get_quiz_data(db: Session = Depends(get_db)):
         
     return quiz_data
 
-import csv
-import io
+class QuizResult(BaseModel):
+    word_id: int
+    correct: bool
+    # SM-2 grade 0-5; derived from `correct` when not given
+    quality: int | None = Field(default=None, ge=0, le=5)
+
+class QuizResults(BaseModel):
+    results: list[QuizResult]
+
+@router.post("/quiz/results")
+def save_quiz_results(payload: QuizResults, db: Session = Depends(get_db)):
+    now = datetime.utcnow()
+    schedule = {}
+    for result in payload.results:
+        word = db.get(models.Word, result.word_id)
+        if not word:
+            continue
+        quality = result.quality
+        if quality is None:
+            quality = srs.CORRECT_QUALITY if result.correct else srs.WRONG_QUALITY
+        srs.review(word, quality, now)
+        schedule[word.id] = word.due_at
+
+    # All answers of one submission in one transaction
+    db.commit()
+    return {"updated": len(schedule), "due_at": schedule}
+
 from fastapi.responses import StreamingResponse
+from ..database import SessionLocal
+from ..vocabulary_export import FORMATS, stream_export
 
 @router.get("/export")
-def export_vocabulary(db: Session = Depends(get_db)):
-    words = db.query(models.Word).order_by(models.Word.created_at.desc()).all()
-    
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow(['Word', 'Pronunciation', 'Translation', 'Context Sentence', 'Book Title', 'Date Added'])
-    
-    # Data
-    for word in words:
-        writer.writerow([
-            word.original_word,
-            word.pronunciation or '',
-            word.translated_word,
-            word.context_sentence or '',
-            word.book_title or '',
-            word.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-        
-    output.seek(0)
-    
-    # Prepend BOM for Excel compatibility with UTF-8
-    content = '\ufeff' + output.getvalue()
-    
-    response = StreamingResponse(iter([content]), media_type="text/csv; charset=utf-8")
-    response.headers["Content-Disposition"] = "attachment; filename=vocabulary_export.csv"
+def export_vocabulary(format: str = "csv", gzip: bool = False):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format '{format}', expected one of {list(FORMATS)}")
+
+    # The body is generated while it is sent; the generator opens its own session
+    media_type, extension = FORMATS[format]
+    filename = f"vocabulary_export.{extension}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    response = StreamingResponse(stream_export(SessionLocal, format, compress=gzip), media_type=media_type)
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return response
@@ -1,60 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db
 from ..models import Book
-from ..parsers.epub_parser import read_epub, get_epub_image
-from ..parsers.docx_parser import read_docx, get_docx_image
-from ..parsers.txt_parser import read_txt
-from ..parsers.pdf_parser import read_pdf
+from ..translation import split_paragraphs, translate_paragraphs
+from ..executors import parse_pool
+from ..parsers import parse_book
+from ..progress_buffer import progress_buffer
+from .. import chapter_cache
+from ..logs import span
+from ..compression import precompressed_response
 from fastapi.templating import Jinja2Templates
-import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 templates = Jinja2Templates(directory="backend/templates")
 
+def extract_image(file_type, file_path, image_path):
+    if file_type == 'epub':
+        from ..parsers.epub_parser import get_epub_image
+        return get_epub_image(file_path, image_path)
+    elif file_type == 'docx':
+        from ..parsers.docx_parser import get_docx_image
+        return get_docx_image(file_path, image_path)
+    return None, None
+
+async def build_chapter_cache(book_id, file_type, file_path, content=None):
+    # Runs after the response; a failure only means the next open parses the book again
+    try:
+        await parse_pool.run(chapter_cache.build, book_id, file_type, file_path, content)
+    except Exception:
+        logger.exception("Error caching chapters", extra={"book_id": book_id})
+
+async def load_content(book, background_tasks=None):
+    # 1. Chapters parsed earlier, see chapter_cache.py
+    with span("chapter_cache") as stage:
+        content = await parse_pool.run(chapter_cache.load, book.id, book.file_path)
+        stage.set(hit=bool(content))
+    if content:
+        return content
+
+    # 2. Parse, and write the cache (with its compressed copies) after the response is sent
+    content = await parse_pool.run(parse_book, book.file_type, book.file_path, chapter_cache.image_base_url(book.id))
+    if content and background_tasks is not None:
+        background_tasks.add_task(build_chapter_cache, book.id, book.file_type, book.file_path, content)
+    return content
+
 @router.get("/{book_id}")
-def read_book(book_id: int, request: Request, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+async def read_book(book_id: int, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    
-    content = None
-    image_base_url = f"/reader/{book_id}/images"
-    
-    if book.file_type == 'epub':
-        content = read_epub(book.file_path, image_base_url)
-    elif book.file_type == 'docx':
-        content = read_docx(book.file_path, image_base_url)
-    elif book.file_type == 'txt':
-        content = read_txt(book.file_path)
-    elif book.file_type == 'pdf':
-        content = read_pdf(book.file_path, image_base_url)
-    
+
+    # With the chapter cache built, the page only lists the chapters and loads each one from
+    # get_chapter, as stored (.br/.gz). Before that, the parsed chapters are rendered inline.
+    with span("chapter_cache", part="meta") as stage:
+        content = await parse_pool.run(chapter_cache.load_meta, book.id, book.file_path)
+        stage.set(hit=bool(content))
+    if not content:
+        content = await load_content(book, background_tasks)
+
     if not content:
         raise HTTPException(status_code=500, detail="Could not read book content")
 
-    return templates.TemplateResponse("reader.html", {
-        "request": request, 
-        "book": book,
-        "content": content
-    })
+    # The template is rendered here, when the response is created
+    with span("render", template="reader.html"):
+        return templates.TemplateResponse("reader.html", {
+            "request": request, 
+            "book": book,
+            "content": content,
+            # A position that hasn't been flushed yet is newer than the stored one
+            "last_read_position": progress_buffer.pending(book.id) or book.last_read_position
+        })
 
 @router.get("/{book_id}/images/{image_path:path}")
-def get_book_image(book_id: int, image_path: str, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+async def get_book_image(book_id: int, image_path: str, db: AsyncSession = Depends(get_async_db)):
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
         
-    image_data = None
-    content_type = None
-    
-    if book.file_type == 'epub':
-        image_data, content_type = get_epub_image(book.file_path, image_path)
-    elif book.file_type == 'docx':
-        image_data, content_type = get_docx_image(book.file_path, image_path)
+    image_data, content_type = await parse_pool.run(extract_image, book.file_type, book.file_path, image_path)
         
     if image_data:
         return Response(content=image_data, media_type=content_type or "image/jpeg")
     
     raise HTTPException(status_code=404, detail="Image not found")
 
+
+@router.get("/{book_id}/chapters/{chapter_index}")
+async def get_chapter(book_id: int, chapter_index: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    The HTML of one chapter (1-based), served from the chapter cache as stored:
+    the precompressed .br/.gz copy when the client accepts it.
+    """
+    book = await db.get(Book, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    path = chapter_cache.chapter_path(book.id, book.file_path, chapter_index)
+    if path is None and not chapter_cache.is_built(book.id, book.file_path):
+        await parse_pool.run(chapter_cache.build, book.id, book.file_type, book.file_path)
+        path = chapter_cache.chapter_path(book.id, book.file_path, chapter_index)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+
+    return precompressed_response(
+        path, request.headers.get("accept-encoding"),
+        media_type="text/html; charset=utf-8", headers={"Cache-Control": "no-cache"},
+    )
+
+@router.get("/{book_id}/chapters/{chapter_index}/translate")
+async def translate_chapter(book_id: int, chapter_index: int, background_tasks: BackgroundTasks, source: str = "auto", target: str = "ko", db: AsyncSession = Depends(get_async_db)):
+    """
+    Translate a whole chapter paragraph by paragraph.
+    chapter_index is 1-based, matching the `chapter-N` ids of the reader page.
+    Streams one JSON object per line: {"index", "text", "translation"}, in reading order.
+    """
+    book = await db.get(Book, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    content = await load_content(book, background_tasks)
+    if not content:
+        raise HTTPException(status_code=500, detail="Could not read book content")
+
+    chapters = content['chapters']
+    if chapter_index < 1 or chapter_index > len(chapters):
+        raise HTTPException(status_code=404, detail="Chapter not found")
+
+    paragraphs = await parse_pool.run(split_paragraphs, chapters[chapter_index - 1]['content'])
+
+    async def stream():
+        async for index, text, translation in translate_paragraphs(paragraphs, source=source, target=target):
+            yield json.dumps({"index": index, "text": text, "translation": translation}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from urllib.parse import quote
+from ..database import get_db
+from .. import models
+from .. import search_index
+
+router = APIRouter()
+
+@router.get("")
+def search_library(
+    q: str = Query(..., min_length=1),
+    book_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """
+    Ranked passages matching every term of q, across the library or within one book.
+    Each hit links to the reader, which scrolls to the passage (?search=).
+    """
+    hits = search_index.search(q, limit=limit, book_id=book_id)
+    if not hits:
+        return []
+
+    titles = dict(
+        db.query(models.Book.id, models.Book.title)
+        .filter(models.Book.id.in_({hit["book_id"] for hit in hits}))
+        .all()
+    )
+
+    results = []
+    for hit in hits:
+        # Books deleted since they were indexed
+        if hit["book_id"] not in titles:
+            continue
+        passage = hit["snippet"].replace("<mark>", "").replace("</mark>", "")
+        hit["title"] = titles[hit["book_id"]]
+        hit["url"] = f"/reader/{hit['book_id']}?search={quote(passage)}"
+        results.append(hit)
+    return results
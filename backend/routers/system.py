@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from ..executors import pools_status
+from ..progress_buffer import progress_buffer
+from .. import startup
+
+router = APIRouter()
+
+@router.get("/executors")
+def get_executors_status():
+    # Utilization, backlog and rejections of each worker pool
+    return pools_status()
+
+@router.get("/ready")
+def get_ready():
+    # 503 until background startup work (dictionaries, search index backfill) has finished, for health checks and launchers
+    status = startup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@router.get("/progress_buffer")
+def get_progress_buffer_status():
+    return progress_buffer.snapshot()
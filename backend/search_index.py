@@ -0,0 +1,226 @@
+"""
+Full-text search over the whole library (SQLite FTS5).
+
+Every paragraph of every book is one row, with its book id and 1-based chapter
+index (the `chapter-N` ids of the reader page). Books are indexed one at a time
+when uploaded, and skipped later while their file is unchanged. Books added
+before the index existed are indexed in the background at startup; until then
+searches return what is indexed so far (see /system/ready).
+
+    python -m backend.search_index           # index new/changed books, drop deleted ones
+    python -m backend.search_index --rebuild # re-index everything
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+
+from .config import SEARCH_INDEX_PATH
+from .fts import segment, unsegment, build_query
+from .translation import split_paragraphs
+from .parsers import parse_book
+from .database import SessionLocal
+from . import models
+
+# Passage text is stored segmented for CJK matching, see fts.py
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+    text,
+    book_id UNINDEXED,
+    chapter_index UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS indexed_books (
+    book_id INTEGER PRIMARY KEY,
+    file_path VARCHAR NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    passages INTEGER NOT NULL
+);
+"""
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def connect(path=None):
+    path = path or SEARCH_INDEX_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connect()
+        _local.conn = conn
+    return conn
+
+
+def extract_passages(file_type, file_path):
+    """
+    Yield (chapter_index, paragraph text) for a book file, in reading order.
+    """
+    content = parse_book(file_type, file_path)
+    if not content:
+        return
+    for chapter_index, chapter in enumerate(content['chapters'], start=1):
+        for text in split_paragraphs(chapter['content']):
+            yield chapter_index, text
+
+
+def _file_state(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime, stat.st_size
+
+
+def is_indexed(book_id, file_path, conn=None):
+    conn = conn or _conn()
+    row = conn.execute("SELECT file_path, mtime, size FROM indexed_books WHERE book_id = ?", (book_id,)).fetchone()
+    if not row or not os.path.exists(file_path):
+        return False
+    return row == (file_path, *_file_state(file_path))
+
+
+def index_book(book_id, file_type, file_path, force=False, conn=None):
+    """
+    (Re)index one book; only its own rows are touched.
+    Returns the number of passages written, or None when the book was already up to date.
+    """
+    conn = conn or _conn()
+    if not force and is_indexed(book_id, file_path, conn):
+        return None
+
+    mtime, size = _file_state(file_path)
+    rows = [(segment(text), book_id, chapter_index) for chapter_index, text in extract_passages(file_type, file_path)]
+    with conn:
+        conn.execute("DELETE FROM passages WHERE book_id = ?", (book_id,))
+        conn.executemany("INSERT INTO passages (text, book_id, chapter_index) VALUES (?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO indexed_books (book_id, file_path, mtime, size, passages) VALUES (?, ?, ?, ?, ?)",
+            (book_id, file_path, mtime, size, len(rows)),
+        )
+    return len(rows)
+
+
+def remove_book(book_id, conn=None):
+    conn = conn or _conn()
+    with conn:
+        conn.execute("DELETE FROM passages WHERE book_id = ?", (book_id,))
+        conn.execute("DELETE FROM indexed_books WHERE book_id = ?", (book_id,))
+
+
+def search(query, limit=20, book_id=None, conn=None):
+    """
+    Return ranked matches as dicts: book_id, chapter_index, snippet (matches wrapped in <mark>).
+    """
+    match = build_query(query)
+    if not match:
+        return []
+
+    sql = """
+        SELECT book_id, chapter_index,
+               snippet(passages, 0, '<mark>', '</mark>', '...', 24),
+               bm25(passages)
+        FROM passages
+        WHERE passages MATCH ?
+    """
+    params = [match]
+    if book_id is not None:
+        sql += " AND book_id = ?"
+        params.append(book_id)
+    sql += " ORDER BY bm25(passages) LIMIT ?"
+    params.append(limit)
+
+    try:
+        rows = (conn or _conn()).execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        logger.warning("Search error", extra={"query": match, "error": str(e)})
+        return []
+
+    return [
+        {"book_id": row[0], "chapter_index": row[1], "snippet": unsegment(row[2]), "score": round(-row[3], 4)}
+        for row in rows
+    ]
+
+
+def index_missing(books, conn=None):
+    """
+    Index the books that have no entry yet; changed files are left to sync_library.
+    `books` is an iterable of (id, file_type, file_path). Returns how many were indexed.
+    """
+    conn = conn or _conn()
+    known = {row[0] for row in conn.execute("SELECT book_id FROM indexed_books")}
+    indexed = 0
+    for book_id, file_type, file_path in books:
+        if book_id in known or not os.path.exists(file_path):
+            continue
+        try:
+            index_book(book_id, file_type, file_path, conn=conn)
+            indexed += 1
+        except Exception:
+            logger.exception("Error indexing book", extra={"book_id": book_id})
+    return indexed
+
+
+def index_library():
+    # Startup step on the parse pool: books added before the search index existed
+    with SessionLocal() as db:
+        books = db.query(models.Book.id, models.Book.file_type, models.Book.file_path).all()
+    indexed = index_missing(books)
+    if indexed:
+        logger.info("Indexed books missing from the search index", extra={"books": indexed})
+
+
+def sync_library(books, rebuild=False, conn=None):
+    """
+    Index new or changed books and drop the ones that no longer exist.
+    `books` is an iterable of (id, file_type, file_path).
+    """
+    conn = conn or _conn()
+    seen = set()
+    indexed = 0
+    for book_id, file_type, file_path in books:
+        seen.add(book_id)
+        if not os.path.exists(file_path):
+            print(f"Skipping book {book_id}: {file_path} not found")
+            continue
+        count = index_book(book_id, file_type, file_path, force=rebuild, conn=conn)
+        if count is not None:
+            print(f"Indexed book {book_id}: {count} passages")
+            indexed += 1
+
+    stale = [row[0] for row in conn.execute("SELECT book_id FROM indexed_books") if row[0] not in seen]
+    for book_id in stale:
+        remove_book(book_id, conn)
+    if indexed or stale:
+        conn.execute("INSERT INTO passages (passages) VALUES ('optimize')")
+        conn.commit()
+    return indexed, len(stale)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild', action='store_true', help='re-index books even if their file is unchanged')
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+    from . import models
+
+    with SessionLocal() as db:
+        books = db.query(models.Book.id, models.Book.file_type, models.Book.file_path).all()
+    indexed, removed = sync_library(books, rebuild=args.rebuild)
+    print(f"Indexed {indexed} books, removed {removed}, index at {SEARCH_INDEX_PATH}")
+    return indexed
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() is not None else 1)
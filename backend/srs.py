@@ -0,0 +1,123 @@
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from . import models
+
+# SM-2 spaced repetition (SuperMemo 2). Every answer is graded 0-5; 3 and up
+# counts as recalled. Intervals grow by the word's ease factor after the first
+# two reviews, and a miss sends the word back to a one-day interval.
+
+MIN_EASE = 1.3
+# Quality used when the client only says right/wrong
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+# Random seeks tried before giving up on finding enough distinct distractors
+DISTRACTOR_ATTEMPTS = 12
+
+
+def schedule(repetitions, ease, interval_days, quality, now=None):
+    """
+    Return (repetitions, ease, interval_days, due_at) after an answer of the given quality.
+    """
+    now = now or datetime.utcnow()
+    repetitions = repetitions or 0
+    ease = ease or 2.5
+    interval_days = interval_days or 0
+
+    if quality >= 3:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease, 2)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval_days = 1
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return repetitions, round(ease, 3), interval_days, now + timedelta(days=interval_days)
+
+
+def review(word, quality, now=None):
+    word.repetitions, word.ease, word.interval_days, word.due_at = schedule(
+        word.repetitions, word.ease, word.interval_days, quality, now
+    )
+
+
+QUIZ_COLUMNS = (
+    models.Word.id, models.Word.original_word, models.Word.translated_word,
+    models.Word.pronunciation, models.Word.language,
+)
+
+
+def pick_quiz_words(db, size, fill_upcoming=False, now=None):
+    """
+    Up to `size` due words in random order, so a long backlog isn't always quizzed
+    oldest first. With `fill_upcoming`, a quiz with fewer than `size` due words is
+    topped up with the words coming up soonest. Both read ranges of ix_words_due_at.
+    """
+    now = now or datetime.utcnow()
+    # The sample is drawn from the index entries (due_at, rowid) with a top-N sort,
+    # and only the chosen rows are read from the table
+    ids = db.scalars(
+        select(models.Word.id).where(models.Word.due_at <= now).order_by(func.random()).limit(size)
+    ).all()
+    words = db.execute(select(*QUIZ_COLUMNS).where(models.Word.id.in_(ids))).all() if ids else []
+    random.shuffle(words)
+    if fill_upcoming and len(words) < size:
+        upcoming = (
+            select(*QUIZ_COLUMNS)
+            .where(models.Word.due_at > now)
+            .order_by(models.Word.due_at, models.Word.id)
+            .limit(size - len(words))
+        )
+        words.extend(db.execute(upcoming).all())
+    return words
+
+
+def _language_filter(stmt, language):
+    return stmt if language is None else stmt.where(models.Word.language == language)
+
+
+def _id_range(db, language):
+    # min/max are answered from the ends of the (language, id) index
+    stmt = _language_filter(select(func.min(models.Word.id), func.max(models.Word.id)), language)
+    return db.execute(stmt).one()
+
+
+def _translation_near(db, language, pivot, exclude_id):
+    # First word at or after the pivot id, wrapping around to the start of the range.
+    # Words right after id gaps are slightly favored, which is fine for distractors.
+    for condition in (models.Word.id >= pivot, models.Word.id < pivot):
+        stmt = _language_filter(
+            select(models.Word.translated_word).where(condition, models.Word.id != exclude_id), language
+        )
+        translation = db.scalar(stmt.order_by(models.Word.id).limit(1))
+        if translation is not None:
+            return translation
+    return None
+
+
+def pick_distractors(db, word, count=3):
+    """
+    Up to `count` distinct wrong answers, preferring words of the same language.
+    Each pick is a random id seek on an index, so the cost doesn't depend on the vocabulary size.
+    """
+    distractors = []
+    for language in (word.language, None):
+        low, high = _id_range(db, language)
+        if low is None:
+            continue
+        for _ in range(DISTRACTOR_ATTEMPTS):
+            if len(distractors) >= count:
+                return distractors
+            translation = _translation_near(db, language, random.randint(low, high), word.id)
+            if translation is None:
+                break
+            if translation != word.translated_word and translation not in distractors:
+                distractors.append(translation)
+    return distractors
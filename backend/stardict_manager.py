@@ -1,17 +1,26 @@
 import os
-from pystardict import Dictionary
 import glob
+import logging
+
+logger = logging.getLogger(__name__)
 
 class StarDictManager:
-    def __init__(self, dict_dir="backend/dictionaries"):
+    def __init__(self, dict_dir="backend/dictionaries", autoload=True):
         self.dict_dir = dict_dir
         self.dictionaries = []
-        self.load_dictionaries()
+        self.loaded = False
+        if autoload:
+            self.load_dictionaries()
 
     def load_dictionaries(self):
-        self.dictionaries = []
+        # Can take a while with big dictionaries; the server calls this in the background
+        from pystardict import Dictionary
+
+        dictionaries = []
         if not os.path.exists(self.dict_dir):
-            print(f"Dictionary directory not found: {self.dict_dir}")
+            logger.warning("Dictionary directory not found", extra={"dict_dir": self.dict_dir})
+            self.dictionaries = dictionaries
+            self.loaded = True
             return
 
         # Find all .ifo files
@@ -22,10 +31,14 @@ class StarDictManager:
                 # pystardict expects the path without extension
                 dict_prefix = os.path.splitext(ifo_path)[0]
                 dictionary = Dictionary(dict_prefix)
-                self.dictionaries.append(dictionary)
-                print(f"Loaded dictionary: {os.path.basename(dict_prefix)}")
-            except Exception as e:
-                print(f"Failed to load dictionary {ifo_path}: {e}")
+                dictionaries.append(dictionary)
+                logger.info("Loaded dictionary", extra={"dictionary": os.path.basename(dict_prefix)})
+            except Exception:
+                logger.exception("Failed to load dictionary", extra={"ifo_path": ifo_path})
+
+        # Swapped in at once, so lookups during loading see either none or all of them
+        self.dictionaries = dictionaries
+        self.loaded = True
 
     def lookup(self, word):
         """
@@ -49,7 +62,7 @@ class StarDictManager:
                             
                     return str(definition)
             except Exception as e:
-                print(f"Error looking up '{word}': {e}")
+                logger.warning("StarDict lookup error", extra={"word": word, "error": str(e)})
                 continue
                 
         return None
@@ -0,0 +1,59 @@
+import asyncio
+import logging
+
+# Startup work and where it's at, reported by /system/ready.
+#
+# The server starts accepting connections before slow initialization (loading
+# dictionaries) is done; those steps run in the background and requests that
+# need them degrade until then (e.g. lookups skip StarDict).
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+components = {}
+errors = {}
+_tasks = set()
+
+
+async def _run(name, fn, *args, pool=None):
+    try:
+        await (pool.run(fn, *args) if pool else asyncio.to_thread(fn, *args))
+    except Exception as e:
+        logger.exception("Startup step failed", extra={"step": name})
+        components[name] = FAILED
+        errors[name] = str(e)
+        raise
+    components[name] = READY
+
+
+async def run(name, fn, *args):
+    # Done before the server accepts requests
+    components[name] = PENDING
+    await _run(name, fn, *args)
+
+
+def start(name, fn, *args, pool=None):
+    # Runs in the background, on `pool` (a BoundedExecutor) if given; see status()
+    components[name] = PENDING
+    task = asyncio.create_task(_run(name, fn, *args, pool=pool))
+    _tasks.add(task)
+    # Failures are recorded in `errors`; don't also log "exception was never retrieved"
+    task.add_done_callback(lambda t: (_tasks.discard(t), t.cancelled() or t.exception()))
+    return task
+
+
+async def cancel():
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+def status():
+    return {
+        "ready": bool(components) and all(state == READY for state in components.values()),
+        "components": dict(components),
+        "errors": dict(errors),
+    }
@@ -0,0 +1,275 @@
+import unittest
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.main import app
+from backend.database import Base, get_db, make_engine
+from backend import models
+from backend import anchors
+from backend import annotation_sync
+
+
+class TestAnnotations(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add(models.Book(id=1, title="Book", file_path="book.epub", file_type="epub"))
+            db.commit()
+
+        def override_get_db():
+            with self.Session() as db:
+                yield db
+
+        self.previous = app.dependency_overrides.get(get_db)
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        if self.previous:
+            app.dependency_overrides[get_db] = self.previous
+        else:
+            app.dependency_overrides.pop(get_db, None)
+        self.engine.dispose()
+
+    def test_etag_revalidation(self):
+        first = self.client.get("/books/1/annotations")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json(), {"revision": 0, "highlights": [], "bookmarks": [], "comments": []})
+        etag = first.headers["etag"]
+
+        unchanged = self.client.get("/books/1/annotations", headers={"If-None-Match": etag})
+        self.assertEqual(unchanged.status_code, 304)
+
+        self.client.post("/books/1/highlights", json={"selected_text": "x", "cfi_range": "{}"})
+        self.client.post("/books/1/bookmarks", json={"cfi_range": "{}", "label": "here"})
+        changed = self.client.get("/books/1/annotations", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["revision"], 2)
+        self.assertEqual(len(changed.json()["highlights"]), 1)
+        self.assertNotEqual(changed.headers["etag"], etag)
+
+        highlight_id = changed.json()["highlights"][0]["id"]
+        self.client.delete(f"/books/highlights/{highlight_id}")
+        self.assertEqual(self.client.get("/books/1/annotations").json()["revision"], 3)
+
+    def test_sync_batch_is_one_revision_and_replay_safe(self):
+        batch = {"batch_id": "b1", "ops": [
+            {"op": "create", "type": "highlight", "client_id": "h1", "data": {"selected_text": "x", "cfi_range": "{}"}},
+            {"op": "create", "type": "bookmark", "client_id": "m1", "data": {"cfi_range": "{}", "label": "here"}},
+            {"op": "update", "type": "highlight", "client_id": "h1", "data": {"color": "green"}},
+            {"op": "delete", "type": "bookmark", "client_id": "m1"},
+        ]}
+        result = self.client.post("/books/1/annotations/sync", json=batch).json()
+        self.assertEqual((result["revision"], result["applied"], result["replayed"]), (1, 4, False))
+        self.assertEqual(set(result["ids"]), {"h1", "m1"})
+
+        # Same batch again (e.g. the response was lost): nothing is applied twice
+        replay = self.client.post("/books/1/annotations/sync", json=batch).json()
+        self.assertTrue(replay["replayed"])
+        self.assertEqual(replay["revision"], 1)
+
+        # A new batch repeating the create is skipped by client_id
+        again = self.client.post("/books/1/annotations/sync", json={"batch_id": "b2", "ops": batch["ops"][:1]}).json()
+        self.assertEqual((again["applied"], again["ids"]["h1"]), (0, result["ids"]["h1"]))
+
+        annotations = self.client.get("/books/1/annotations").json()
+        self.assertEqual(annotations["revision"], 1)
+        self.assertEqual([(h["client_id"], h["color"]) for h in annotations["highlights"]], [("h1", "green")])
+        self.assertEqual(annotations["bookmarks"], [])
+
+    def test_sync_rejects_create_without_client_id(self):
+        batch = {"batch_id": "b1", "ops": [
+            {"op": "create", "type": "comment", "client_id": "c1", "data": {"content": "kept?"}},
+            {"op": "create", "type": "comment", "data": {"content": "no id"}},
+        ]}
+        response = self.client.post("/books/1/annotations/sync", json=batch)
+        self.assertEqual(response.status_code, 422)
+        # The whole batch is rolled back
+        self.assertEqual(self.client.get("/books/1/annotations").json()["comments"], [])
+
+    def test_sync_create_race_returns_existing_row(self):
+        create = {"op": "create", "type": "highlight", "client_id": "h1", "data": {"selected_text": "x", "cfi_range": "{}"}}
+        first = self.client.post("/books/1/annotations/sync", json={"batch_id": "b1", "ops": [create]}).json()
+
+        # A concurrent request created h1 after this one looked for it
+        find = annotation_sync._find
+        missed = []
+        def find_after_race(db, model, book_id, op):
+            if op.client_id == "h1" and not missed:
+                missed.append(op)
+                return None
+            return find(db, model, book_id, op)
+
+        bookmark = {"op": "create", "type": "bookmark", "client_id": "m1", "data": {"cfi_range": "{}", "label": "here"}}
+        with patch.object(annotation_sync, "_find", find_after_race):
+            second = self.client.post("/books/1/annotations/sync", json={"batch_id": "b2", "ops": [bookmark, create]})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual((second.json()["applied"], second.json()["ids"]["h1"]), (1, first["ids"]["h1"]))
+
+        annotations = self.client.get("/books/1/annotations").json()
+        self.assertEqual([h["client_id"] for h in annotations["highlights"]], ["h1"])
+        self.assertEqual([b["client_id"] for b in annotations["bookmarks"]], ["m1"])
+
+    def test_batch_ids_are_not_replayed_across_books(self):
+        with self.Session() as db:
+            db.add(models.Book(id=2, title="Other", file_path="other.epub", file_type="epub"))
+            db.commit()
+        batch = {"batch_id": "b1", "ops": [
+            {"op": "create", "type": "comment", "client_id": "c1", "data": {"content": "first book"}},
+        ]}
+        self.assertFalse(self.client.post("/books/1/annotations/sync", json=batch).json()["replayed"])
+        response = self.client.post("/books/2/annotations/sync", json=batch)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.client.get("/books/2/annotations").json()["comments"], [])
+
+    def test_chapter_filter(self):
+        def locator(chapter=None, element_id="p1", start=0, end=5):
+            data = {"id": element_id, "start": 0, "end": end - start, "text": "hello"}
+            if chapter is not None:
+                data.update(chapter=chapter, chapterStart=start, chapterEnd=end)
+            return json.dumps(data)
+
+        for text, cfi_range in (("a", locator(0)), ("b", locator(3, start=7, end=12)), ("c", "TODO"), ("d", locator(element_id="chapter-6"))):
+            self.client.post("/books/1/highlights", json={"selected_text": text, "cfi_range": cfi_range})
+
+        highlights = self.client.get("/books/1/highlights?chapters=3").json()
+        # The unanchored one comes with every chapter
+        self.assertEqual([h["selected_text"] for h in highlights], ["b", "c"])
+        self.assertEqual((highlights[0]["chapter_index"], highlights[0]["anchor_start"], highlights[0]["anchor_end"]), (3, 7, 12))
+        self.assertEqual([h["selected_text"] for h in self.client.get("/books/1/highlights?chapters=0,5").json()], ["a", "c", "d"])
+        self.assertEqual(len(self.client.get("/books/1/highlights").json()), 4)
+
+        annotations = self.client.get("/books/1/annotations?chapters=").json()
+        self.assertEqual([h["selected_text"] for h in annotations["highlights"]], ["c"])
+        self.assertEqual(self.client.get("/books/1/highlights?chapters=x").status_code, 400)
+
+    def test_sync_sets_anchor(self):
+        batch = {"batch_id": "b1", "ops": [
+            {"op": "create", "type": "highlight", "client_id": "h1", "data": {"selected_text": "x", "cfi_range": "TODO"}},
+            {"op": "update", "type": "highlight", "client_id": "h1", "data": {"cfi_range": '{"id": "p", "start": 1, "end": 2, "chapter": 4}'}},
+        ]}
+        self.client.post("/books/1/annotations/sync", json=batch)
+        self.assertEqual([h["client_id"] for h in self.client.get("/books/1/highlights?chapters=4").json()], ["h1"])
+
+    CHAPTERS = [
+        {"content": '<h1 id="title">T</h1><p>one</p><div><p>two <b>bold</b> words</p></div>'},
+        {"content": '<p>three</p><!-- note --><p>four <span id="note">five</span> six</p>'},
+    ]
+
+    def test_block_positions_match_reader_numbering(self):
+        blocks = anchors.block_positions(self.CHAPTERS)
+        self.assertEqual(blocks["title"], (0, 0))
+        self.assertEqual(blocks["content-block-3"], (0, 4))
+        self.assertEqual(blocks["content-block-4"], (1, 0))
+        self.assertEqual(blocks["note"], (1, 10))
+        self.assertEqual(anchors.anchor("TODO"), (None, None, None))
+
+    def test_stored_anchor_resolves_to_its_text(self):
+        blocks = anchors.block_positions(self.CHAPTERS)
+        texts = [anchors.chapter_text(chapter["content"]) for chapter in self.CHAPTERS]
+        locators = (
+            # Current reader: chapter offsets
+            ("bold", {"id": "content-block-3", "start": 4, "end": 8, "chapter": 0, "chapterStart": 8, "chapterEnd": 12}),
+            # Older readers: offsets in the element, resolved through the book's blocks
+            ("words", {"id": "content-block-3", "start": 9, "end": 14, "chapter": 0}),
+            ("five", {"id": "note", "start": 0, "end": 4}),
+            # ... or in the chapter div, which had the template's whitespace in front
+            ("three", {"id": "chapter-2", "start": 13, "end": 18}),
+        )
+        for text, locator in locators:
+            highlight = models.Highlight(selected_text=text, cfi_range=json.dumps(locator))
+            anchors.set_anchor(highlight)
+            if "chapterStart" not in locator:
+                # What migrate_highlight_anchors.py stores once it has parsed the book
+                highlight.chapter_index, highlight.anchor_start, highlight.anchor_end = anchors.anchor(highlight.cfi_range, blocks)
+            chapter_text = texts[highlight.chapter_index]
+            self.assertEqual(chapter_text[highlight.anchor_start:highlight.anchor_end], text)
+
+        # Without the book, an offset inside an unknown element is not stored as a chapter offset
+        self.assertEqual(anchors.anchor('{"id": "p", "start": 1, "end": 2, "chapter": 4}'), (4, None, None))
+
+    def test_unknown_book(self):
+        self.assertEqual(self.client.get("/books/99/annotations").status_code, 404)
+
+
+class TestConcurrentSessions(unittest.TestCase):
+    """Two sessions on one file-backed database in WAL mode, as with the request threadpool."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = make_engine(f"sqlite:///{self.directory.name}/reader.db", profile="performance")
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            db.add(models.Book(id=1, title="Book", file_path="book.epub", file_type="epub"))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def create(self, client_id):
+        return SimpleNamespace(op="create", type="comment", client_id=client_id, id=None, data={"content": client_id})
+
+    def test_read_then_write_after_another_commit(self):
+        with self.Session() as first, self.Session() as second:
+            self.assertIsNotNone(first.get(models.Book, 1))
+            second.add(models.Word(original_word="eins", translated_word="one"))
+            second.commit()
+
+            # The first session read before that commit and writes after it
+            first.add(models.Word(original_word="zwei", translated_word="two"))
+            annotation_sync.bump_revision(first, 1)
+            first.commit()
+
+            self.assertIsNotNone(first.get(models.Book, 1))
+            second.add(models.Word(original_word="drei", translated_word="three"))
+            second.commit()
+            result = annotation_sync.apply_batch(first, 1, "b1", [self.create("c1")])
+            self.assertEqual(result["applied"], 1)
+
+        with self.Session() as db:
+            self.assertEqual(db.query(models.Word).count(), 3)
+            self.assertEqual(db.get(models.Book, 1).annotations_rev, 2)
+
+    def test_batch_waits_for_a_concurrent_writer(self):
+        results = []
+        with self.Session() as writer:
+            writer.add(models.Comment(book_id=1, client_id="c0", content="first"))
+            writer.flush()
+
+            def sync():
+                with self.Session() as db:
+                    results.append(annotation_sync.apply_batch(db, 1, "b1", [self.create("c1")]))
+
+            thread = threading.Thread(target=sync)
+            thread.start()
+            time.sleep(0.2)
+            self.assertEqual(results, [])
+            writer.commit()
+            thread.join(timeout=5)
+
+        self.assertEqual([r["applied"] for r in results], [1])
+        with self.Session() as db:
+            self.assertEqual({c.client_id for c in db.query(models.Comment)}, {"c0", "c1"})
+
+
+if __name__ == '__main__':
+    unittest.main()
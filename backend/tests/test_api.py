@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
+from datetime import datetime
 import unittest
 import sys
 import os
@@ -25,7 +26,7 @@ client = TestClient(app)
 class TestAPI(unittest.TestCase):
 
     def test_lookup_word(self):
-        with patch('backend.routers.dictionary.GoogleTranslator') as MockTranslator:
+        with patch('deep_translator.GoogleTranslator') as MockTranslator:
             instance = MockTranslator.return_value
             instance.translate.return_value = "사과"
             
@@ -48,6 +49,12 @@ class TestAPI(unittest.TestCase):
             
             # Let's refine the override to return a specific mock we can check.
             mock_session = MagicMock()
+
+            def fill_defaults(obj):
+                # What the database would set on insert
+                obj.id = 1
+                obj.created_at = datetime(2024, 1, 1)
+            mock_session.refresh.side_effect = fill_defaults
             app.dependency_overrides[get_db] = lambda: mock_session
             
             word_data = {
@@ -103,6 +110,74 @@ class TestAPI(unittest.TestCase):
             mock_session.add.assert_called()
             mock_session.commit.assert_called()
 
+    def test_ready_waits_for_background_startup(self):
+        import asyncio
+        import threading
+        from backend import startup
+
+        release = threading.Event()
+
+        async def start_and_check():
+            with patch.dict(startup.components, clear=True), patch.dict(startup.errors, clear=True):
+                await startup.run("database", lambda: None)
+                task = startup.start("dictionaries", release.wait)
+                pending = client.get("/system/ready")
+                release.set()
+                await task
+                return pending, client.get("/system/ready")
+
+        pending, ready = asyncio.run(start_and_check())
+        self.assertEqual(pending.status_code, 503)
+        self.assertEqual(pending.json()["components"], {"database": "ready", "dictionaries": "pending"})
+        self.assertEqual(ready.status_code, 200)
+
+    def test_background_startup_step_on_a_pool(self):
+        import asyncio
+        import threading
+        from backend import startup
+        from backend.executors import BoundedExecutor
+
+        pool = BoundedExecutor("startup-test", 1, 0)
+        release = threading.Event()
+        threads = []
+
+        def step():
+            threads.append(threading.current_thread().name)
+            release.wait()
+
+        async def start_and_check():
+            with patch.dict(startup.components, clear=True), patch.dict(startup.errors, clear=True):
+                task = startup.start("search_index", step, pool=pool)
+                await asyncio.sleep(0.05)
+                pending = client.get("/system/ready").json()["components"]
+                release.set()
+                await task
+                return pending, client.get("/system/ready").json()["components"]
+
+        try:
+            pending, ready = asyncio.run(start_and_check())
+        finally:
+            pool.shutdown()
+        self.assertEqual((pending, ready), ({"search_index": "pending"}, {"search_index": "ready"}))
+        self.assertTrue(threads[0].startswith("startup-test"))
+        self.assertEqual(pool.completed, 1)
+
+    def test_lookup_cache_stats(self):
+        from collections import Counter
+        from backend.routers import dictionary
+
+        cached = {"definitions": ["사과"], "pronunciation": None, "examples": []}
+        with patch.dict(dictionary.WORD_CACHE, {"apple:auto:ko": cached}, clear=True), \
+             patch.dict(dictionary.LOOKUP_STATS, {"cache_hits": 0, "cache_misses": 0, "answered_by": Counter()}), \
+             patch.object(dictionary.offline_dictionary, 'lookup', return_value=cached):
+            self.assertEqual(client.get("/dictionary/lookup?word=apple").json(), cached)
+            client.get("/dictionary/lookup?word=pear")
+            stats = client.get("/dictionary/cache").json()
+
+        self.assertEqual(stats["word_cache"]["hits"], 1)
+        self.assertEqual(stats["word_cache"]["hit_rate"], 0.5)
+        self.assertEqual(stats["answered_by"], {"offline": 1})
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,204 @@
+import unittest
+import gzip
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse, Response
+from fastapi.testclient import TestClient
+
+from backend import compression, chapter_cache
+from backend.compression import CompressionMiddleware, PrecompressedStaticFiles, choose_encoding
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        app = FastAPI()
+
+        @app.get("/big")
+        def big():
+            return {"words": ["word"] * 1000}
+
+        @app.get("/small")
+        def small():
+            return {"ok": True}
+
+        @app.get("/stream")
+        def stream():
+            return StreamingResponse((f"line {i}\n" for i in range(3)), media_type="application/x-ndjson")
+
+        @app.get("/archive")
+        def archive():
+            return Response(b"x" * 5000, media_type="application/gzip")
+
+        app.mount("/static", PrecompressedStaticFiles(directory=self.tmp.name))
+        app.add_middleware(CompressionMiddleware)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, deflate", ("br", "gzip")), "gzip")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip", ("br", "gzip")), "br")
+        self.assertEqual(choose_encoding("br;q=0, *", ("br", "gzip")), "gzip")
+        self.assertIsNone(choose_encoding("identity", ("br", "gzip")))
+        self.assertIsNone(choose_encoding(None))
+
+    def test_dynamic_responses(self):
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(len(response.json()["words"]), 1000)
+
+        small = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", small.headers)
+        self.assertNotIn("content-encoding", self.client.get("/big", headers={"Accept-Encoding": "identity"}).headers)
+        # Already compressed
+        self.assertNotIn("content-encoding", self.client.get("/archive", headers={"Accept-Encoding": "gzip"}).headers)
+
+    def test_streams_stay_streams(self):
+        response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.text, "line 0\nline 1\nline 2\n")
+
+    def test_precompressed_static(self):
+        path = os.path.join(self.tmp.name, "style.css")
+        with open(path, "w") as f:
+            f.write("body { color: red; }\n" * 200)
+        self.assertEqual(compression.compress_file(path, ("gzip",)), ["gzip"])
+        # Up to date: not written again
+        self.assertEqual(compression.compress_file(path, ("gzip",)), [])
+
+        with patch.object(compression, "compress", wraps=compression.compress) as compress:
+            response = self.client.get("/static/style.css", headers={"Accept-Encoding": "gzip"})
+            compress.assert_not_called()
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertTrue(response.headers["content-type"].startswith("text/css"))
+        self.assertEqual(response.text, "body { color: red; }\n" * 200)
+
+        cached = self.client.get("/static/style.css", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+        self.assertEqual(cached.status_code, 304)
+
+        # Edited after the build: the stale copy isn't served
+        later = time.time() + 10
+        os.utime(path, (later, later))
+        self.assertIsNone(compression.precompressed_variant(path, "gzip"))
+
+    def test_chapter_cache(self):
+        book = os.path.join(self.tmp.name, "book.txt")
+        with open(book, "w") as f:
+            f.write("text")
+        content = {"title": "Book", "chapters": [{"id": "c1", "content": "<p>one</p>" * 100}, {"id": "c2", "content": "<p>two</p>"}]}
+
+        with patch.object(chapter_cache, "CHAPTER_CACHE_DIR", os.path.join(self.tmp.name, "chapters")):
+            self.assertIsNone(chapter_cache.load(1, book))
+            chapter_cache.build(1, "txt", book, content)
+            self.assertEqual(chapter_cache.load(1, book), content)
+
+            path = chapter_cache.chapter_path(1, book, 1)
+            with open(path + ".gz", "rb") as f:
+                self.assertEqual(gzip.decompress(f.read()).decode(), "<p>one</p>" * 100)
+            self.assertIsNone(chapter_cache.chapter_path(1, book, 3))
+
+            # The book file changed: the old version is a miss
+            with open(book, "a") as f:
+                f.write("more")
+            self.assertIsNone(chapter_cache.load(1, book))
+
+            chapter_cache.remove(1)
+            self.assertFalse(os.path.exists(chapter_cache.book_dir(1)))
+
+    def test_reader_loads_precompressed_chapters(self):
+        from backend.main import app
+        from backend.database import get_async_db
+        from backend.routers import reader
+
+        path = os.path.join(self.tmp.name, "book.txt")
+        with open(path, "w") as f:
+            f.write("text")
+        book = SimpleNamespace(id=1, title="Book", author="", file_type="txt", file_path=path, last_read_position=None)
+        content = {"title": "Book", "language": "en", "chapters": [{"id": "c1", "content": "<p>one</p>" * 500}]}
+
+        class Session:
+            async def get(self, model, book_id):
+                return book if book_id == 1 else None
+
+        async def override_get_async_db():
+            yield Session()
+
+        # Rendered with Jinja directly: Starlette versions disagree on TemplateResponse's arguments
+        def render(name, context):
+            return HTMLResponse(reader.templates.get_template(name).render(context))
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        try:
+            with patch.object(chapter_cache, "CHAPTER_CACHE_DIR", os.path.join(self.tmp.name, "chapters")), \
+                 patch.object(reader.templates, "TemplateResponse", render):
+                chapter_cache.build(1, "txt", path, content)
+                client = TestClient(app)
+
+                page = client.get("/reader/1").text
+                self.assertIn('data-src="/reader/1/chapters/1"', page)
+                self.assertNotIn("<p>one</p>", page)
+
+                # The stored copy as is, not compressed again by CompressionMiddleware
+                with patch.object(compression, "compress", wraps=compression.compress) as compress:
+                    for encoding in compression.ENCODINGS:
+                        response = client.get("/reader/1/chapters/1", headers={"Accept-Encoding": encoding})
+                        self.assertEqual(response.headers["content-encoding"], encoding)
+                        self.assertEqual(response.text, "<p>one</p>" * 500)
+                    compress.assert_not_called()
+        finally:
+            app.dependency_overrides.pop(get_async_db, None)
+
+    def test_concurrent_chapter_cache_builds(self):
+        book = os.path.join(self.tmp.name, "book.txt")
+        with open(book, "w") as f:
+            f.write("text")
+        content = {"title": "Book", "chapters": [{"id": f"c{i}", "content": f"<p>{i}</p>" * 50} for i in range(4)]}
+
+        # Both builds are half written before either publishes
+        barrier = threading.Barrier(2)
+        compress_file = chapter_cache.compress_file
+        def compress_in_step(path):
+            if path.endswith("2.html"):
+                barrier.wait(timeout=5)
+            return compress_file(path)
+
+        errors = []
+        def build():
+            try:
+                chapter_cache.build(1, "txt", book, content)
+            except Exception as e:
+                errors.append(e)
+
+        with patch.object(chapter_cache, "CHAPTER_CACHE_DIR", os.path.join(self.tmp.name, "chapters")):
+            with patch.object(chapter_cache, "compress_file", compress_in_step):
+                threads = [threading.Thread(target=build) for _ in range(2)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(chapter_cache.load(1, book), content)
+            self.assertEqual(os.listdir(chapter_cache.book_dir(1)), [os.path.basename(chapter_cache.version_dir(1, book))])
+
+            # A rebuild of the same version replaces it
+            chapter_cache.build(1, "txt", book, dict(content, title="Rebuilt"))
+            self.assertEqual(chapter_cache.load(1, book)["title"], "Rebuilt")
+
+
+if __name__ == '__main__':
+    unittest.main()
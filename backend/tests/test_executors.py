@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.executors import BoundedExecutor, PoolBusy
+
+
+class TestBoundedExecutor(unittest.TestCase):
+
+    def test_rejects_when_backlog_full(self):
+        pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(release.wait))
+            queued = asyncio.ensure_future(pool.run(lambda: "queued"))
+            await asyncio.sleep(0)
+            self.assertEqual(pool.snapshot()["active"], 1)
+            self.assertEqual(pool.snapshot()["queued"], 1)
+
+            with self.assertRaises(PoolBusy):
+                await pool.run(lambda: "rejected")
+
+            release.set()
+            return await running, await queued
+
+        self.assertEqual(asyncio.run(scenario()), (True, "queued"))
+        status = pool.snapshot()
+        self.assertEqual(status["rejected"], 1)
+        self.assertEqual(status["completed"], 2)
+        self.assertEqual(status["active"], 0)
+        pool.shutdown()
+
+    def test_cancelled_caller_keeps_job_counted(self):
+        pool = BoundedExecutor("test", max_workers=1, max_queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def job():
+            started.set()
+            release.wait()
+
+        async def scenario():
+            task = asyncio.ensure_future(pool.run(job))
+            await asyncio.to_thread(started.wait)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The thread is still busy, so the pool is still full
+            self.assertEqual(pool.snapshot()["active"], 1)
+            with self.assertRaises(PoolBusy):
+                await pool.run(lambda: "rejected")
+            release.set()
+
+        asyncio.run(scenario())
+        pool.shutdown()
+        self.assertEqual(pool.snapshot()["active"], 0)
+        self.assertEqual(pool.snapshot()["completed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.benchmarks.bench_import_time import measure, lazy_violations, summary
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_heavy_libraries_load_on_first_use(self):
+        # Parsers, translation clients and dictionaries must not load with the app;
+        # the report shows where the time goes if this regresses
+        rows = measure("backend.main")
+        self.assertEqual(lazy_violations(rows), [], "\n" + summary(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
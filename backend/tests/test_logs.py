@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import logs
+from backend.executors import parse_pool
+
+
+def make_client(sample_rate, seen):
+    app = FastAPI()
+
+    def parse():
+        # On a parse pool thread
+        seen.append(logs.request_id.get())
+        with logs.span("parse", format="txt") as stage:
+            stage.set(chapters=1)
+        return "parsed"
+
+    @app.get("/books/{book_id}")
+    async def read_book(book_id: int):
+        with logs.span("render"):
+            return {"text": await parse_pool.run(parse)}
+
+    return TestClient(logs.RequestLogMiddleware(app, sample_rate=sample_rate, slow_ms=10_000))
+
+
+class TestLogs(unittest.TestCase):
+
+    def test_request_ids_and_spans(self):
+        seen = []
+        client = make_client(1, seen)
+        with self.assertLogs("backend.logs", level="INFO") as captured:
+            response = client.get("/books/7", headers={"X-Request-ID": "abc-123"})
+            generated = client.get("/books/7", headers={"X-Request-ID": "not an id"})
+
+        self.assertEqual(response.headers["x-request-id"], "abc-123")
+        self.assertNotEqual(generated.headers["x-request-id"], "not an id")
+        # The id reaches the work handed to the pool
+        self.assertEqual(seen, ["abc-123", generated.headers["x-request-id"]])
+
+        record = captured.records[0]
+        self.assertEqual((record.route, record.status), ("/books/{book_id}", 200))
+        self.assertEqual([span["name"] for span in record.spans], ["parse", "render"])
+        self.assertEqual(record.spans[0]["chapters"], 1)
+        self.assertGreaterEqual(record.spans[1]["ms"], record.spans[0]["ms"])
+
+    def test_unsampled_requests_not_logged(self):
+        self.assertIs(logs.span("parse"), logs.NO_SPAN)
+        client = make_client(0, [])
+        with self.assertNoLogs("backend.logs", level="INFO"):
+            self.assertEqual(client.get("/books/7").status_code, 200)
+
+    def test_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "app.log")
+            logs.setup(level="INFO", path=path)
+            token = logs.request_id.set("req-1")
+            try:
+                logger = logging.getLogger("backend.test")
+                logger.warning("Upstream cache read error", extra={"source": "naver:en"})
+                try:
+                    raise ValueError("boom")
+                except ValueError:
+                    logger.exception("Error reading EPUB")
+            finally:
+                logs.request_id.reset(token)
+                logs.shutdown()
+
+            with open(path, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f]
+
+        self.assertEqual(entries[0]["msg"], "Upstream cache read error")
+        self.assertEqual(entries[0]["source"], "naver:en")
+        self.assertEqual(entries[0]["request_id"], "req-1")
+        self.assertEqual(entries[1]["level"], "ERROR")
+        self.assertIn("ValueError: boom", entries[1]["exc"])
+        self.assertTrue(logging.getLogger("backend").propagate)
+
+
+if __name__ == '__main__':
+    unittest.main()
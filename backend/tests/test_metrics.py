@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend import metrics
+from backend.database import make_engine
+from backend.upstream import UpstreamSource
+
+
+def sample(rendered, line_start):
+    # The value of the first sample line starting with line_start
+    for line in rendered.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_render(self):
+        requests = metrics.Counter("test_requests_total", "Requests.", ("kind",))
+        requests.inc(kind="a")
+        requests.inc(2, kind='quote"d')
+        latency = metrics.Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+
+        lines = []
+        for metric in (requests, latency):
+            lines.extend(metrics._sample_line(*s) for s in metric.samples())
+        self.assertEqual(lines, [
+            'test_requests_total{kind="a"} 1',
+            'test_requests_total{kind="quote\\"d"} 2',
+            'test_latency_seconds_bucket{le="0.1"} 1',
+            'test_latency_seconds_bucket{le="1"} 2',
+            'test_latency_seconds_bucket{le="+Inf"} 3',
+            'test_latency_seconds_sum 5.55',
+            'test_latency_seconds_count 3',
+        ])
+
+    def test_endpoint_and_route_labels(self):
+        from backend.main import app
+        client = TestClient(app)
+        client.get("/dictionary/sources")
+        client.get("/no/such/page")
+
+        response = client.get("/metrics")
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        self.assertIsNotNone(sample(response.text, 'http_request_duration_seconds_count{method="GET",route="/dictionary/sources",status="200"}'))
+        self.assertIsNotNone(sample(response.text, 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}'))
+        self.assertIn('executor_queued{pool="io"}', response.text)
+        self.assertIn('lookup_cache_requests_total{cache="word",result="hit"}', response.text)
+
+    def test_upstream_and_transactions(self):
+        source = UpstreamSource("test-source", rate=100, burst=100)
+        asyncio.run(source.call(lambda: "ok"))
+        with self.assertRaises(ValueError):
+            asyncio.run(source.call(self._fail))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = make_engine(f"sqlite:///{os.path.join(tmp, 'test.db')}")
+            with engine.begin() as conn:
+                conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            engine.dispose()
+
+        rendered = metrics.render()
+        self.assertEqual(sample(rendered, 'upstream_requests_total{source="test-source",outcome="ok"}'), 1)
+        self.assertEqual(sample(rendered, 'upstream_request_duration_seconds_count{source="test-source",outcome="error"}'), 1)
+        self.assertGreaterEqual(sample(rendered, 'db_transaction_duration_seconds_count{engine="sync",outcome="commit"}'), 1)
+
+    @staticmethod
+    def _fail():
+        raise ValueError("upstream down")
+
+
+if __name__ == '__main__':
+    unittest.main()
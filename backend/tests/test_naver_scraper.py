@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import naver_scraper
+from backend.naver_scraper import parse_naver_result
+from backend import upstream_cache
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'fixtures')
+
+
+def load_fixture(lang):
+    with open(os.path.join(FIXTURE_DIR, f'naver_{lang}.json'), 'rb') as f:
+        return f.read()
+
+
+class TestNaverParsing(unittest.TestCase):
+
+    def test_parse_english(self):
+        result = parse_naver_result(load_fixture('en'), lang='en')
+        self.assertTrue(result['definition'].startswith('사과; 사과나무'))
+        self.assertIsNone(result['pronunciation'])
+        self.assertEqual(len(result['examples']), 2)
+        self.assertNotIn('<', result['examples'][0])
+
+    def test_parse_japanese_reading(self):
+        result = parse_naver_result(load_fixture('ja'), lang='ja')
+        self.assertEqual(result['pronunciation'], 'たべる')
+
+    def test_parse_chinese_pinyin_falls_back_to_vlive_examples(self):
+        result = parse_naver_result(load_fixture('zh'), lang='zh')
+        self.assertEqual(result['pronunciation'], 'shàngyī')
+        self.assertIn('上衣', result['examples'][0])
+
+    def test_no_word_section(self):
+        self.assertIsNone(parse_naver_result(b'{"searchResultMap": {"searchResultListMap": {}}}'))
+
+    def test_url_is_configurable(self):
+        with patch.object(naver_scraper, 'NAVER_URL', 'http://127.0.0.1:8765/naver/{lang}/search'), \
+             patch('requests.get') as get:
+            get.return_value.status_code = 200
+            get.return_value.content = b'{}'
+            naver_scraper.fetch_naver_raw('食べる', lang='ja')
+            self.assertEqual(get.call_args[0][0], 'http://127.0.0.1:8765/naver/ja/search?query=食べる')
+            naver_scraper.fetch_naver_raw('apple', lang='fr')
+            self.assertEqual(get.call_args[0][0], 'http://127.0.0.1:8765/naver/en/search?query=apple')
+
+
+@unittest.skipUnless(os.environ.get('NAVER_LIVE_TESTS'), 'set NAVER_LIVE_TESTS=1 to check the parser against the live API')
+class TestNaverLive(unittest.TestCase):
+    # The fixtures above may be synthetic (see benchmarks/fixtures/naver_sources.json);
+    # this catches drift between the parser and the real responses
+
+    def test_live_responses_parse(self):
+        from backend.benchmarks.bench_naver_parse import FIXTURE_WORDS
+        for lang, word in FIXTURE_WORDS.items():
+            with self.subTest(lang=lang):
+                result = parse_naver_result(naver_scraper.fetch_naver_raw(word, lang=lang), lang=lang)
+                self.assertIsNotNone(result)
+                self.assertTrue(result['definition'])
+                if lang != 'en':
+                    self.assertTrue(result['pronunciation'])
+
+
+class TestUpstreamCache(unittest.TestCase):
+
+    def test_round_trip_and_expiry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('backend.upstream_cache.UPSTREAM_CACHE_PATH', os.path.join(tmp, 'cache.db')), \
+                 patch.object(upstream_cache, '_local', upstream_cache.threading.local()), \
+                 patch.dict(upstream_cache.stats, {"hits": 0, "misses": 0, "expired": 0, "writes": 0}):
+                upstream_cache.put('naver:en', 'apple', b'{"raw": true}')
+                self.assertEqual(upstream_cache.get('naver:en', 'apple'), b'{"raw": true}')
+                self.assertIsNone(upstream_cache.get('naver:en', 'apple', max_age=-1))
+                self.assertIsNone(upstream_cache.get('naver:ja', 'apple'))
+                self.assertEqual(upstream_cache.snapshot(), {"hits": 1, "misses": 1, "expired": 1, "writes": 1, "hit_rate": 0.3333})
+                upstream_cache._local.conn.close()
+
+    def test_unreadable_cached_response_is_a_miss(self):
+        import asyncio
+        from backend.routers import dictionary
+
+        fetched = []
+        def fetch(word, lang='en'):
+            fetched.append(word)
+            return b'<html>Service unavailable</html>' if word == 'pear' else load_fixture('en')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch('backend.upstream_cache.UPSTREAM_CACHE_PATH', os.path.join(tmp, 'cache.db')), \
+                 patch.object(upstream_cache, '_local', upstream_cache.threading.local()), \
+                 patch.dict(dictionary.WORD_CACHE, clear=True), \
+                 patch.object(dictionary.stardict_manager, 'lookup', return_value=None), \
+                 patch.object(dictionary.offline_dictionary, 'lookup', return_value=None), \
+                 patch.object(dictionary, 'fetch_naver_raw', fetch), \
+                 patch.object(dictionary.upstream.google, 'call', side_effect=dictionary.SourceUnavailable('google')):
+                # A truncated body, cached before responses were checked
+                upstream_cache.put('naver:en', 'apple', load_fixture('en')[:len(load_fixture('en')) // 2])
+                result = asyncio.run(dictionary.lookup_word('apple'))
+                self.assertTrue(result['definitions'][0].startswith('사과'))
+                self.assertEqual(fetched, ['apple'])
+                self.assertEqual(upstream_cache.get('naver:en', 'apple'), load_fixture('en'))
+
+                # A fresh body that isn't a search response isn't cached
+                asyncio.run(dictionary.lookup_word('pear'))
+                self.assertIsNone(upstream_cache.get('naver:en', 'pear'))
+                upstream_cache._local.conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
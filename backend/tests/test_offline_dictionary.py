@@ -0,0 +1,86 @@
+import gzip
+import json
+import struct
+import tempfile
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import offline_dictionary, import_dictionary
+
+
+def write_stardict(prefix, articles):
+    # Minimal StarDict v2.4.2 files with a dictzip-compressed .dict
+    idx = b''
+    data = b''
+    for word, text in sorted(articles.items()):
+        body = text.encode('utf-8')
+        idx += word.encode('utf-8') + b'\0' + struct.pack('!LL', len(data), len(body))
+        data += body
+    with open(prefix + '.ifo', 'w', encoding='utf-8') as f:
+        f.write(f"StarDict's dict ifo file\nversion=2.4.2\nwordcount={len(articles)}\n"
+                f"idxfilesize={len(idx)}\nbookname=test\nsametypesequence=m\n")
+    with open(prefix + '.idx', 'wb') as f:
+        f.write(idx)
+    with gzip.open(prefix + '.dict.dz', 'wb') as f:
+        f.write(data)
+
+
+class TestOfflineDictionary(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = os.path.join(self.tmp.name, 'offline.db')
+        self.patches = [
+            patch('backend.offline_dictionary.OFFLINE_DICT_PATH', self.store),
+            patch.object(offline_dictionary, '_local', offline_dictionary.threading.local()),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        conn = getattr(offline_dictionary._local, 'conn', None)
+        if conn:
+            conn.close()
+        for p in self.patches:
+            p.stop()
+        self.tmp.cleanup()
+
+    def test_missing_store_returns_none(self):
+        self.assertIsNone(offline_dictionary.lookup('apple', 'en'))
+
+    def test_import_tsv_and_lookup(self):
+        path = os.path.join(self.tmp.name, 'words.tsv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("Apple\t사과; 사과나무\tˈæpl\nbroken line\n")
+        count = offline_dictionary.import_entries(import_dictionary.read_tsv(path), 'en', 'words', path=self.store)
+
+        self.assertEqual(count, 1)
+        result = offline_dictionary.lookup(' apple ', 'en')
+        self.assertEqual(result, {"definitions": ["사과", "사과나무"], "pronunciation": "ˈæpl", "examples": []})
+        self.assertIsNone(offline_dictionary.lookup('apple', 'ja'))
+
+    def test_reimport_updates_in_batches(self):
+        path = os.path.join(self.tmp.name, 'words.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(7):
+                f.write(json.dumps({"word": f"w{i}", "definition": f"d{i}"}) + "\n")
+            f.write(json.dumps({"word": "w0", "definitions": ["new"], "examples": ["ex"]}) + "\n")
+        offline_dictionary.import_entries(import_dictionary.read_jsonl(path, 'en'), 'en', 'dump', batch_size=3, path=self.store)
+
+        self.assertEqual(offline_dictionary.lookup('w0', 'en')['definitions'], ["new"])
+        self.assertEqual(offline_dictionary.lookup('w6', 'en')['definitions'], ["d6"])
+
+    def test_read_stardict(self):
+        prefix = os.path.join(self.tmp.name, 'enko')
+        write_stardict(prefix, {"run": "달리다", "apple": "사과"})
+        entries = sorted(import_dictionary.read_stardict(prefix + '.ifo'))
+        self.assertEqual(entries, [("apple", ["사과"], None, None), ("run", ["달리다"], None, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend.pagination import paginate, split_page, encode_cursor, decode_cursor, InvalidCursor
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            # Several rows share a timestamp, so the id tie-breaker matters
+            for i in range(7):
+                db.add(models.Word(original_word=f"w{i}", translated_word="t", created_at=datetime(2024, 1, 1 + i // 3)))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def collect(self, limit, descending=True):
+        seen = []
+        cursor = None
+        with self.Session() as db:
+            while True:
+                stmt = paginate(select(models.Word.id, models.Word.created_at), models.Word.created_at, models.Word.id,
+                                cursor, limit, descending=descending)
+                rows, cursor = split_page(db.execute(stmt).all(), limit)
+                self.assertLessEqual(len(rows), limit)
+                seen.extend(row.id for row in rows)
+                if not cursor:
+                    return seen
+
+    def test_pages_cover_every_row_once(self):
+        self.assertEqual(self.collect(2), [7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(self.collect(3, descending=False), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_last_full_page_has_no_cursor(self):
+        with self.Session() as db:
+            stmt = paginate(select(models.Word), models.Word.created_at, models.Word.id, None, 7)
+            rows, cursor = split_page(db.scalars(stmt).all(), 7)
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(cursor)
+
+    def test_cursor_round_trip(self):
+        created_at = datetime(2024, 5, 6, 7, 8, 9, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("not-a-cursor")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -40,6 +40,39 @@ class TestParsers(unittest.TestCase):
             self.assertIn('Chapter 1', result['chapters'][0]['content'])
             self.assertIn('Content', result['chapters'][0]['content'])
 
+    def test_transform_chapter(self):
+        content = (
+            '<?xml version="1.0" encoding="utf-8"?><html><head><title>t</title></head>'
+            '<body><p>Caf\u00e9 <script>x()</script>kept <img src="../Images/a.png"/>'
+            '<img src="http://example.com/b.png"/></p><style>p {}</style></body></html>'
+        ).encode('utf-8')
+        body = epub_parser.transform_chapter(content, '/reader/1/images')
+        self.assertTrue(body.startswith('<body>'))
+        self.assertIn('Caf\u00e9 kept', body)
+        self.assertNotIn('script', body)
+        self.assertNotIn('style', body)
+        self.assertIn('src="/reader/1/images/../Images/a.png"', body)
+        self.assertIn('src="http://example.com/b.png"', body)
+
+        # No declaration: still UTF-8
+        self.assertIn('\u4e2d\u6587', epub_parser.transform_chapter('<html><body>\u4e2d\u6587</body></html>'.encode('utf-8')))
+        # Not a chapter
+        self.assertIsNone(epub_parser.transform_chapter(b'<html><head><title>nav</title></head></html>'))
+        self.assertIsNone(epub_parser.transform_chapter(b''))
+
+    def test_transform_chapters_keeps_order_in_parallel(self):
+        from concurrent.futures import ThreadPoolExecutor
+        contents = [f'<html><body><p>{i}</p></body></html>'.encode() for i in range(50)]
+        serial = epub_parser.transform_chapters(contents)
+
+        with ThreadPoolExecutor(4) as executor, \
+                patch.object(epub_parser, 'EPUB_PARSE_PROCESSES', 4), \
+                patch.object(epub_parser, 'EPUB_PARALLEL_MIN_CHAPTERS', 10), \
+                patch.object(epub_parser, 'chapter_executor', return_value=executor) as chapter_executor:
+            self.assertEqual(epub_parser.transform_chapters(contents), serial)
+            chapter_executor.assert_called_once()
+        self.assertEqual(serial[7], '<body><p>7</p></body>')
+
     @patch('backend.parsers.docx_parser.docx')
     def test_read_docx(self, mock_docx):
         # Mock document
@@ -62,5 +95,28 @@ class TestParsers(unittest.TestCase):
         self.assertIn('<p>Paragraph 1</p>', result['chapters'][0]['content'])
         self.assertIn('<p>Paragraph 2</p>', result['chapters'][0]['content'])
 
+    def test_synthetic_books(self):
+        # The benchmark books are read by the real parsers, CJK text and covers included
+        import tempfile
+        from backend.benchmarks import synthetic_books
+        from backend.parsers import pdf_parser, txt_parser
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf = synthetic_books.write_pdf(os.path.join(tmp, 'book.pdf'), pages=2, cjk=1.0)
+            text = pdf_parser.read_pdf(pdf)['chapters'][0]['content']
+            self.assertRegex(text, '[一-鿿぀-ヿ가-힣]{2}')
+            self.assertIn("data-page='2'", text)
+            self.assertEqual(pdf_parser.extract_cover_image(pdf)[1], 'image/jpeg')
+
+            epub = synthetic_books.write_epub(os.path.join(tmp, 'book.epub'), chapters=3, paragraphs=2)
+            self.assertEqual(sum('<h1>Chapter' in c['content'] for c in epub_parser.read_epub(epub)['chapters']), 3)
+            self.assertIsNotNone(epub_parser.extract_cover_image(epub)[0])
+
+            docx_path = synthetic_books.write_docx(os.path.join(tmp, 'book.docx'), paragraphs=10)
+            self.assertIn('<img src="/images/', docx_parser.read_docx(docx_path, '/images')['chapters'][0]['content'])
+
+            txt = synthetic_books.write_txt(os.path.join(tmp, 'book.txt'), paragraphs=10, seed=2)
+            self.assertTrue(txt_parser.read_txt(txt)['chapters'])
+
 if __name__ == '__main__':
     unittest.main()
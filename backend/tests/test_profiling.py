@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.profiling import ProfilingMiddleware, requested
+
+
+def busy_parse():
+    # Stands in for work handed to a pool thread
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return "parsed"
+
+
+def make_client(directory):
+    app = FastAPI()
+
+    @app.get("/books/{book_id}")
+    def read_book(book_id: int):
+        return {"book": book_id, "text": busy_parse()}
+
+    return TestClient(ProfilingMiddleware(app, directory=directory))
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_requested(self):
+        self.assertTrue(requested({"headers": [(b"x-profile", b"1")]}))
+        self.assertTrue(requested({"headers": [], "query_string": b"page=2&profile=1"}))
+        self.assertFalse(requested({"headers": [], "query_string": b"profiler=1"}))
+        self.assertFalse(requested({"headers": [(b"x-profile", b"0")], "query_string": b"profile=1"}))
+
+    def test_profiles_flagged_requests_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            client = make_client(tmp)
+            self.assertEqual(client.get("/books/7").status_code, 200)
+            self.assertEqual(os.listdir(tmp), [])
+
+            response = client.get("/books/7", headers={"X-Profile": "1"})
+            self.assertEqual(response.json()["text"], "parsed")
+            path = response.headers["x-profile-path"]
+            self.assertEqual(os.listdir(tmp), [os.path.basename(path)])
+            self.assertIn("GET-books-7", path)
+
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            # Folded stacks: "frame;frame;... count", the parse running on a worker thread included
+            self.assertTrue(lines)
+            for line in lines:
+                stack, count = line.rsplit(" ", 1)
+                self.assertGreater(int(count), 0)
+            self.assertTrue(any("busy_parse (" in line and ";" in line for line in lines))
+
+
+if __name__ == '__main__':
+    unittest.main()
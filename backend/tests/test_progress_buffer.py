@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend.progress_buffer import ProgressBuffer
+
+
+class TestProgressBuffer(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        with self.Session() as db:
+            db.add_all([models.Book(title="A", file_path="a.epub"), models.Book(title="B", file_path="b.epub")])
+            db.commit()
+
+    def test_keeps_latest_position_and_flushes_once(self):
+        buffer = ProgressBuffer(self.Session)
+        for i in range(50):
+            buffer.record(1, f"#content-block-{i}")
+        buffer.record(2, "#content-block-7")
+        buffer.record(404, "#content-block-1")  # deleted book: ignored
+
+        self.assertEqual(buffer.pending(1), "#content-block-49")
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(buffer.flush(), 0)
+        self.assertIsNone(buffer.pending(1))
+
+        with self.Session() as db:
+            self.assertEqual(db.get(models.Book, 1).last_read_position, "#content-block-49")
+            self.assertEqual(db.get(models.Book, 2).last_read_position, "#content-block-7")
+        self.assertEqual(buffer.snapshot()["flushes"], 1)
+
+    def test_failed_flush_keeps_newer_positions(self):
+        session = MagicMock()
+        session.commit.side_effect = RuntimeError("database is locked")
+        buffer = ProgressBuffer(lambda: session)
+        buffer.record(1, "#old")
+
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        self.assertEqual(buffer.pending(1), "#old")
+
+        buffer.record(1, "#new")
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        self.assertEqual(buffer.pending(1), "#new")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend import search_index
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = search_index.connect(os.path.join(self.tmp.name, "search.db"))
+        self.english = self.write("english.txt", "The quick brown fox.\n\nIt jumps over the lazy dog.")
+        self.chinese = self.write("chinese.txt", "我爱北京天安门。\n\n天安门上太阳升。")
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_ranked_snippets_with_locations(self):
+        search_index.index_book(1, "txt", self.english, conn=self.conn)
+        hits = search_index.search("lazy dog", conn=self.conn)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual((hits[0]["book_id"], hits[0]["chapter_index"]), (1, 1))
+        self.assertIn("<mark>lazy</mark>", hits[0]["snippet"])
+
+    def test_cjk_substrings_match(self):
+        search_index.index_book(2, "txt", self.chinese, conn=self.conn)
+        hits = search_index.search("天安门", conn=self.conn)
+        self.assertEqual(len(hits), 2)
+        self.assertIn("<mark>天安门</mark>", hits[0]["snippet"])
+        self.assertEqual(search_index.search("北京天", conn=self.conn)[0]["snippet"].count("<mark>"), 1)
+        self.assertEqual(search_index.search("门北", conn=self.conn), [])
+
+    def test_incremental_indexing(self):
+        self.assertEqual(search_index.index_book(1, "txt", self.english, conn=self.conn), 2)
+        # Unchanged file: nothing to do
+        self.assertIsNone(search_index.index_book(1, "txt", self.english, conn=self.conn))
+
+        search_index.index_book(2, "txt", self.chinese, conn=self.conn)
+        search_index.remove_book(1, conn=self.conn)
+        self.assertEqual(search_index.search("fox", conn=self.conn), [])
+        self.assertEqual(len(search_index.search("北京", conn=self.conn)), 1)
+
+    def test_index_missing_skips_indexed_books(self):
+        search_index.index_book(1, "txt", self.english, conn=self.conn)
+        books = [(1, "txt", self.english), (2, "txt", self.chinese), (3, "txt", os.path.join(self.tmp.name, "gone.txt"))]
+        self.assertEqual(search_index.index_missing(books, conn=self.conn), 1)
+        self.assertEqual(len(search_index.search("北京", conn=self.conn)), 1)
+        self.assertEqual(search_index.index_missing(books, conn=self.conn), 0)
+
+    def test_index_library_backfills_books_from_the_database(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.add(models.Book(id=1, title="English", file_path=self.english, file_type="txt"))
+            db.add(models.Book(id=2, title="Chinese", file_path=self.chinese, file_type="txt"))
+            db.commit()
+
+        with patch.object(search_index, "SessionLocal", Session), patch.object(search_index, "_conn", lambda: self.conn):
+            search_index.index_library()
+        self.assertEqual(len(search_index.search("fox", conn=self.conn)), 1)
+        self.assertEqual(len(search_index.search("北京", conn=self.conn)), 1)
+        engine.dispose()
+
+    def test_user_syntax_is_literal(self):
+        search_index.index_book(1, "txt", self.english, conn=self.conn)
+        self.assertEqual(search_index.search('fox" OR "dog', conn=self.conn), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend import srs
+
+
+class TestSchedule(unittest.TestCase):
+
+    def test_intervals_grow_then_reset_on_a_miss(self):
+        now = datetime(2024, 1, 1)
+        reps, ease, interval, due = srs.schedule(0, 2.5, 0, 4, now)
+        self.assertEqual((reps, interval, due), (1, 1, now + timedelta(days=1)))
+        reps, ease, interval, due = srs.schedule(reps, ease, interval, 4, now)
+        self.assertEqual((reps, interval), (2, 6))
+        reps, ease, interval, due = srs.schedule(reps, ease, interval, 5, now)
+        self.assertEqual(reps, 3)
+        self.assertAlmostEqual(interval, 6 * 2.5, places=1)
+
+        reps, missed_ease, interval, due = srs.schedule(reps, ease, interval, 1, now)
+        self.assertEqual((reps, interval), (0, 1))
+        self.assertLess(missed_ease, ease)
+
+    def test_ease_has_a_floor(self):
+        ease = 2.5
+        for _ in range(20):
+            _, ease, _, _ = srs.schedule(0, ease, 0, 0)
+        self.assertEqual(ease, srs.MIN_EASE)
+
+
+class TestQuizPicks(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        with self.Session() as db:
+            now = datetime.utcnow()
+            for i in range(6):
+                db.add(models.Word(original_word=f"en{i}", translated_word=f"ko-en{i}", language="en",
+                                   due_at=now + timedelta(days=i - 3)))
+            db.add(models.Word(original_word="ja0", translated_word="ko-ja0", language="ja", due_at=now))
+            db.commit()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def run_with_session(self, fn):
+        with self.Session() as db:
+            return fn(db)
+
+    DUE = {"en0", "en1", "en2", "en3", "ja0"}
+
+    def test_only_due_words_by_default(self):
+        words = self.run_with_session(lambda db: srs.pick_quiz_words(db, 10))
+        self.assertEqual({w.original_word for w in words}, self.DUE)
+
+    def test_due_words_are_shuffled(self):
+        picks = set()
+        for _ in range(30):
+            words = self.run_with_session(lambda db: srs.pick_quiz_words(db, 3))
+            self.assertEqual(len(words), 3)
+            self.assertLessEqual({w.original_word for w in words}, self.DUE)
+            picks.add(tuple(w.original_word for w in words))
+        self.assertGreater(len(picks), 1)
+
+    def test_due_sample_reads_only_the_index(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, parameters, context, executemany:
+                     statements.append((statement, parameters)))
+        self.run_with_session(lambda db: srs.pick_quiz_words(db, 3))
+
+        sample, parameters = next(s for s in statements if "random()" in s[0])
+        self.assertNotIn("original_word", sample)
+        with self.engine.connect() as conn:
+            plan = " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sample, parameters))
+        self.assertIn("COVERING INDEX ix_words_due_at", plan)
+        # Options are read for the sampled rows only
+        self.assertTrue(all(" IN (" in s for s, _ in statements if "original_word" in s))
+
+    def test_fill_upcoming_tops_up_soonest_first(self):
+        words = self.run_with_session(lambda db: srs.pick_quiz_words(db, 6, fill_upcoming=True))
+        self.assertEqual({w.original_word for w in words[:5]}, self.DUE)
+        self.assertEqual(words[5].original_word, "en4")
+
+    def test_distractors_are_distinct_and_same_language(self):
+        def pick(db):
+            word = db.get(models.Word, 1)
+            return srs.pick_distractors(db, word, 3)
+        for _ in range(10):
+            distractors = self.run_with_session(pick)
+            self.assertEqual(len(set(distractors)), 3)
+            self.assertNotIn("ko-en0", distractors)
+            self.assertNotIn("ko-ja0", distractors)
+
+    def test_falls_back_to_other_languages(self):
+        def pick(db):
+            word = db.get(models.Word, 7)
+            return srs.pick_distractors(db, word, 3)
+        distractors = self.run_with_session(pick)
+        self.assertEqual(len(set(distractors)), 3)
+        self.assertNotIn("ko-ja0", distractors)
+
+
+if __name__ == '__main__':
+    unittest.main()
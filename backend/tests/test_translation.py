@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import translation
+
+
+class TestChapterTranslation(unittest.TestCase):
+
+    def setUp(self):
+        translation.TRANSLATION_CACHE.clear()
+
+    def test_split_paragraphs(self):
+        html = '<body><h1>Title</h1><p>First  line\nwrapped</p><ul><li><p>Item</p></li></ul><p> </p></body>'
+        self.assertEqual(translation.split_paragraphs(html), ['Title', 'First line wrapped', 'Item'])
+
+    def test_pack_batches_respects_limit(self):
+        paragraphs = ['a' * 40, 'b' * 40, 'c' * 40, 'd' * 200]
+        batches = translation.pack_batches(paragraphs, limit=100)
+        self.assertEqual(batches, [[0, 1], [2], [3]])
+
+    def test_translate_paragraphs_in_order_and_cached(self):
+        calls = []
+
+        def fake_batch(texts, source, target):
+            calls.append(list(texts))
+            return [t.upper() for t in texts]
+
+        translation.cache_translation('cached', 'auto', 'ko', 'CACHED!')
+
+        async def collect():
+            return [item async for item in translation.translate_paragraphs(['one', 'cached', 'two'])]
+
+        with patch('backend.translation.translate_batch', side_effect=fake_batch):
+            result = asyncio.run(collect())
+
+        self.assertEqual(result, [(0, 'one', 'ONE'), (1, 'cached', 'CACHED!'), (2, 'two', 'TWO')])
+        self.assertEqual(calls, [['one', 'two']])
+        self.assertEqual(translation.get_cached_translation('two', 'auto', 'ko'), 'TWO')
+
+
+    def test_cache_evicts_least_recently_used(self):
+        with patch.object(translation, 'TRANSLATION_CACHE_LIMIT', 2):
+            translation.cache_translation('old', 'auto', 'ko', 'OLD')
+            translation.cache_translation('new', 'auto', 'ko', 'NEW')
+            # A hit makes 'old' the most recently used, so 'new' goes first
+            self.assertEqual(translation.get_cached_translation('old', 'auto', 'ko'), 'OLD')
+            translation.cache_translation('newest', 'auto', 'ko', 'NEWEST')
+
+        self.assertEqual(list(translation.TRANSLATION_CACHE), [('old', 'auto', 'ko'), ('newest', 'auto', 'ko')])
+
+
+if __name__ == '__main__':
+    unittest.main()
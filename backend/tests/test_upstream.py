@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.upstream import CircuitBreaker, TokenBucket, UpstreamSource, SourceUnavailable
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_probes_once(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        with patch('backend.upstream.time.monotonic', return_value=breaker.opened_at + 11):
+            self.assertTrue(breaker.allow())   # the half-open probe
+            self.assertFalse(breaker.allow())  # everyone else still skips
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TestUpstreamSource(unittest.TestCase):
+
+    def test_open_source_is_skipped_without_calling(self):
+        source = UpstreamSource("test", rate=100, burst=100, failure_threshold=1, reset_timeout=60)
+        calls = []
+
+        def failing():
+            calls.append(1)
+            raise IOError("timeout")
+
+        with self.assertRaises(IOError):
+            asyncio.run(source.call(failing))
+        with self.assertRaises(SourceUnavailable):
+            asyncio.run(source.call(failing))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(source.snapshot()["state"], "open")
+
+    def test_empty_bucket_skips(self):
+        source = UpstreamSource("test", rate=0, burst=1)
+        self.assertEqual(asyncio.run(source.call(lambda: "ok")), "ok")
+        with self.assertRaises(SourceUnavailable):
+            asyncio.run(source.call(lambda: "ok"))
+        # Rate limiting is not a failure of the upstream
+        self.assertEqual(source.snapshot()["state"], "closed")
+
+    def test_waiting_on_bucket_that_never_refills(self):
+        source = UpstreamSource("test", rate=0, burst=1)
+        self.assertEqual(asyncio.run(source.call(lambda: "ok", wait=True)), "ok")
+        # Raises instead of waiting forever
+        with self.assertRaises(SourceUnavailable):
+            asyncio.run(asyncio.wait_for(source.call(lambda: "ok", wait=True), timeout=1))
+
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(rate=10, capacity=1)
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        bucket.updated_at -= 0.2
+        self.assertTrue(bucket.try_acquire())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import gzip
+import json
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend.vocabulary_export import stream_export
+
+
+class TestVocabularyExport(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        with self.Session() as db:
+            for i in range(5):
+                db.add(models.Word(
+                    original_word=f"word{i}", translated_word=f"뜻{i}", language="en",
+                    context_sentence="first line\nsecond\tline", book_title="My Book",
+                    created_at=datetime(2024, 1, 1 + i),
+                ))
+            db.commit()
+
+    def export(self, fmt, **kwargs):
+        return b"".join(stream_export(self.Session, fmt, batch_rows=2, **kwargs))
+
+    def test_csv_streams_in_batches_newest_first(self):
+        chunks = list(stream_export(self.Session, "csv", batch_rows=2))
+        # header + 3 batches of at most 2 rows
+        self.assertEqual(len(chunks), 4)
+        text = b"".join(chunks).decode("utf-8")
+        self.assertTrue(text.startswith("\ufeffWord,"))
+        self.assertLess(text.index("word4"), text.index("word0"))
+
+    def test_jsonl(self):
+        lines = self.export("jsonl").decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])["translation"], "뜻4")
+
+    def test_anki_one_note_per_line(self):
+        lines = self.export("anki").decode("utf-8").splitlines()
+        notes = [line for line in lines if not line.startswith("#")]
+        self.assertEqual(len(notes), 5)
+        fields = notes[0].split("\t")
+        self.assertEqual(fields[:2], ["word4", "뜻4"])
+        self.assertEqual(fields[3], "first line<br>second line")
+        self.assertEqual(fields[4], "My_Book")
+
+    def test_gzip(self):
+        self.assertEqual(gzip.decompress(self.export("jsonl", compress=True)), self.export("jsonl"))
+
+
+if __name__ == '__main__':
+    unittest.main()
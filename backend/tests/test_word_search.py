@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import Base
+from backend import models
+from backend import word_search
+
+
+class TestWordSearch(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        # Also creates words_fts (after_create hook on the words table)
+        Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        with self.Session() as db:
+            for original, translated, context in [
+                ("apple", "사과", "An apple a day."),
+                ("application", "응용 프로그램", None),
+                ("図書館", "도서관", "図書館で本を読む。"),
+                ("banana", "바나나", "I ate an apple and a banana."),
+            ]:
+                word = models.Word(original_word=original, translated_word=translated, context_sentence=context)
+                db.add(word)
+                db.flush()
+                db.execute(word_search.INSERT_SQL, word_search.index_params(word))
+            db.commit()
+
+    def search(self, query):
+        found = word_search.search_statement(query, 10)
+        if found is None:
+            return []
+        with self.Session() as db:
+            return [row.original_word for row in db.execute(*found)]
+
+    def test_prefix_ranks_headword_matches_first(self):
+        results = self.search("app")
+        self.assertEqual(set(results[:2]), {"apple", "application"})
+        # Only the context sentence mentions an apple
+        self.assertEqual(results[2:], ["banana"])
+
+    def test_cjk_substrings(self):
+        self.assertEqual(self.search("書館"), ["図書館"])
+        self.assertEqual(self.search("사"), ["apple"])
+        self.assertEqual(self.search("본"), [])
+
+    def test_single_character_lists_newest_first(self):
+        self.assertEqual(self.search("a"), ["banana", "application", "apple"])
+
+    def test_blank_query(self):
+        self.assertEqual(self.search('  " '), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
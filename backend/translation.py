@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+
+from .config import TRANSLATE_BATCH_CHARS, TRANSLATE_CONCURRENCY, TRANSLATION_CACHE_LIMIT, GOOGLE_TRANSLATE_URL
+from . import upstream
+
+logger = logging.getLogger(__name__)
+
+# Block level tags that make up the readable paragraphs of a chapter
+BLOCK_TAGS = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'td', 'pre']
+
+# Separator used to pack several paragraphs into one Google request.
+# Paragraphs are whitespace-normalized first, so they never contain a newline themselves.
+BATCH_SEPARATOR = "\n"
+
+WHITESPACE_RE = re.compile(r'\s+')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?。！？])\s*')
+
+# Paragraph translation cache: (text, source, target) -> translation, least recently
+# used first; hits move an entry to the end, evictions take from the front
+TRANSLATION_CACHE = OrderedDict()
+CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Limits how many batches are in flight against Google at once
+_upstream_slots = asyncio.Semaphore(TRANSLATE_CONCURRENCY)
+
+
+def split_paragraphs(html):
+    """
+    Split chapter HTML into plain-text paragraphs, in reading order.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    paragraphs = []
+
+    for block in soup.find_all(BLOCK_TAGS):
+        # Skip wrappers (e.g. <li><p>..</p></li>), the inner block is collected on its own
+        if block.find(BLOCK_TAGS):
+            continue
+        text = WHITESPACE_RE.sub(' ', block.get_text(' ')).strip()
+        if text:
+            paragraphs.append(text)
+
+    if not paragraphs:
+        # Plain markup without block tags: fall back to blank-line separated text
+        for chunk in soup.get_text('\n').split('\n\n'):
+            text = WHITESPACE_RE.sub(' ', chunk).strip()
+            if text:
+                paragraphs.append(text)
+
+    return paragraphs
+
+
+def pack_batches(paragraphs, limit=TRANSLATE_BATCH_CHARS):
+    """
+    Group paragraph indexes so that the joined text of each batch stays under `limit`.
+    A paragraph that is longer than the limit on its own gets a batch of its own.
+    """
+    batches = []
+    current = []
+    size = 0
+
+    for index, text in enumerate(paragraphs):
+        added = len(text) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and size + added > limit:
+            batches.append(current)
+            current = []
+            size = 0
+            added = len(text)
+        current.append(index)
+        size += added
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_long_text(text, limit=TRANSLATE_BATCH_CHARS):
+    """
+    Cut a paragraph that exceeds the translator limit at sentence boundaries.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    pieces = []
+    current = ""
+    for sentence in SENTENCE_END_RE.split(text):
+        if not sentence:
+            continue
+        # A single sentence longer than the limit is hard-cut
+        while len(sentence) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:limit])
+            sentence = sentence[limit:]
+        if current and len(current) + 1 + len(sentence) > limit:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def google_translator(source="auto", target="ko"):
+    # Imported here: deep_translator (and requests) take a while to load, see test_import_time.py
+    from deep_translator import GoogleTranslator
+
+    translator = GoogleTranslator(source=source, target=target)
+    # GoogleTranslator takes no base URL argument; GOOGLE_TRANSLATE_URL may point elsewhere
+    translator._base_url = GOOGLE_TRANSLATE_URL
+    return translator
+
+
+def translate_text(text, source="auto", target="ko"):
+    # A new instance per call: GoogleTranslator keeps the query in instance state,
+    # so a shared instance is not safe across concurrent batches.
+    translator = google_translator(source, target)
+    return " ".join((translator.translate(piece) or "") for piece in split_long_text(text))
+
+
+def translate_batch(texts, source="auto", target="ko"):
+    """
+    Translate several paragraphs with a single upstream call.
+    Falls back to one call per paragraph if the translator merged or split lines.
+    """
+    if len(texts) == 1:
+        return [translate_text(texts[0], source, target)]
+
+    joined = translate_text(BATCH_SEPARATOR.join(texts), source, target)
+    lines = [line.strip() for line in (joined or "").split(BATCH_SEPARATOR)]
+    if len(lines) == len(texts):
+        return lines
+
+    return [translate_text(text, source, target) for text in texts]
+
+
+def get_cached_translation(text, source, target):
+    key = (text, source, target)
+    translation = TRANSLATION_CACHE.get(key)
+    if translation is not None:
+        TRANSLATION_CACHE.move_to_end(key)
+        CACHE_STATS["hits"] += 1
+    else:
+        CACHE_STATS["misses"] += 1
+    return translation
+
+
+def cache_translation(text, source, target, translation):
+    if not translation:
+        return
+    key = (text, source, target)
+    if key in TRANSLATION_CACHE:
+        TRANSLATION_CACHE.move_to_end(key)
+    elif len(TRANSLATION_CACHE) >= TRANSLATION_CACHE_LIMIT:
+        TRANSLATION_CACHE.popitem(last=False)
+        CACHE_STATS["evictions"] += 1
+    TRANSLATION_CACHE[key] = translation
+
+
+async def _translate_batch_async(texts, source, target):
+    # Shares the Google circuit breaker and token bucket with word lookups,
+    # but queues for a token instead of giving up when the bucket is empty.
+    async with _upstream_slots:
+        return await upstream.google.call(translate_batch, texts, source, target, wait=True)
+
+
+async def translate_paragraphs(paragraphs, source="auto", target="ko"):
+    """
+    Translate paragraphs concurrently and yield (index, text, translation) in reading order.
+    Cached paragraphs are not sent upstream. A paragraph is yielded as soon as it and
+    every paragraph before it are translated.
+    """
+    translations = [get_cached_translation(text, source, target) for text in paragraphs]
+    missing = [i for i, t in enumerate(translations) if t is None]
+    batches = pack_batches([paragraphs[i] for i in missing])
+
+    # Start every batch right away; the semaphore keeps the upstream rate in check
+    batch_of = {}
+    tasks = []
+    for batch in batches:
+        indexes = [missing[i] for i in batch]
+        task = asyncio.create_task(_translate_batch_async([paragraphs[i] for i in indexes], source, target))
+        tasks.append((indexes, task))
+        for i in indexes:
+            batch_of[i] = len(tasks) - 1
+
+    try:
+        for index, text in enumerate(paragraphs):
+            if translations[index] is None:
+                indexes, task = tasks[batch_of[index]]
+                try:
+                    results = await task
+                except Exception as e:
+                    logger.warning("Chapter translation error", extra={"paragraphs": len(indexes), "error": str(e)})
+                    results = [None] * len(indexes)
+                for i, result in zip(indexes, results):
+                    translations[i] = result or ""
+                    cache_translation(paragraphs[i], source, target, result)
+            yield index, text, translations[index]
+    finally:
+        # Client went away: don't keep translating for nobody
+        for _, task in tasks:
+            task.cancel()
@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+
+from .executors import io_pool, PoolBusy
+from . import metrics
+from .logs import span
+from .config import (
+    NAVER_RATE, NAVER_BURST, GOOGLE_RATE, GOOGLE_BURST, FREEDICT_RATE, FREEDICT_BURST,
+    BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+)
+
+
+request_duration = metrics.histogram(
+    "upstream_request_duration_seconds", "Time of calls to dictionary/translation services, per source; outcome is ok or error.",
+    ("source", "outcome"),
+)
+requests_total = metrics.counter(
+    "upstream_requests_total",
+    "Calls to dictionary/translation services, per source and outcome (ok, error, circuit_open, rate_limited, pool_busy).",
+    ("source", "outcome"),
+)
+
+
+class SourceUnavailable(Exception):
+    """Raised without calling upstream when a source is open or out of tokens."""
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1 or self.rate <= 0:
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        # Waits for a token. False when none can ever come: empty and not refilling (rate 0)
+        while not self.try_acquire():
+            if self.rate <= 0:
+                return False
+            await asyncio.sleep(self.wait_time() or 0.01)
+        return True
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Closed: every call goes through.
+        Open: nothing goes through until reset_timeout has passed, then one probe (half-open).
+        Half-open: only the single probe is in flight; its outcome closes or re-opens the breaker.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        # The probe was not sent after all (e.g. rate limited), let the next call try
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "failures": self.failures, "retry_in": retry_in}
+
+
+class UpstreamSource:
+    """
+    An external dictionary/translation service guarded by a circuit breaker and a token bucket.
+    """
+
+    def __init__(self, name, rate, burst, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.bucket = TokenBucket(rate, burst)
+        self.calls = 0
+        self.skipped = 0
+
+    async def call(self, fn, *args, wait=False, **kwargs):
+        """
+        Run the blocking `fn` on the I/O pool.
+        Raises SourceUnavailable immediately while the breaker is open. When the bucket is
+        empty it raises too, unless `wait` is set (bulk work that may queue behind the limit).
+        Any exception from `fn` counts as a failure of the source.
+        """
+        if not self.breaker.allow():
+            self.skipped += 1
+            requests_total.inc(source=self.name, outcome="circuit_open")
+            raise SourceUnavailable(f"{self.name} circuit is open")
+
+        try:
+            acquired = await self.bucket.acquire() if wait else self.bucket.try_acquire()
+            if not acquired:
+                self.breaker.release_probe()
+                self.skipped += 1
+                requests_total.inc(source=self.name, outcome="rate_limited")
+                raise SourceUnavailable(f"{self.name} rate limit reached")
+
+            self.calls += 1
+            with span(f"lookup.{self.name}"):
+                result = await io_pool.run(self._timed, fn, *args, **kwargs)
+        except PoolBusy:
+            self.breaker.release_probe()
+            requests_total.inc(source=self.name, outcome="pool_busy")
+            raise
+        except (SourceUnavailable, asyncio.CancelledError):
+            # Not the upstream's fault
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            requests_total.inc(source=self.name, outcome="error")
+            raise
+        self.breaker.record_success()
+        requests_total.inc(source=self.name, outcome="ok")
+        return result
+
+    def _timed(self, fn, *args, **kwargs):
+        # On the I/O worker, so waiting for a free worker isn't counted as upstream time
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            request_duration.observe(time.perf_counter() - started, source=self.name, outcome=outcome)
+
+    def snapshot(self):
+        status = self.breaker.snapshot()
+        status.update({
+            "tokens": round(self.bucket.tokens, 2),
+            "rate": self.bucket.rate,
+            "burst": self.bucket.capacity,
+            "calls": self.calls,
+            "skipped": self.skipped,
+        })
+        return status
+
+
+naver = UpstreamSource("naver", NAVER_RATE, NAVER_BURST)
+google = UpstreamSource("google", GOOGLE_RATE, GOOGLE_BURST)
+freedict = UpstreamSource("freedict", FREEDICT_RATE, FREEDICT_BURST)
+
+SOURCES = {source.name: source for source in (naver, google, freedict)}
+
+
+def sources_status():
+    return {name: source.snapshot() for name, source in SOURCES.items()}
+
+
+CIRCUIT_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+@metrics.register_collector
+def _source_metrics():
+    sources = list(SOURCES.values())
+    return [
+        ("upstream_circuit_state", "gauge", "Circuit breaker of each source: 0 closed, 1 half-open, 2 open.",
+         [({"source": source.name}, CIRCUIT_STATES[source.breaker.state]) for source in sources]),
+        ("upstream_rate_limit_tokens", "gauge", "Requests each source's token bucket allows right now.",
+         [({"source": source.name}, round(source.bucket.tokens, 2)) for source in sources]),
+    ]
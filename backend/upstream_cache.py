@@ -0,0 +1,105 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .config import UPSTREAM_CACHE_PATH, UPSTREAM_CACHE_TTL_DAYS
+
+# Raw upstream payloads, zlib-compressed, keyed by (source, query).
+# Keeping the untouched response means new fields can be extracted later
+# without re-scraping.
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Since startup; see snapshot()
+stats = {"hits": 0, "misses": 0, "expired": 0, "writes": 0}
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(UPSTREAM_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(UPSTREAM_CACHE_PATH)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS raw_responses (
+                source VARCHAR NOT NULL,
+                query VARCHAR NOT NULL,
+                fetched_at REAL NOT NULL,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (source, query)
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def get(source, query, max_age=UPSTREAM_CACHE_TTL_DAYS * 86400):
+    """
+    Return the decompressed payload bytes, or None if missing or older than max_age seconds.
+    """
+    try:
+        row = _connect().execute(
+            "SELECT fetched_at, payload FROM raw_responses WHERE source = ? AND query = ?",
+            (source, query),
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("Upstream cache read error", extra={"source": source, "error": str(e)})
+        return None
+
+    if not row:
+        stats["misses"] += 1
+        return None
+    fetched_at, payload = row
+    if max_age is not None and time.time() - fetched_at > max_age:
+        stats["expired"] += 1
+        return None
+    stats["hits"] += 1
+    return zlib.decompress(payload)
+
+
+def put(source, query, payload):
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO raw_responses (source, query, fetched_at, payload) VALUES (?, ?, ?, ?)",
+            (source, query, time.time(), zlib.compress(payload, 6)),
+        )
+        conn.commit()
+        stats["writes"] += 1
+    except sqlite3.Error as e:
+        logger.warning("Upstream cache write error", extra={"source": source, "error": str(e)})
+
+
+def delete(source, query):
+    try:
+        conn = _connect()
+        conn.execute("DELETE FROM raw_responses WHERE source = ? AND query = ?", (source, query))
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning("Upstream cache write error", extra={"source": source, "error": str(e)})
+
+
+def snapshot():
+    lookups = stats["hits"] + stats["misses"] + stats["expired"]
+    return dict(stats, hit_rate=round(stats["hits"] / lookups, 4) if lookups else None)
+
+
+def iter_entries(source_prefix=""):
+    """
+    Yield (source, query, payload bytes) for every cached response whose source starts with source_prefix.
+    """
+    cursor = _connect().execute(
+        "SELECT source, query, payload FROM raw_responses WHERE source LIKE ? ORDER BY source, query",
+        (source_prefix + "%",),
+    )
+    for source, query, payload in cursor:
+        yield source, query, zlib.decompress(payload)
@@ -0,0 +1,127 @@
+import csv
+import html
+import io
+import json
+import zlib
+
+from sqlalchemy import select
+
+from . import models
+from .config import EXPORT_BATCH_ROWS
+
+# Vocabulary export as a stream of chunks: rows are read from the database in
+# batches of EXPORT_BATCH_ROWS and each batch is written out before the next one
+# is fetched, so memory use doesn't depend on the size of the vocabulary.
+
+EXPORT_COLUMNS = (
+    models.Word.original_word, models.Word.pronunciation, models.Word.translated_word,
+    models.Word.context_sentence, models.Word.book_title, models.Word.language, models.Word.created_at,
+)
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "anki": ("text/tab-separated-values; charset=utf-8", "txt"),
+}
+
+
+def _csv_header():
+    # BOM for Excel compatibility with UTF-8
+    return '\ufeff' + _csv_lines([['Word', 'Pronunciation', 'Translation', 'Context Sentence', 'Book Title', 'Date Added']])
+
+
+def _csv_lines(rows):
+    output = io.StringIO()
+    csv.writer(output).writerows(rows)
+    return output.getvalue()
+
+
+def _anki_field(value):
+    # Anki reads the file as HTML, one note per line
+    return html.escape(value or '').replace('\t', ' ').replace('\r\n', '<br>').replace('\n', '<br>')
+
+
+def _anki_tag(book_title):
+    return '_'.join(book_title.split()) if book_title else ''
+
+
+def format_header(fmt):
+    if fmt == "csv":
+        return _csv_header()
+    if fmt == "anki":
+        # Import headers understood by Anki 2.1.54+
+        return "#separator:tab\n#html:true\n#columns:Front\tBack\tPronunciation\tContext\tTags\n#tags column:5\n"
+    return ""
+
+
+def format_rows(rows, fmt):
+    if fmt == "csv":
+        return _csv_lines(
+            [
+                row.original_word,
+                row.pronunciation or '',
+                row.translated_word,
+                row.context_sentence or '',
+                row.book_title or '',
+                row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            ]
+            for row in rows
+        )
+    if fmt == "jsonl":
+        return "".join(
+            json.dumps({
+                "word": row.original_word,
+                "pronunciation": row.pronunciation,
+                "translation": row.translated_word,
+                "context": row.context_sentence,
+                "book_title": row.book_title,
+                "language": row.language,
+                "created_at": row.created_at.isoformat(),
+            }, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    if fmt == "anki":
+        return "".join(
+            "\t".join((
+                _anki_field(row.original_word),
+                _anki_field(row.translated_word),
+                _anki_field(row.pronunciation),
+                _anki_field(row.context_sentence),
+                _anki_tag(row.book_title),
+            )) + "\n"
+            for row in rows
+        )
+    raise ValueError(f"Unknown export format '{fmt}', expected one of {list(FORMATS)}")
+
+
+def stream_export(session_factory, fmt="csv", compress=False, batch_rows=None):
+    """
+    Yield the export as encoded chunks, newest words first.
+    The session is opened inside the generator, so it lives exactly as long as the response body.
+    """
+    batch_rows = batch_rows or EXPORT_BATCH_ROWS
+    # wbits=31 writes a gzip container rather than a bare zlib stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    header = format_header(fmt)
+    if header:
+        yield encode(header)
+
+    with session_factory() as db:
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .order_by(models.Word.created_at.desc(), models.Word.id.desc())
+            .execution_options(yield_per=batch_rows)
+        )
+        for rows in db.execute(stmt).partitions():
+            chunk = encode(format_rows(rows, fmt))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,73 @@
+from sqlalchemy import text
+
+from .fts import segment, build_query
+
+# Search over saved words (original, translation, context sentence) through the
+# words_fts table, see models.WORDS_FTS_DDL. Rows are written in the same
+# transaction as the word itself, so the index is never ahead of or behind it.
+
+INSERT_SQL = text("""
+    INSERT INTO words_fts (rowid, original_word, translated_word, context_sentence)
+    VALUES (:id, :original_word, :translated_word, :context_sentence)
+""")
+
+DELETE_SQL = text("DELETE FROM words_fts WHERE rowid = :id")
+
+SELECT_SQL = """
+    SELECT words.id, words.original_word, words.translated_word, words.pronunciation,
+           words.context_sentence, words.book_title, words.book_id, words.language, words.created_at
+    FROM words_fts
+    JOIN words ON words.id = words_fts.rowid
+    WHERE words_fts MATCH :query
+"""
+
+# Matches in the word itself rank above the translation, then the context sentence.
+# Ties go to the newest word.
+RANKED_SQL = text(SELECT_SQL + """
+    ORDER BY bm25(words_fts, 10.0, 4.0, 1.0), words_fts.rowid DESC
+    LIMIT :limit
+""")
+
+# A single typed character matches a large part of the vocabulary, and ranking
+# means scoring every match. Newest first lets FTS5 stop after `limit` rows.
+RECENT_SQL = text(SELECT_SQL + """
+    ORDER BY words_fts.rowid DESC
+    LIMIT :limit
+""")
+
+
+def index_params(word):
+    return {
+        "id": word.id,
+        "original_word": segment(word.original_word or ""),
+        "translated_word": segment(word.translated_word or ""),
+        "context_sentence": segment(word.context_sentence or ""),
+    }
+
+
+def search_statement(query, limit):
+    """
+    Return (statement, params) for a search, or None when the query has no searchable terms.
+    The last term is a prefix so results follow the user's typing.
+    """
+    match = build_query(query, prefix=True)
+    if not match:
+        return None
+    statement = RECENT_SQL if len(query.strip()) < 2 else RANKED_SQL
+    return statement, {"query": match, "limit": limit}
+
+
+def add(db, word):
+    db.execute(INSERT_SQL, index_params(word))
+
+
+def remove(db, word_id):
+    db.execute(DELETE_SQL, {"id": word_id})
+
+
+def search(db, query, limit=20):
+    found = search_statement(query, limit)
+    if found is None:
+        return []
+    statement, params = found
+    return db.execute(statement, params).all()